@@ -0,0 +1,88 @@
+"""
+Microbenchmark for business plan lookups: full rescans vs. the compiled plan
+with per-session progress counters.
+
+Usage: python benchmarks/bench_business_plan.py [--sections 40] [--questions 30]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.business_plan_service import (
+    get_current_business_plan_question,
+    calculate_points,
+    new_plan_progress,
+    record_plan_answer
+)
+
+
+def build_plan(section_count, questions_per_section):
+    sections = []
+    for s in range(section_count):
+        core_count = questions_per_section // 2
+        sections.append({
+            'id': f'section_{s + 1}',
+            'title': f'Section {s + 1}: Generated',
+            'description': 'Generated section',
+            'core_questions': [
+                {'id': f's{s}_core_{q}', 'label': f'Core {s}.{q}', 'fill': 'Describe it.'}
+                for q in range(core_count)
+            ],
+            'optional_questions': [
+                {'id': f's{s}_optional_{q}', 'label': f'Optional {s}.{q}', 'fill': 'Describe it.'}
+                for q in range(questions_per_section - core_count)
+            ]
+        })
+    return sections
+
+
+def run_interview(sections, incremental):
+    form_data = {}
+    progress = new_plan_progress(form_data, sections) if incremental else None
+    turn = 0
+    while True:
+        section, question, _ = get_current_business_plan_question(form_data, sections, progress)
+        if not question:
+            break
+        value = '' if turn % 7 == 0 else 'An answer'
+        if incremental:
+            record_plan_answer(form_data, sections, progress, question['id'], value)
+        else:
+            form_data[question['id']] = value
+        # /api/chat looks up the current question up to three times per turn.
+        get_current_business_plan_question(form_data, sections, progress)
+        get_current_business_plan_question(form_data, sections, progress)
+        calculate_points(form_data, sections, progress)
+        turn += 1
+    return turn, calculate_points(form_data, sections, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark business plan question lookups.")
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--questions", type=int, default=30, help="Questions per section.")
+    args = parser.parse_args()
+
+    sections = build_plan(args.sections, args.questions)
+    total = args.sections * args.questions
+    print(f"Plan with {args.sections} sections, {total} questions")
+
+    results = {}
+    for name, incremental in (('rescan', False), ('compiled', True)):
+        start = time.perf_counter()
+        turns, points = run_interview(sections, incremental)
+        elapsed = time.perf_counter() - start
+        results[name] = (elapsed, points)
+        print(f"{name:>9}: {turns} turns in {elapsed * 1000:.1f} ms "
+              f"({elapsed / turns * 1e6:.1f} us/turn), points={points}")
+
+    assert results['rescan'][1] == results['compiled'][1]
+    print(f"speedup: {results['rescan'][0] / results['compiled'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
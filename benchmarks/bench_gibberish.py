@@ -0,0 +1,136 @@
+"""
+Benchmark for gibberish detection: the original per-call implementation vs.
+GibberishDetector.is_gibberish (precompiled, per text) and
+GibberishDetector.score_batch (NumPy, many texts at once).
+
+All three must agree on every generated text.
+
+Usage: python benchmarks/bench_gibberish.py [--texts 20000] [--seed 1]
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.gibberish_detector import GibberishDetector, COMMON_WORDS, np
+
+
+def legacy_is_gibberish(text):
+    # Copy of the original services.validation_service.is_gibberish, kept as the baseline.
+    text_clean = text.strip().lower()
+
+    if len(text_clean) < 4:
+        return False
+
+    text_alpha = re.sub(r'[^a-z]', '', text_clean)
+
+    if len(text_alpha) < 4:
+        return False
+
+    vowels = set('aeiou')
+    vowel_count = sum(1 for char in text_alpha if char in vowels)
+    consonant_count = len(text_alpha) - vowel_count
+
+    if consonant_count > 0:
+        vowel_ratio = vowel_count / len(text_alpha)
+        if vowel_ratio < 0.15 and len(text_alpha) > 5:
+            return True
+
+    common_words = set(COMMON_WORDS)
+
+    words = re.findall(r'\b[a-z]+\b', text_clean)
+    if words:
+        word_count = len(words)
+        common_word_count = sum(1 for word in words if word in common_words)
+        if word_count > 2 and common_word_count == 0:
+            if len(text_alpha) > 8:
+                return True
+
+    consecutive_consonants = 0
+    max_consecutive = 0
+    for char in text_alpha:
+        if char not in vowels:
+            consecutive_consonants += 1
+            max_consecutive = max(max_consecutive, consecutive_consonants)
+        else:
+            consecutive_consonants = 0
+
+    if max_consecutive >= 5 and len(text_alpha) > 6:
+        return True
+
+    return False
+
+
+SENTENCES = [
+    "We sell handmade ceramic mugs to cafes in Espoo.",
+    "Small businesses that need bookkeeping help every month",
+    "Instagram, word of mouth and local networking events",
+    "Our strengths are a good team and low costs.",
+    "Break even in month five with 2000 EUR fixed costs",
+    "Families with small kids",
+    "B2B customers, mostly restaurants",
+]
+DOMAIN_WORDS = ["market", "customer", "price", "service", "delivery", "growth", "startup", "funding",
+                "product", "strategy", "partner", "brand", "sales", "risk", "license"]
+
+
+def generate_texts(count, seed):
+    rng = random.Random(seed)
+    common = sorted(COMMON_WORDS)
+    texts = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            texts.append(rng.choice(SENTENCES))
+        elif kind == 1:
+            texts.append(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 20))))
+        elif kind == 2:
+            texts.append(' '.join(rng.choice(DOMAIN_WORDS + common) for _ in range(rng.randint(1, 12))))
+        elif kind == 3:
+            texts.append(str(rng.randint(0, 10 ** rng.randint(1, 9))))
+        else:
+            texts.append(' '.join(rng.choice(DOMAIN_WORDS) for _ in range(rng.randint(2, 6))).title() + '!')
+    return texts
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gibberish detection.")
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    texts = generate_texts(args.texts, args.seed)
+    detector = GibberishDetector()
+
+    legacy, legacy_time = timed(lambda: [legacy_is_gibberish(text) for text in texts])
+    single, single_time = timed(lambda: [detector.is_gibberish(text) for text in texts])
+    assert single == legacy, "is_gibberish disagrees with the original implementation"
+
+    print(f"{len(texts)} texts, {sum(legacy)} flagged as gibberish")
+    print(f"{'legacy':>12}: {legacy_time * 1000:8.1f} ms ({legacy_time / len(texts) * 1e6:.2f} us/text)")
+    print(f"{'is_gibberish':>12}: {single_time * 1000:8.1f} ms ({single_time / len(texts) * 1e6:.2f} us/text)"
+          f"  {legacy_time / single_time:.1f}x")
+
+    if np is None:
+        print("NumPy is not installed; score_batch falls back to is_gibberish.")
+        return
+    batch, batch_time = timed(lambda: detector.score_batch(texts))
+    assert batch.tolist() == legacy, "score_batch disagrees with the original implementation"
+    print(f"{'score_batch':>12}: {batch_time * 1000:8.1f} ms ({batch_time / len(texts) * 1e6:.2f} us/text)"
+          f"  {legacy_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark for the markdown -> DOCX step of the report build: the old round
+trip (markdown -> HTML -> HTMLToDocxParser) vs. the native single-pass
+converter in services/markdown_docx.py, both through render_docx.
+
+The input is a generated business plan far larger than a real one: each
+section has a heading, paragraphs with bold text and links, nested bullet and
+numbered lists and a pipe table. Reports median render time, the tracemalloc
+peak (Python allocations only; lxml's own buffers are not traced) and how many
+tables, list items and hyperlinks ended up in the document.
+
+Usage: python benchmarks/bench_markdown_docx.py [--sections 200] [--runs 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AINO_DATA_DIR', tempfile.mkdtemp(prefix='bench_markdown_docx_'))
+
+from docx import Document
+import services.docx_service as docx_service
+
+
+def make_plan_markdown(section_count):
+    blocks = ["# Business plan: Leipomo Oy"]
+    for number in range(1, section_count + 1):
+        blocks.append(f"## {number}. Section {number}")
+        blocks.append(f"**Summary:** Section {number} covers customers, pricing and the *local market* in Espoo.\n"
+                      f"See [the advisory guide](https://example.com/guide/{number}) for details.")
+        blocks.append("\n".join([
+            "1. First step",
+            "   - supplier contracts",
+            "   - **premises** in Tapiola",
+            "2. Second step",
+            "3. Third step",
+        ]))
+        blocks.append("\n".join([
+            "- Strengths",
+            "  - experienced founder",
+            "    - 5 years in bakeries",
+            "- Risks",
+        ]))
+        blocks.append("\n".join([
+            "| Item | Year 1 | Year 2 |",
+            "|:--|--:|--:|",
+            f"| Revenue | {number * 1000} EUR | {number * 1500} EUR |",
+            f"| Costs | {number * 700} EUR | {number * 900} EUR |",
+        ]))
+    return "\n\n---\n\n".join(blocks)
+
+
+def render(filled_markdown, converter):
+    docx_service.DOCX_CONVERTER = converter
+    with contextlib.redirect_stdout(io.StringIO()):
+        return docx_service.render_docx(filled_markdown)
+
+
+def measure(filled_markdown, converter, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        docx_bytes = render(filled_markdown, converter)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    render(filled_markdown, converter)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak, docx_bytes
+
+
+def count_structure(docx_bytes):
+    doc = Document(io.BytesIO(docx_bytes))
+    list_items = sum(1 for paragraph in doc.paragraphs if paragraph.style.name.startswith('List'))
+    document_xml = zipfile.ZipFile(io.BytesIO(docx_bytes)).read('word/document.xml').decode('utf-8')
+    return len(doc.tables), list_items, document_xml.count('<w:hyperlink ')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML round trip vs. the native markdown -> DOCX converter.")
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    filled_markdown = make_plan_markdown(args.sections)
+    print(f"Generated plan: {args.sections} sections, {len(filled_markdown) / 1024:.0f} KiB of markdown")
+
+    results = {}
+    for converter in ('html', 'native'):
+        timings, peak, docx_bytes = measure(filled_markdown, converter, args.runs)
+        tables, list_items, links = count_structure(docx_bytes)
+        results[converter] = statistics.median(timings)
+        print(f"{converter:>7}: median {statistics.median(timings) * 1000:8.1f} ms, peak {peak / 1024 / 1024:6.1f} MiB, "
+              f"{len(docx_bytes) / 1024:5.0f} KiB docx, {tables} tables, {list_items} list items, {links} hyperlinks")
+    print(f"native converter is {results['html'] / results['native']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark for report assembly: the deterministic local renderer vs. the LLM
+section fill ("polish" mode), end to end through create_docx_from_form_data.
+
+Polish mode runs against a simulated model (no API calls): every section call
+waits --ttft seconds plus output tokens / --tokens-per-second, which is
+roughly what gpt-4o streams for these section sizes. Sections are filled in
+parallel on REPORT_FILL_WORKERS threads as in production. Every run uses fresh
+answers so neither the section cache nor the report cache hits; the "cached"
+row repeats one set of answers to show a report cache hit.
+
+Usage: python benchmarks/bench_report_render.py [--runs 20] [--polish-runs 2] [--ttft 0.6] [--tokens-per-second 60]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AINO_DATA_DIR', tempfile.mkdtemp(prefix='bench_report_'))
+
+from services import openai_client
+from services.business_plan_service import load_business_plan_from_yaml
+from services.docx_service import create_docx_from_form_data
+import services.docx_service as docx_service
+
+
+class SimulatedModel:
+    def __init__(self, ttft, tokens_per_second):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        # Answer with the section as the local renderer would have filled it.
+        prompt = kwargs['messages'][-1]['content']
+        output = prompt.split('```markdown\n', 1)[-1].split('\n```', 1)[0]
+        time.sleep(self.ttft + len(output) / 4 / self.tokens_per_second)
+        self.calls += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=output))],
+            usage=None
+        )
+
+
+def make_form_data(business_plan_sections, run):
+    form_data = {
+        'company_name': 'Leipomo Oy', 'language': 'English', 'sphere': 'Bakery', 'education': 'MBA',
+        'experience': '5 years', 'location': 'Espoo'
+    }
+    for section in business_plan_sections:
+        for question in section['core_questions'] + section['optional_questions']:
+            form_data[question['id']] = (f"Run {run}: our answer to '{question['label']}' goes into some detail "
+                                         f"about customers, pricing and the local market in Espoo.")
+    return form_data
+
+
+def build(form_data, business_plan_sections, mode):
+    docx_service.REPORT_RENDER_MODE = mode
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        create_docx_from_form_data(form_data, business_plan_sections)
+        return time.perf_counter() - start
+
+
+def summarize(name, timings):
+    print(f"{name:>7}: median {statistics.median(timings) * 1000:9.1f} ms, "
+          f"min {min(timings) * 1000:9.1f} ms, max {max(timings) * 1000:9.1f} ms ({len(timings)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local vs. LLM report assembly.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--polish-runs", type=int, default=2)
+    parser.add_argument("--ttft", type=float, default=0.6, help="Simulated seconds to first token per call.")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    args = parser.parse_args()
+
+    business_plan_sections = load_business_plan_from_yaml()
+    model = SimulatedModel(args.ttft, args.tokens_per_second)
+    openai_client._clients['report_fill'] = model
+
+    template_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'business_plan', 'business_plan_template.md')
+    answers = {question['label']: 'An answer' for section in business_plan_sections
+               for question in section['core_questions'] + section['optional_questions']}
+    markdown_only = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        docx_service.build_business_plan_markdown(template_path, answers, mode='local', business_plan_sections=business_plan_sections)
+        markdown_only.append(time.perf_counter() - start)
+
+    local = [build(make_form_data(business_plan_sections, f'local {run}'), business_plan_sections, 'local')
+             for run in range(args.runs)]
+    cached_form_data = make_form_data(business_plan_sections, 'cached')
+    cached = [build(cached_form_data, business_plan_sections, 'local') for _ in range(args.runs + 1)][1:]
+    polish = [build(make_form_data(business_plan_sections, f'polish {run}'), business_plan_sections, 'polish')
+              for run in range(args.polish_runs)]
+
+    print(f"Simulated model: {args.ttft}s to first token, {args.tokens_per_second:.0f} tokens/s, "
+          f"{docx_service.REPORT_FILL_WORKERS} parallel section calls ({model.calls // max(args.polish_runs, 1)} per report)")
+    print(f"local markdown only: median {statistics.median(markdown_only) * 1000:.2f} ms")
+    summarize('local', local)
+    summarize('polish', polish)
+    summarize('cached', cached)
+    print(f"local report build is {statistics.median(polish) / statistics.median(local):.0f}x faster (DOCX included)")
+
+
+if __name__ == "__main__":
+    main()
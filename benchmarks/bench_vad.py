@@ -0,0 +1,115 @@
+"""
+Benchmark for the transcription preprocessing stage: silence trimming with the
+energy VAD and re-encoding to compact mono audio.
+
+Reports bytes saved per clip and end-to-end latency for sending the original vs.
+the preprocessed clip. Upload time and transcription time are modeled from
+--uplink-mbps and --rtf (transcription seconds per audio second), since the API
+is not called. Preprocessing time is measured.
+
+Clips are synthesized (48 kHz stereo WAV with silence padding) unless --clips
+points at a directory of .wav files.
+
+Usage: python benchmarks/bench_vad.py [--clips DIR] [--uplink-mbps 5] [--rtf 0.1] [--overhead-ms 300]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_service import np, preprocess_audio, FFMPEG_PATH
+
+
+def synth_clip(lead_silence, speech, tail_silence, rate=48000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(speech * rate)) / rate
+    # Harmonic "voice" with a ~4 Hz syllable envelope.
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 420, 560)))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    speech_part = 0.3 * voice * envelope
+    noise = lambda seconds: 0.002 * rng.standard_normal(int(seconds * rate))
+    mono = np.concatenate([noise(lead_silence), speech_part + noise(speech), noise(tail_silence)])
+    stereo = np.repeat(mono[:, None], 2, axis=1)
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.clip(stereo, -1, 1) * 32767).astype('<i2').tobytes())
+    return output.getvalue(), len(mono) / rate
+
+
+def load_clips(directory):
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith('.wav'):
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            data = f.read()
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        clips.append((name, data, duration))
+    return clips
+
+
+def modeled_latency(payload_bytes, audio_seconds, args):
+    upload = payload_bytes * 8 / (args.uplink_mbps * 1e6)
+    transcription = args.overhead_ms / 1000 + audio_seconds * args.rtf if audio_seconds else 0.0
+    return upload + transcription
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VAD trimming before transcription.")
+    parser.add_argument("--clips", help="Directory of .wav clips to use instead of synthetic ones.")
+    parser.add_argument("--uplink-mbps", type=float, default=5.0)
+    parser.add_argument("--rtf", type=float, default=0.1, help="Transcription seconds per audio second.")
+    parser.add_argument("--overhead-ms", type=float, default=300.0, help="Fixed per-request API overhead.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if np is None:
+        print("NumPy is not installed; preprocessing is disabled and audio is passed through.")
+        return
+
+    if args.clips:
+        clips = load_clips(args.clips)
+    else:
+        clips = []
+        for name, lead, speech, tail in (('short-command', 1.5, 2.0, 1.5), ('long-answer', 2.0, 12.0, 3.0),
+                                          ('mostly-silence', 4.0, 0.8, 4.0), ('empty', 6.0, 0.0, 0.0)):
+            data, duration = synth_clip(lead, speech, tail)
+            clips.append((name, data, duration))
+
+    print(f"Encoder: {'ffmpeg/opus' if FFMPEG_PATH else 'WAV 16 kHz mono (ffmpeg not found)'}; "
+          f"uplink {args.uplink_mbps} Mbit/s, RTF {args.rtf}, overhead {args.overhead_ms:.0f} ms")
+    print(f"{'clip':>16} {'audio s':>8} {'speech s':>9} {'bytes in':>10} {'bytes out':>10} {'saved':>7} "
+          f"{'prep ms':>8} {'e2e before':>11} {'e2e after':>10}")
+
+    total_in = total_out = 0
+    for name, data, duration in clips:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = preprocess_audio(io.BytesIO(data), 'clip.wav', 'audio/wav')
+            timings.append(time.perf_counter() - start)
+        prep = min(timings)
+        speech = result['speech_seconds'] if result['speech_seconds'] is not None else duration
+        before = modeled_latency(len(data), duration, args)
+        after = prep + modeled_latency(result['output_bytes'], 0.0 if result['empty'] else speech, args)
+        total_in += len(data)
+        total_out += result['output_bytes']
+        saved = 1 - result['output_bytes'] / len(data)
+        print(f"{name:>16} {duration:>8.1f} {speech:>9.2f} {len(data):>10} {result['output_bytes']:>10} "
+              f"{saved:>6.1%} {prep * 1000:>8.1f} {before * 1000:>9.0f}ms {after * 1000:>8.0f}ms"
+              f"{'  (skipped: no speech)' if result['empty'] else ''}")
+
+    print(f"total: {total_in} -> {total_out} bytes ({1 - total_out / total_in:.1%} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Calibration of VALIDATION_ACCEPT_SCORE for the local validation tier against
+labelled answers (benchmarks/validation_examples.jsonl: question_id, answer,
+and whether the validator model should accept it).
+
+For each candidate threshold, reports how many valid answers the local tier
+would accept without a model call and how many invalid answers it would wrongly
+accept. Recommends the lowest threshold that accepts no invalid example, with a
+small margin above the best-scoring invalid one.
+
+Usage: python benchmarks/calibrate_validation.py [--examples PATH] [--plan PLAN_ID] [--margin 0.02]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AINO_DATA_DIR', tempfile.mkdtemp(prefix='calibrate_validation_'))
+
+from services.business_plan_service import get_compiled_plan
+from services.plan_registry import load_plan
+from services.validation_service import get_local_score, VALIDATION_ACCEPT_SCORE
+
+DEFAULT_EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'validation_examples.jsonl')
+
+
+def load_examples(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the local validation accept threshold.")
+    parser.add_argument("--examples", default=DEFAULT_EXAMPLES)
+    parser.add_argument("--plan", default=None)
+    parser.add_argument("--margin", type=float, default=0.02)
+    args = parser.parse_args()
+
+    plan = load_plan(args.plan)
+    questions = {question['id']: question for _, question, _ in get_compiled_plan(plan).questions}
+    examples = load_examples(args.examples)
+
+    scored = []
+    for example in examples:
+        score = get_local_score(example['answer'], questions[example['question_id']], plan)
+        scored.append((score, example['valid'], example['answer']))
+
+    valid_total = sum(1 for _, valid, _ in scored if valid)
+    invalid_total = len(scored) - valid_total
+    guarded = [answer for score, valid, answer in scored if score is None and not valid]
+    print(f"{len(scored)} examples ({valid_total} valid, {invalid_total} invalid); "
+          f"{len(guarded)} invalid answers are sent to the model by the echo/negation/question guards")
+
+    print(f"{'threshold':>9}  {'valid accepted':>14}  {'invalid accepted':>16}")
+    for step in range(5, 55, 5):
+        threshold = step / 100
+        accepted_valid = sum(1 for score, valid, _ in scored if valid and score is not None and score >= threshold)
+        accepted_invalid = sum(1 for score, valid, _ in scored if not valid and score is not None and score >= threshold)
+        print(f"{threshold:9.2f}  {accepted_valid:>7}/{valid_total:<6}  {accepted_invalid:>9}/{invalid_total:<6}")
+
+    leaked = [(score, answer) for score, valid, answer in scored if not valid and score is not None]
+    worst_score, worst_answer = max(leaked) if leaked else (0.0, None)
+    recommended = math.ceil((worst_score + args.margin) * 100) / 100
+    accepted_valid = sum(1 for score, valid, _ in scored if valid and score is not None and score >= recommended)
+    if worst_answer is not None:
+        print(f"best-scoring invalid answer past the guards: {worst_score:.3f} {worst_answer!r}")
+    print(f"recommended VALIDATION_ACCEPT_SCORE = {recommended:.2f} "
+          f"(accepts {accepted_valid}/{valid_total} valid answers locally; current setting {VALIDATION_ACCEPT_SCORE:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,57 @@ SMTP_PORT = 587
 SMTP_USERNAME = "api"
 SMTP_PASSWORD = "your-mailtrap-password-here"
 FROM_EMAIL = "hello@ainoespoo.com"
+
+SESSION_BACKEND = "memory"
+SESSION_DB_PATH = ""
+SESSION_TTL_SECONDS = 86400
+SESSION_MAX_ENTRIES = 10000
+JOURNAL_COMPACT_BYTES = 65536
+
+REPORT_FILL_MODEL = "gpt-4o"
+REPORT_FILL_WORKERS = 6
+REPORT_RENDER_MODE = "local"
+DOCX_CONVERTER = "native"
+REPORT_CACHE_MEMORY_MB = 32
+REPORT_CACHE_DISK_MB = 0
+
+BUSINESS_PLAN_PATH = ""
+BUSINESS_PLAN_RELOAD_SECONDS = 1
+BUSINESS_PLAN_PICKLE_CACHE = False
+BUSINESS_PLANS_DIR = ""
+BUSINESS_PLAN_CACHE_MAX_ENTRIES = 8
+
+JOB_WORKERS = 2
+JOB_MAX_ATTEMPTS = 4
+JOB_RETRY_BASE_SECONDS = 5
+JOB_RETENTION_SECONDS = 86400
+
+SMTP_USE_TLS = True
+SMTP_POOL_SIZE = 4
+REPORT_EMAIL_BATCH_SIZE = 50
+
+TTS_MODEL = "tts-1"
+TTS_VOICE = "alloy"
+TTS_CACHE_MEMORY_MB = 32
+TTS_CACHE_DISK_MB = 512
+TTS_PREWARM = False
+TTS_FORMAT = "mp3"
+TTS_SYNTH_WORKERS = 4
+
+TRANSCRIBE_PARTIAL_INTERVAL = 2.0
+TRANSCRIBE_WORKERS = 2
+AUDIO_PREPROCESS = True
+
+VALIDATION_LOCAL_TIER = True
+VALIDATION_ACCEPT_SCORE = 0.17
+VALIDATION_CACHE_TTL_SECONDS = 604800
+VALIDATION_CACHE_MAX_ENTRIES = 50000
+
+HISTORY_TOKEN_BUDGET = 1000
+HISTORY_MAX_MESSAGES = 40
+HISTORY_SUMMARY_MODEL = "gpt-4o-mini"
+
+OPENAI_BASE_URL = ""
+OPENAI_MAX_CONNECTIONS = 20
+OPENAI_BREAKER_THRESHOLD = 5
+OPENAI_BREAKER_RESET_SECONDS = 30
@@ -7,6 +7,9 @@ FORM_STEPS = [
     {'id': 'location', 'label': 'Location', 'completed': False},
 ]
 
+WELCOME_MESSAGE = ("Hello! I'm here to help you complete your business information form. "
+                   "Let's start with your company name. What would you like to call your company?")
+
 TIERS = [
     {'id': 'beginner', 'name': 'Beginner', 'points_required': 0, 'icon': '🌱'},
     {'id': 'motivated_entrepreneur', 'name': 'Motivated Entrepreneur', 'points_required': 3, 'icon': '🚀'},
@@ -15,3 +18,12 @@ TIERS = [
     {'id': 'master_entrepreneur', 'name': 'Master Entrepreneur', 'points_required': 20, 'icon': '👑'}
 ]
 
+
+# Report template heading for each answer of the initial form. Plan questions carry their own `report_section`.
+REPORT_FORM_FIELD_SECTIONS = {
+    'Company Name': 'Business Plan',
+    'Business Sphere / Industry': 'Background information',
+    'Location': 'Background information',
+    'Education': '2. Competence / skills',
+    'Experience / Background': '2. Competence / skills',
+}
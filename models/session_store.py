@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemorySessionStore:
+    """In-process session store with LRU eviction and a TTL per session."""
+
+    def __init__(self, max_sessions=10000, ttl_seconds=86400):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at < time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return state
+
+    def save(self, session_id, state):
+        with self._lock:
+            self._sessions[session_id] = (time.time() + self.ttl_seconds, state)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """Session store backed by a SQLite file, shared by all workers on a node."""
+
+    PURGE_INTERVAL = 300
+
+    def __init__(self, db_path, ttl_seconds=86400):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._last_purge = 0
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, '
+            'data TEXT NOT NULL, '
+            'expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)')
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT data FROM sessions WHERE session_id = ? AND expires_at >= ?',
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def save(self, session_id, state):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)',
+            (session_id, json.dumps(state), now + self.ttl_seconds)
+        )
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            conn.execute('DELETE FROM sessions WHERE expires_at < ?', (now,))
+            self._last_purge = now
+        conn.commit()
+
+    def delete(self, session_id):
+        conn = self._connect()
+        conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        conn.commit()
+
+    def __len__(self):
+        conn = self._connect()
+        return conn.execute('SELECT COUNT(*) FROM sessions WHERE expires_at >= ?', (time.time(),)).fetchone()[0]
+
+
+def create_session_store(backend, db_path=None, ttl_seconds=86400, max_sessions=10000):
+    if backend == 'memory':
+        return MemorySessionStore(max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(db_path, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -1,14 +1,63 @@
-from services.business_plan_service import load_business_plan_from_yaml
+import os
+from services.business_plan_service import new_plan_progress
+from services.plan_registry import load_plan, DEFAULT_PLAN_ID
+from models.session_store import create_session_store
+from services.yaml_service import delete_journal
+from services.history_service import cancel_history_compaction
+from services.docx_service import report_cache
+from utils.helpers import get_data_dir
 
-form_data = {}
-chat_history = []
-question_retries = {}
-business_plan_sections = load_business_plan_from_yaml()
+try:
+    from config.config import SESSION_BACKEND, SESSION_DB_PATH, SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES
+except ImportError:
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')
+    SESSION_DB_PATH = os.environ.get('SESSION_DB_PATH', '')
+    SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', 86400))
+    SESSION_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', 10000))
 
+session_store = create_session_store(
+    SESSION_BACKEND,
+    db_path=SESSION_DB_PATH or os.path.join(get_data_dir(), 'sessions.db'),
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_sessions=SESSION_MAX_ENTRIES
+)
 
-def reset_state():
-    global form_data, chat_history, question_retries
-    form_data = {}
-    chat_history = []
-    question_retries = {}
 
+def new_state(plan_id=DEFAULT_PLAN_ID):
+    return {
+        'form_data': {},
+        'chat_history': [],
+        'history_summary': '',
+        'question_retries': {},
+        'plan_id': plan_id,
+        'plan_progress': new_plan_progress({}, load_plan(plan_id))
+    }
+
+
+def load_state(session_id):
+    state = session_store.get(session_id)
+    if state is None:
+        state = new_state()
+    state.setdefault('history_summary', '')
+    state.setdefault('plan_id', DEFAULT_PLAN_ID)
+    return state
+
+
+def get_state_plan(state):
+    """The session's plan, loaded on first use, with plan_progress recounted if the plan changed."""
+    business_plan_sections = load_plan(state['plan_id'])
+    # The cursor and counters index the plan they were computed against.
+    if state.get('plan_progress', {}).get('plan_version') != getattr(business_plan_sections, 'version', None):
+        state['plan_progress'] = new_plan_progress(state['form_data'], business_plan_sections)
+    return business_plan_sections
+
+
+def save_state(session_id, state):
+    session_store.save(session_id, state)
+
+
+def reset_state(session_id):
+    session_store.delete(session_id)
+    cancel_history_compaction(session_id)
+    report_cache.invalidate_session(session_id)
+    delete_journal(session_id)
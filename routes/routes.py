@@ -1,36 +1,97 @@
-from flask import render_template, request, jsonify, send_file
+from flask import render_template, request, jsonify, send_file, g, Response, stream_with_context
+import asyncio
 import re
 import base64
-import os
-from constants import FORM_STEPS, TIERS
-from models.state import form_data, chat_history, question_retries, business_plan_sections, reset_state
-from services.business_plan_service import (
-    is_initial_form_complete,
-    get_current_business_plan_question,
-    get_business_plan_progress,
-    calculate_points,
-    get_current_tier
-)
-from services.validation_service import validate_answer, is_gibberish
-from services.chat_service import get_openai_response, get_tts_audio, transcribe_audio
-from services.email_service import send_report_email
-from services.yaml_service import update_yaml_with_answer, get_yaml_path
-from services.docx_service import create_docx_from_form_data
+import io
+import json
+import uuid
+from urllib.parse import urlencode
+from constants import FORM_STEPS, WELCOME_MESSAGE
+from models.state import load_state, save_state, reset_state, get_state_plan
+from services.business_plan_service import get_business_plan_progress, get_loaded_plan_count
+from services.plan_registry import load_plan, get_plan_ids, is_known_plan
+from services.conversation_service import prepare_turn, finalize_turn, EMAIL_PATTERN
+from services.async_chat_service import run_turn_async
+from services.chat_service import get_openai_response, stream_openai_response, get_tts_audio, stream_tts_audio, transcribe_audio, tts_cache, TTS_FORMAT, TTS_MIMETYPES
+from services.transcription_service import append_recording_chunk, finish_recording, RecordingSequenceError
+from services.speech_service import SentenceSplitter, prefetch_sentence_audio, start_tts_prewarm
+from services.job_service import get_job, start_workers
+from services.validation_service import get_validation_stats
+from services.usage_service import get_usage_stats
+from services.openai_client import get_breaker_stats, run_async
+from services.report_jobs import enqueue_build_report, enqueue_send_report, get_job_report_bytes
+from services.docx_service import get_report_bytes, report_cache, REPORT_MIMETYPES
+from services.yaml_service import materialize_filled_yaml
+
+SESSION_COOKIE_NAME = 'aino_session'
+SESSION_HEADER_NAME = 'X-Session-ID'
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+RECORDING_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def get_session_id():
+    if 'session_id' in g:
+        return g.session_id
+    session_id = request.headers.get(SESSION_HEADER_NAME) or request.cookies.get(SESSION_COOKIE_NAME)
+    if not session_id or not SESSION_ID_PATTERN.match(session_id):
+        session_id = uuid.uuid4().hex
+        g.new_session = True
+    g.session_id = session_id
+    return session_id
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 def register_routes(app):
+    start_workers()
+    start_tts_prewarm(load_plan())
+    
+    @app.after_request
+    def set_session_cookie(response):
+        if g.get('new_session'):
+            response.set_cookie(SESSION_COOKIE_NAME, g.session_id, httponly=True, samesite='Lax')
+            response.headers[SESSION_HEADER_NAME] = g.session_id
+        return response
+
     @app.route('/')
     def index():
-        return render_template('index.html', steps=FORM_STEPS)
+        return render_template('index.html', steps=FORM_STEPS, welcome_message=WELCOME_MESSAGE)
 
     @app.route('/api/business-plan-structure', methods=['GET'])
     def get_business_plan_structure():
         empty_form_data = {}
-        business_plan_progress = get_business_plan_progress(empty_form_data, business_plan_sections)
+        business_plan_progress = get_business_plan_progress(empty_form_data, get_state_plan(load_state(get_session_id())))
         return jsonify({
             'business_plan_progress': business_plan_progress
         })
 
+    @app.route('/api/plans', methods=['GET'])
+    def list_plans():
+        return jsonify({
+            'plans': get_plan_ids(),
+            'current': load_state(get_session_id())['plan_id']
+        })
+
+    @app.route('/api/plan', methods=['POST'])
+    def select_plan():
+        data = request.json or {}
+        plan_id = data.get('plan_id', '')
+        if not is_known_plan(plan_id):
+            return jsonify({'error': f'Unknown plan: {plan_id}'}), 404
+
+        session_id = get_session_id()
+        state = load_state(session_id)
+        state['plan_id'] = plan_id
+        business_plan_sections = get_state_plan(state)
+        save_state(session_id, state)
+        return jsonify({
+            'success': True,
+            'plan_id': plan_id,
+            'business_plan_progress': get_business_plan_progress(state['form_data'], business_plan_sections)
+        })
+
     @app.route('/api/chat', methods=['POST'])
     def chat():
         data = request.json
@@ -39,145 +100,108 @@ def register_routes(app):
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
-        initial_form_complete = is_initial_form_complete(form_data)
-        current_step = None
-        answer_valid = True
-        question_info = None
-        is_retry = False
-        is_skipping = False
-        
-        if not initial_form_complete:
-            for step in FORM_STEPS:
-                if not form_data.get(step['id']):
-                    current_step = step['id']
-                    break
-            
-            user_message_clean = user_message.strip()
-            
-            is_nonsensical = False
-            if len(user_message_clean) > 3:
-                if user_message_clean.isdigit() or user_message_clean.replace(' ', '').isdigit():
-                    is_nonsensical = True
-                elif len(set(user_message_clean.replace(' ', ''))) < 3 and len(user_message_clean) > 5:
-                    is_nonsensical = True
-                elif is_gibberish(user_message_clean):
-                    is_nonsensical = True
-            
-            if is_nonsensical:
-                is_retry = True
-            elif current_step == 'company_name' and len(user_message_clean) > 1:
-                form_data['company_name'] = user_message
-            elif current_step == 'language':
-                lang_map = {
-                    'english': 'English',
-                    'spanish': 'Spanish',
-                    'french': 'French',
-                    'german': 'German'
-                }
-                user_lower = user_message.lower()
-                for key, value in lang_map.items():
-                    if key in user_lower:
-                        form_data['language'] = value
-                        break
-                if not form_data.get('language'):
-                    form_data['language'] = user_message
-            elif current_step == 'sphere' and len(user_message_clean) > 2:
-                form_data['sphere'] = user_message
-            elif current_step == 'education' and len(user_message_clean) > 2:
-                form_data['education'] = user_message
-            elif current_step == 'experience' and len(user_message_clean) > 0:
-                form_data['experience'] = user_message
-            elif current_step == 'location' and len(user_message_clean) > 2:
-                form_data['location'] = user_message
-        else:
-            section, question, question_type = get_current_business_plan_question(form_data, business_plan_sections)
-            if section and question:
-                current_step = f"bp_{question['id']}"
-                question_info = question
-                
-                if len(user_message.strip()) > 2:
-                    answer_valid = validate_answer(user_message, current_step, question_info)
-                    
-                    if answer_valid:
-                        form_data[question['id']] = user_message
-                        yaml_path = get_yaml_path()
-                        update_yaml_with_answer(yaml_path, question['label'], user_message)
-                        if current_step in question_retries:
-                            del question_retries[current_step]
-                    else:
-                        retry_count = question_retries.get(current_step, 0)
-                        if retry_count < 1:
-                            question_retries[current_step] = retry_count + 1
-                            is_retry = True
-                        else:
-                            if current_step in question_retries:
-                                del question_retries[current_step]
-                            form_data[question['id']] = ''
-                            section, next_question, _ = get_current_business_plan_question(form_data, business_plan_sections)
-                            if next_question:
-                                current_step = f"bp_{next_question['id']}"
-                                is_skipping = True
-            else:
-                current_step = 'bp_complete'
-        
-        if not form_data.get('email'):
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            email_match = re.search(email_pattern, user_message)
-            if email_match:
-                form_data['email'] = email_match.group()
-            elif '@' in user_message and len(user_message.strip()) > 5:
-                potential_email = user_message.strip()
-                if '.' in potential_email.split('@')[1] if '@' in potential_email else False:
-                    form_data['email'] = potential_email
+        session_id = get_session_id()
+        state = load_state(session_id)
+        business_plan_sections = get_state_plan(state)
         
-        if current_step is None:
-            current_step = 'complete' if not initial_form_complete else 'bp_complete'
+        turn = prepare_turn(session_id, user_message, state, business_plan_sections)
         
         response = get_openai_response(
             user_message, 
-            current_step, 
-            form_data, 
-            chat_history, 
+            turn['current_step'], 
+            state['form_data'], 
+            state['chat_history'], 
             business_plan_sections,
-            is_retry=is_retry, 
-            is_skipping=is_skipping
+            is_retry=turn['is_retry'], 
+            is_skipping=turn['is_skipping'],
+            plan_progress=state['plan_progress'],
+            history_summary=state['history_summary']
         )
         
-        completed_steps = []
-        for step in FORM_STEPS:
-            if form_data.get(step['id']):
-                completed_steps.append(step['id'])
+        payload = finalize_turn(session_id, turn, state, business_plan_sections, response['message'])
+        save_state(session_id, state)
         
-        business_plan_progress = get_business_plan_progress(form_data, business_plan_sections)
+        return jsonify(payload)
+
+    @app.route('/api/chat/async', methods=['POST'])
+    async def chat_async():
+        data = request.json
+        user_message = data.get('message', '').strip()
         
-        email_collected = form_data.get('email') is not None
-        report_sent = False
+        if not user_message:
+            return jsonify({'error': 'Message is required'}), 400
         
-        if email_collected and initial_form_complete and not form_data.get('report_sent'):
-            section, question, _ = get_current_business_plan_question(form_data, business_plan_sections)
-            if not section:
-                try:
-                    send_report_email(form_data, business_plan_sections)
-                    form_data['report_sent'] = True
-                    report_sent = True
-                except Exception as e:
-                    print(f"Error sending email: {str(e)}")
+        session_id = get_session_id()
+        state = load_state(session_id)
+        business_plan_sections = get_state_plan(state)
         
-        points = calculate_points(form_data, business_plan_sections)
-        current_tier = get_current_tier(points, TIERS)
+        turn, response = await run_async(run_turn_async(session_id, user_message, state, business_plan_sections))
         
-        return jsonify({
-            'response': response['message'],
-            'completed_steps': completed_steps,
-            'business_plan_progress': business_plan_progress,
-            'initial_form_complete': initial_form_complete,
-            'form_data': form_data.copy(),
-            'email_collected': email_collected,
-            'report_sent': report_sent,
-            'points': points,
-            'current_tier': current_tier['id'],
-            'tiers': TIERS
-        })
+        payload = await asyncio.to_thread(finalize_turn, session_id, turn, state, business_plan_sections, response['message'])
+        save_state(session_id, state)
+        
+        return jsonify(payload)
+
+    @app.route('/api/chat/stream', methods=['POST'])
+    def chat_stream():
+        data = request.json
+        user_message = data.get('message', '').strip()
+        
+        if not user_message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        session_id = get_session_id()
+        state = load_state(session_id)
+        business_plan_sections = get_state_plan(state)
+        
+        turn = prepare_turn(session_id, user_message, state, business_plan_sections)
+        voice = bool(data.get('voice'))
+        
+        def sentence_event(index, sentence):
+            # Synthesis starts now on the bounded pool; the client's GET of audio_url picks up the result.
+            prefetch_sentence_audio(sentence)
+            return format_sse('sentence', {
+                'index': index,
+                'text': sentence,
+                'audio_url': f"/api/tts/stream?{urlencode({'text': sentence})}"
+            })
+        
+        def generate():
+            parts = []
+            splitter = SentenceSplitter()
+            sentence_count = 0
+            for token in stream_openai_response(
+                user_message,
+                turn['current_step'],
+                state['form_data'],
+                state['chat_history'],
+                business_plan_sections,
+                is_retry=turn['is_retry'],
+                is_skipping=turn['is_skipping'],
+                plan_progress=state['plan_progress'],
+                history_summary=state['history_summary']
+            ):
+                parts.append(token)
+                yield format_sse('token', {'text': token})
+                if voice:
+                    for sentence in splitter.feed(token):
+                        yield sentence_event(sentence_count, sentence)
+                        sentence_count += 1
+            
+            if voice:
+                for sentence in splitter.flush():
+                    yield sentence_event(sentence_count, sentence)
+                    sentence_count += 1
+            
+            payload = finalize_turn(session_id, turn, state, business_plan_sections, ''.join(parts).strip())
+            save_state(session_id, state)
+            yield format_sse('done', payload)
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
     @app.route('/api/tts', methods=['POST'])
     def text_to_speech():
@@ -193,7 +217,7 @@ def register_routes(app):
             
             return jsonify({
                 'audio': audio_base64,
-                'format': 'mp3'
+                'format': TTS_FORMAT
             })
         except Exception as e:
             import traceback
@@ -201,6 +225,51 @@ def register_routes(app):
             print(f"TTS error: {error_details}")
             return jsonify({'error': f'TTS failed: {str(e)}'}), 500
 
+    @app.route('/api/tts/stream', methods=['GET', 'POST'])
+    def text_to_speech_stream():
+        if request.method == 'POST':
+            text = (request.get_json(silent=True) or {}).get('text', '')
+        else:
+            text = request.args.get('text', '')
+        text = text.strip()
+        
+        if not text:
+            return jsonify({'error': 'Text is required'}), 400
+        
+        audio_stream = stream_tts_audio(text)
+        try:
+            # Pull the first chunk before committing to a 200 so upstream failures still get a JSON error.
+            first_chunk = next(audio_stream, b'')
+        except Exception as e:
+            import traceback
+            error_details = traceback.format_exc()
+            print(f"TTS error: {error_details}")
+            return jsonify({'error': f'TTS failed: {str(e)}'}), 500
+        
+        def generate():
+            try:
+                yield first_chunk
+                yield from audio_stream
+            finally:
+                audio_stream.close()
+        
+        return Response(
+            generate(),
+            mimetype=TTS_MIMETYPES.get(TTS_FORMAT, 'application/octet-stream'),
+            headers={'Cache-Control': 'private, max-age=86400', 'X-Accel-Buffering': 'no'}
+        )
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        return jsonify({
+            'tts_cache': tts_cache.get_stats(),
+            'validation': get_validation_stats(),
+            'openai_usage': get_usage_stats(),
+            'openai_circuits': get_breaker_stats(),
+            'report_cache': report_cache.get_stats(),
+            'business_plans': {'loaded': get_loaded_plan_count(), 'available': len(get_plan_ids())}
+        })
+
     @app.route('/api/transcribe', methods=['POST'])
     def transcribe():
         if 'audio' not in request.files:
@@ -219,79 +288,141 @@ def register_routes(app):
             print(f"Transcription error: {error_details}")
             return jsonify({'error': f'Transcription failed: {str(e)}'}), 500
 
+    @app.route('/api/transcribe/chunk', methods=['POST'])
+    def transcribe_chunk():
+        recording_id = request.form.get('recording_id', '')
+        if not RECORDING_ID_PATTERN.match(recording_id):
+            return jsonify({'error': 'A valid recording_id is required'}), 400
+        
+        try:
+            seq = int(request.form.get('seq', ''))
+        except ValueError:
+            seq = None
+        final = request.form.get('final') in ('1', 'true')
+        audio_file = request.files.get('audio')
+        session_id = get_session_id()
+        
+        try:
+            partial_text = ''
+            if audio_file is not None:
+                if seq is None:
+                    return jsonify({'error': 'seq is required with an audio chunk'}), 400
+                partial_text = append_recording_chunk(session_id, recording_id, seq, audio_file.stream, audio_file.mimetype)
+            
+            if not final:
+                return jsonify({'text': partial_text, 'final': False})
+            
+            transcription = finish_recording(session_id, recording_id)
+            if transcription is None:
+                return jsonify({'error': 'Unknown recording'}), 404
+            return jsonify({'text': transcription, 'final': True})
+        except RecordingSequenceError as e:
+            return jsonify({'error': str(e)}), 409
+        except Exception as e:
+            import traceback
+            error_details = traceback.format_exc()
+            print(f"Transcription error: {error_details}")
+            return jsonify({'error': f'Transcription failed: {str(e)}'}), 500
+
     @app.route('/api/send-report', methods=['POST'])
     def send_report_manual():
         data = request.json
         email = data.get('email', '').strip() if data else ''
         
+        session_id = get_session_id()
+        state = load_state(session_id)
+        form_data = state['form_data']
+        
         if not email:
             if form_data.get('email'):
                 email = form_data['email']
             else:
                 return jsonify({'error': 'Email address is required. Please provide your email first.'}), 400
         
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        if not re.match(email_pattern, email):
+        if not re.match(EMAIL_PATTERN, email):
             return jsonify({'error': 'Invalid email address format.'}), 400
         
         report_data = form_data.copy()
         report_data['email'] = email
         
         try:
-            send_report_email(report_data, business_plan_sections)
+            job_id = enqueue_send_report(session_id, report_data, state['plan_id'])
             if not form_data.get('email'):
                 form_data['email'] = email
-            return jsonify({'success': True, 'message': 'Report sent successfully!'})
+                save_state(session_id, state)
+            return jsonify({'success': True, 'job_id': job_id, 'message': 'Report queued for delivery.'}), 202
         except Exception as e:
             return jsonify({'error': f'Failed to send report: {str(e)}'}), 500
 
+    @app.route('/api/build-report', methods=['POST'])
+    def build_report():
+        session_id = get_session_id()
+        state = load_state(session_id)
+        form_data = state['form_data']
+        if not form_data:
+            return jsonify({'error': 'Please start a conversation and answer some questions first.'}), 400
+        job_id = enqueue_build_report(session_id, form_data, state['plan_id'])
+        return jsonify({'success': True, 'job_id': job_id}), 202
+
+    @app.route('/api/report-status', methods=['GET'])
+    def report_status():
+        job_id = request.args.get('job_id', '')
+        job = get_job(job_id, session_id=get_session_id()) if job_id else None
+        if job is None:
+            return jsonify({'error': 'Unknown job id.'}), 404
+        job.pop('result', None)
+        job.pop('payload', None)
+        return jsonify(job)
+
     @app.route('/api/download-report', methods=['GET'])
     def download_report():
-        docx_path = None
+        job_id = request.args.get('job_id')
+        if job_id:
+            job = get_job(job_id, session_id=get_session_id())
+            if job is None:
+                return jsonify({'error': 'Unknown job id.'}), 404
+            if job['status'] != 'succeeded' or job['type'] != 'build_report':
+                return jsonify({'error': 'Report is not ready yet.', 'status': job['status']}), 409
+            return send_file(
+                io.BytesIO(get_job_report_bytes(job['payload'])),
+                mimetype=REPORT_MIMETYPES['docx'],
+                as_attachment=True,
+                download_name='business_plan.docx'
+            )
+        
+        report_format = request.args.get('format', 'docx')
+        if report_format not in REPORT_MIMETYPES:
+            return jsonify({'error': f'Unsupported format: {report_format}'}), 400
+        
         try:
-            print(f"DEBUG ROUTE: form_data id: {id(form_data)}, type: {type(form_data)}")
-            print(f"DEBUG ROUTE: form_data contents: {form_data}")
-            print(f"DEBUG ROUTE: form_data keys: {list(form_data.keys())}")
-            docx_path = create_docx_from_form_data(form_data, business_plan_sections)
-            
-            if docx_path and os.path.exists(docx_path):
-                def remove_file():
-                    try:
-                        if docx_path and os.path.exists(docx_path):
-                            os.remove(docx_path)
-                    except Exception as e:
-                        print(f"Error removing temporary DOCX file: {str(e)}")
-                
-                response = send_file(
-                    docx_path,
-                    mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                    as_attachment=True,
-                    download_name='business_plan.docx'
-                )
-                
-                try:
-                    if hasattr(response, 'call_on_close'):
-                        response.call_on_close(remove_file)
-                except:
-                    import threading
-                    threading.Timer(30.0, remove_file).start()
-                
-                return response
-            else:
-                return jsonify({'error': 'Failed to generate document'}), 500
+            session_id = get_session_id()
+            state = load_state(session_id)
+            form_data = state['form_data']
+            report = get_report_bytes(form_data, get_state_plan(state), report_format, session_id)
+            return send_file(
+                io.BytesIO(report),
+                mimetype=REPORT_MIMETYPES[report_format],
+                as_attachment=True,
+                download_name=f'business_plan.{report_format}'
+            )
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
             print(f"Document download error: {error_details}")
-            if docx_path and os.path.exists(docx_path):
-                try:
-                    os.remove(docx_path)
-                except:
-                    pass
             return jsonify({'error': f'Failed to generate document: {str(e)}'}), 500
 
+    @app.route('/api/download-answers', methods=['GET'])
+    def download_answers():
+        session_id = get_session_id()
+        filled_yaml = materialize_filled_yaml(session_id, get_state_plan(load_state(session_id)).path)
+        return Response(
+            filled_yaml,
+            mimetype='application/x-yaml',
+            headers={'Content-Disposition': 'attachment; filename=business_plan_answers.yaml'}
+        )
+
     @app.route('/api/reset', methods=['POST'])
     def reset():
-        reset_state()
+        reset_state(get_session_id())
         return jsonify({'success': True})
 
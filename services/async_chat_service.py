@@ -0,0 +1,184 @@
+import asyncio
+import copy
+from services.business_plan_service import is_initial_form_complete, get_current_business_plan_question
+from services.chat_service import build_chat_messages, record_exchange, get_next_step, get_canned_reply
+from services.usage_service import record_usage
+from services.openai_client import call_openai_async, CircuitOpenError
+from services.history_service import apply_history_summary
+from services.conversation_service import (
+    apply_initial_form_answer,
+    apply_business_plan_answer,
+    answer_needs_validation,
+    build_turn,
+    persist_answer
+)
+from services.validation_service import (
+    classify_answer_locally,
+    build_validation_messages,
+    parse_validation_reply,
+    record_validation_decision,
+    store_verdict
+)
+
+async def validate_answer_with_llm_async(user_message, question_info):
+    try:
+        response = await call_openai_async('validation', lambda client: client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=build_validation_messages(user_message, question_info),
+            temperature=0.3,
+            max_tokens=10
+        ))
+        record_usage('validation', response)
+
+        answer_valid = parse_validation_reply(response)
+    except CircuitOpenError:
+        record_validation_decision('circuit_open')
+        return True
+    except Exception as e:
+        print(f"Validation error: {str(e)}")
+        record_validation_decision('llm_error')
+        return True
+
+    await asyncio.to_thread(store_verdict, user_message, question_info, answer_valid)
+    return answer_valid
+
+
+async def validate_answer_async(user_message, current_step, question_info=None, business_plan_sections=None):
+    if not question_info:
+        return True
+
+    local_verdict = await asyncio.to_thread(classify_answer_locally, user_message, question_info, business_plan_sections)
+    if local_verdict is not None:
+        return local_verdict
+
+    return await validate_answer_with_llm_async(user_message, question_info)
+
+
+async def get_openai_response_async(user_message, current_step, form_data, chat_history, business_plan_sections, is_retry=False, is_skipping=False, plan_progress=None, history_summary=''):
+    try:
+        messages = build_chat_messages(
+            user_message, current_step, form_data, chat_history, business_plan_sections,
+            is_retry=is_retry, is_skipping=is_skipping, plan_progress=plan_progress,
+            history_summary=history_summary
+        )
+
+        response = await call_openai_async('chat', lambda client: client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=200
+        ))
+        record_usage('chat', response)
+
+        ai_message = response.choices[0].message.content.strip()
+
+        record_exchange(chat_history, user_message, ai_message)
+
+        return {'message': ai_message, 'step': get_next_step(current_step, user_message)}
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Chat API error, serving canned reply: {type(e).__name__}: {str(e)}")
+        ai_message = get_canned_reply(current_step, form_data, business_plan_sections, is_retry=is_retry, plan_progress=plan_progress)
+        record_exchange(chat_history, user_message, ai_message)
+        return {'message': ai_message, 'step': current_step}
+
+
+async def reply_for_turn(user_message, state, turn, business_plan_sections):
+    return await get_openai_response_async(
+        user_message,
+        turn['current_step'],
+        state['form_data'],
+        state['chat_history'],
+        business_plan_sections,
+        is_retry=turn['is_retry'],
+        is_skipping=turn['is_skipping'],
+        plan_progress=state['plan_progress'],
+        history_summary=state['history_summary']
+    )
+
+
+def speculate_branch(user_message, state, question, answer_valid, business_plan_sections):
+    branch_state = copy.deepcopy(state)
+    current_step, is_retry, is_skipping = apply_business_plan_answer(
+        user_message, question, answer_valid, branch_state, business_plan_sections
+    )
+    turn = build_turn(user_message, branch_state, current_step, True, is_retry, is_skipping)
+    return branch_state, turn
+
+
+async def run_turn_async(session_id, user_message, state, business_plan_sections):
+    apply_history_summary(session_id, state)
+    form_data = state['form_data']
+    local_verdict = None
+
+    if is_initial_form_complete(form_data):
+        section, question, _ = get_current_business_plan_question(
+            form_data, business_plan_sections, state['plan_progress']
+        )
+        if section and question and answer_needs_validation(user_message):
+            local_verdict = await asyncio.to_thread(classify_answer_locally, user_message, question, business_plan_sections)
+            if local_verdict is None:
+                return await run_speculative_turn(session_id, user_message, state, question, business_plan_sections)
+
+    # No LLM validation needed: resolve the turn locally and make a single reply call.
+    if not is_initial_form_complete(form_data):
+        current_step, is_retry = apply_initial_form_answer(user_message, form_data)
+        turn = build_turn(user_message, state, current_step, False, is_retry)
+    else:
+        section, question, _ = get_current_business_plan_question(
+            form_data, business_plan_sections, state['plan_progress']
+        )
+        if section and question:
+            answer_valid = True
+            if answer_needs_validation(user_message):
+                answer_valid = local_verdict
+            current_step, is_retry, is_skipping = apply_business_plan_answer(
+                user_message, question, answer_valid, state, business_plan_sections
+            )
+            turn = build_turn(user_message, state, current_step, True, is_retry, is_skipping)
+            if answer_valid and answer_needs_validation(user_message):
+                await asyncio.to_thread(persist_answer, session_id, question, user_message)
+        else:
+            turn = build_turn(user_message, state, 'bp_complete', True)
+
+    response = await reply_for_turn(user_message, state, turn, business_plan_sections)
+    return turn, response
+
+
+async def run_speculative_turn(session_id, user_message, state, question, business_plan_sections):
+    # The validation verdict only selects between two outcomes, so both replies are
+    # generated while validation is in flight and the losing one is discarded.
+    accepted_state, accepted_turn = speculate_branch(user_message, state, question, True, business_plan_sections)
+    rejected_state, rejected_turn = speculate_branch(user_message, state, question, False, business_plan_sections)
+
+    validation_task = asyncio.create_task(
+        validate_answer_with_llm_async(user_message, question)
+    )
+    accepted_task = asyncio.create_task(
+        reply_for_turn(user_message, accepted_state, accepted_turn, business_plan_sections)
+    )
+    rejected_task = asyncio.create_task(
+        reply_for_turn(user_message, rejected_state, rejected_turn, business_plan_sections)
+    )
+
+    answer_valid = await validation_task
+    if answer_valid:
+        chosen_state, chosen_turn, chosen_task, discarded_task = accepted_state, accepted_turn, accepted_task, rejected_task
+    else:
+        chosen_state, chosen_turn, chosen_task, discarded_task = rejected_state, rejected_turn, rejected_task, accepted_task
+
+    discarded_task.cancel()
+    response = await chosen_task
+    try:
+        await discarded_task
+    except asyncio.CancelledError:
+        pass
+
+    state.clear()
+    state.update(chosen_state)
+    if answer_valid:
+        await asyncio.to_thread(persist_answer, session_id, question, user_message)
+
+    return chosen_turn, response
@@ -0,0 +1,222 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from contextlib import contextmanager
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from config.config import AUDIO_PREPROCESS
+except ImportError:
+    AUDIO_PREPROCESS = os.environ.get('AUDIO_PREPROCESS', 'true').lower() in ('1', 'true', 'yes')
+
+FFMPEG_PATH = shutil.which('ffmpeg')
+TARGET_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+VAD_PADDING_MS = 250
+VAD_MIN_SPEECH_MS = 150
+VAD_FLOOR_DBFS = -50.0
+VAD_NOISE_MARGIN_DB = 12.0
+FFMPEG_TIMEOUT_SECONDS = 30
+
+
+def is_wav(content_type, filename):
+    base_type = (content_type or '').split(';')[0].strip()
+    return base_type in ('audio/wav', 'audio/x-wav', 'audio/wave') or (filename or '').lower().endswith('.wav')
+
+
+def decode_wav(file_obj):
+    with wave.open(file_obj, 'rb') as wav:
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 2147483648
+    else:
+        return None, None
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, sample_rate, TARGET_SAMPLE_RATE), TARGET_SAMPLE_RATE
+
+
+def resample(samples, source_rate, target_rate):
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    if source_rate % target_rate == 0:
+        # Block-averaging doubles as a crude low-pass filter, which is plenty for speech recognition.
+        factor = source_rate // target_rate
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1)
+    target_length = int(len(samples) * target_rate / source_rate)
+    positions = np.linspace(0, len(samples) - 1, target_length)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+@contextmanager
+def readable_fd(file_obj):
+    # ffmpeg reads from stdin, which needs a real file descriptor; in-memory spools are copied out first.
+    file_obj.seek(0)
+    try:
+        file_obj.fileno()
+        yield file_obj
+        return
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    with tempfile.TemporaryFile() as spool:
+        shutil.copyfileobj(file_obj, spool, 64 * 1024)
+        spool.seek(0)
+        yield spool
+
+
+def decode_with_ffmpeg(file_obj):
+    with readable_fd(file_obj) as source:
+        result = subprocess.run(
+            [FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+             '-ac', '1', '-ar', str(TARGET_SAMPLE_RATE), '-f', 's16le', 'pipe:1'],
+            stdin=source, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            timeout=FFMPEG_TIMEOUT_SECONDS, check=True
+        )
+    return np.frombuffer(result.stdout, dtype='<i2').astype(np.float32) / 32768, TARGET_SAMPLE_RATE
+
+
+def decode_audio(file_obj, filename, content_type):
+    """Decode to mono float32 at TARGET_SAMPLE_RATE, or return (None, None) if no decoder fits."""
+    if np is None:
+        return None, None
+    if is_wav(content_type, filename):
+        file_obj.seek(0)
+        return decode_wav(file_obj)
+    if FFMPEG_PATH:
+        return decode_with_ffmpeg(file_obj)
+    return None, None
+
+
+def frame_energies_db(samples, sample_rate, frame_ms=VAD_FRAME_MS):
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32), frame_length
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), frame_length
+
+
+def detect_speech(samples, sample_rate):
+    """Return (start, end) sample bounds of the speech region, or None if the clip is silent.
+
+    A frame counts as speech when it is both above an absolute floor and well above the
+    clip's own noise floor (its 10th-percentile frame energy), so quiet rooms and noisy
+    rooms are handled without tuning.
+    """
+    energies, frame_length = frame_energies_db(samples, sample_rate)
+    if len(energies) == 0:
+        return None
+    noise_floor = np.percentile(energies, 10)
+    threshold = max(VAD_FLOOR_DBFS, noise_floor + VAD_NOISE_MARGIN_DB)
+    speech_frames = np.flatnonzero(energies > threshold)
+    min_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    if len(speech_frames) < min_frames:
+        return None
+    padding = sample_rate * VAD_PADDING_MS // 1000
+    start = max(0, speech_frames[0] * frame_length - padding)
+    end = min(len(samples), (speech_frames[-1] + 1) * frame_length + padding)
+    return int(start), int(end)
+
+
+def encode_wav(samples, sample_rate):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    output.seek(0)
+    return output, 'speech.wav', 'audio/wav'
+
+
+def encode_opus(samples, sample_rate):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    result = subprocess.run(
+        [FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-f', 's16le', '-ac', '1', '-ar', str(sample_rate),
+         '-i', 'pipe:0', '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip', '-f', 'ogg', 'pipe:1'],
+        input=pcm.tobytes(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        timeout=FFMPEG_TIMEOUT_SECONDS, check=True
+    )
+    return io.BytesIO(result.stdout), 'speech.ogg', 'audio/ogg'
+
+
+def encode_audio(samples, sample_rate):
+    if FFMPEG_PATH:
+        try:
+            return encode_opus(samples, sample_rate)
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"Opus encode failed, sending WAV: {str(e)}")
+    return encode_wav(samples, sample_rate)
+
+
+def get_stream_size(file_obj):
+    position = file_obj.tell()
+    size = file_obj.seek(0, io.SEEK_END)
+    file_obj.seek(position)
+    return size
+
+
+def preprocess_audio(file_obj, filename, content_type):
+    """Trim silence and shrink a recording before it is sent for transcription.
+
+    Returns a dict with the file to upload ('file', 'filename', 'content_type'), 'empty' when no
+    speech was found, and byte counts. When NumPy or a decoder is unavailable, or decoding fails,
+    the original upload is passed through untouched.
+    """
+    original_bytes = get_stream_size(file_obj)
+    result = {
+        'file': file_obj,
+        'filename': filename,
+        'content_type': content_type,
+        'empty': False,
+        'original_bytes': original_bytes,
+        'output_bytes': original_bytes,
+        'speech_seconds': None
+    }
+    if not AUDIO_PREPROCESS:
+        return result
+    try:
+        samples, sample_rate = decode_audio(file_obj, filename, content_type)
+    except (wave.Error, EOFError, subprocess.SubprocessError, OSError, ValueError) as e:
+        print(f"Audio decode failed, sending original: {str(e)}")
+        samples = None
+    file_obj.seek(0)
+    if samples is None:
+        return result
+
+    bounds = detect_speech(samples, sample_rate)
+    if bounds is None:
+        result.update(empty=True, output_bytes=0, speech_seconds=0.0)
+        return result
+
+    start, end = bounds
+    output, output_name, output_type = encode_audio(samples[start:end], sample_rate)
+    output_bytes = get_stream_size(output)
+    if output_bytes >= original_bytes:
+        result['speech_seconds'] = (end - start) / sample_rate
+        return result
+    result.update(
+        file=output,
+        filename=output_name,
+        content_type=output_type,
+        output_bytes=output_bytes,
+        speech_seconds=(end - start) / sample_rate
+    )
+    return result
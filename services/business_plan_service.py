@@ -1,120 +1,290 @@
+import hashlib
 import os
-import re
-from utils.helpers import slugify
+import pickle
+import threading
+import time
+from collections import OrderedDict
+import yaml
+from utils.helpers import slugify, get_data_dir
 from constants import FORM_STEPS
 
+try:
+    from config.config import BUSINESS_PLAN_PATH, BUSINESS_PLAN_RELOAD_SECONDS, BUSINESS_PLAN_PICKLE_CACHE
+except ImportError:
+    BUSINESS_PLAN_PATH = os.environ.get('BUSINESS_PLAN_PATH', '')
+    BUSINESS_PLAN_RELOAD_SECONDS = float(os.environ.get('BUSINESS_PLAN_RELOAD_SECONDS', 1))
+    BUSINESS_PLAN_PICKLE_CACHE = os.environ.get('BUSINESS_PLAN_PICKLE_CACHE', '').lower() in ('1', 'true', 'yes')
 
-def load_business_plan_from_yaml():
+try:
+    from config.config import BUSINESS_PLAN_CACHE_MAX_ENTRIES
+except ImportError:
+    BUSINESS_PLAN_CACHE_MAX_ENTRIES = int(os.environ.get('BUSINESS_PLAN_CACHE_MAX_ENTRIES', 8))
+
+# Bump when the compiled plan layout changes so stale pickles are ignored.
+PLAN_CACHE_VERSION = 2
+QUESTION_TYPES = (('core', 'core_questions'), ('optional', 'optional_questions'))
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+class FrozenDict(dict):
+    """A read-only dict, so a plan shared by every request cannot be changed by one of them."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('business plan entries are read-only')
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class BusinessPlan(tuple):
+    """The plan's sections, tagged with the fingerprint of the YAML they were compiled from."""
+
+    def __new__(cls, sections, fingerprint):
+        plan = super().__new__(cls, sections)
+        plan.fingerprint = fingerprint
+        plan.version = fingerprint[:12]
+        return plan
+
+    def __reduce__(self):
+        return (BusinessPlan, (tuple(self), self.fingerprint))
+
+
+def get_plan_path():
+    if BUSINESS_PLAN_PATH:
+        return BUSINESS_PLAN_PATH
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    yaml_path = os.path.join(base_dir, 'config', 'improved_business_plan.yaml')
-    
-    with open(yaml_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+    return os.path.join(base_dir, 'config', 'improved_business_plan.yaml')
+
+
+def parse_plan_document(text):
+    document = yaml.load(text, Loader=YAML_LOADER)
+    if not isinstance(document, dict) or not isinstance(document.get('sections'), list):
+        raise ValueError("business plan YAML needs a top-level 'sections' list")
+    return document
+
+
+def read_plan_document(yaml_path=None):
+    with open(yaml_path or get_plan_path(), 'rb') as f:
+        return parse_plan_document(f.read())
+
+
+def get_question_id(question):
+    return str(question.get('id') or slugify(question['label']))
+
+
+def get_section_questions(section, key):
+    questions = section.get(key) or []
+    for question in questions:
+        if not isinstance(question, dict) or not question.get('label'):
+            raise ValueError(f"every question in {section.get('title') or section.get('id')} needs a label")
+    return questions
+
+
+def iter_plan_questions(document):
+    """(section, question_type, question) for every question of a parsed plan document, in order."""
+    for section in document['sections']:
+        for question_type, key in QUESTION_TYPES:
+            for question in get_section_questions(section, key):
+                yield section, question_type, question
+
+
+def build_business_plan(document, fingerprint):
     sections = []
-    current_section = None
-    current_questions = []
-    is_optional = False
-    
-    lines = content.split('\n')
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        if line == '# ---':
-            i += 1
-            if i < len(lines):
-                next_line = lines[i].strip()
-                if next_line.startswith('# Section'):
-                    if current_section:
-                        sections.append(current_section)
-                    
-                    title_match = re.search(r'Section (\d+):\s*(.+)', next_line)
-                    if title_match:
-                        section_num = title_match.group(1)
-                        section_title = title_match.group(2).strip()
-                        
-                        i += 1
-                        if i < len(lines) and lines[i].strip() == '# ---':
-                            i += 1
-                        
-                        description = ""
-                        if i < len(lines):
-                            desc_line = lines[i].strip()
-                            if desc_line.startswith('#') and not desc_line.startswith('# ---'):
-                                description = desc_line.lstrip('#').strip()
-                        
-                        current_section = {
-                            'id': f'section_{section_num}',
-                            'title': f'Section {section_num}: {section_title}',
-                            'description': description,
-                            'core_questions': [],
-                            'optional_questions': []
-                        }
-                        current_questions = current_section['core_questions']
-                        is_optional = False
-        
-        elif line == '# --- Core Questions ---':
-            current_questions = current_section['core_questions'] if current_section else []
-            is_optional = False
-        
-        elif line == '# --- Optional Deeper Dive ---':
-            current_questions = current_section['optional_questions'] if current_section else []
-            is_optional = True
-        
-        elif line and not line.startswith('#') and ':' in line:
-            question_match = re.match(r'"([^"]+)":', line)
-            if question_match:
-                question_label = question_match.group(1)
-                question_id = slugify(question_label)
-                
-                i += 1
-                fill_text = ""
-                while i < len(lines):
-                    next_line = lines[i].strip()
-                    if not next_line or next_line.startswith('#'):
-                        if next_line.startswith('# ---'):
-                            i -= 1
-                            break
-                        i += 1
+    for number, section in enumerate(document['sections'], 1):
+        questions = {
+            key: tuple(
+                FrozenDict(
+                    id=get_question_id(question),
+                    label=question['label'],
+                    report_section=str(question.get('report_section') or ''),
+                    fill=' '.join(str(question.get('fill') or '').split())
+                )
+                for question in get_section_questions(section, key)
+            )
+            for _, key in QUESTION_TYPES
+        }
+        sections.append(FrozenDict(
+            id=str(section.get('id') or f'section_{number}'),
+            title=section.get('title') or f'Section {number}',
+            description=section.get('description') or '',
+            **questions
+        ))
+    plan = BusinessPlan(sections, fingerprint)
+    plan.compiled = compile_business_plan(plan)
+    return plan
+
+
+def get_plan_cache_path(fingerprint):
+    cache_dir = os.path.join(get_data_dir(), 'plan_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f'plan-v{PLAN_CACHE_VERSION}-{fingerprint}.pickle')
+
+
+def load_pickled_plan(fingerprint):
+    try:
+        with open(get_plan_cache_path(fingerprint), 'rb') as f:
+            compiled = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable business plan cache: {str(e)}")
+        return None
+    plan = compiled.sections
+    plan.compiled = compiled
+    return plan
+
+
+def save_pickled_plan(plan):
+    cache_path = get_plan_cache_path(plan.fingerprint)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(plan.compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write business plan cache: {str(e)}")
+
+
+def compile_plan_file(yaml_path):
+    with open(yaml_path, 'rb') as f:
+        raw = f.read()
+    fingerprint = hashlib.sha256(raw).hexdigest()
+    plan = load_pickled_plan(fingerprint) if BUSINESS_PLAN_PICKLE_CACHE else None
+    if plan is None:
+        plan = build_business_plan(parse_plan_document(raw), fingerprint)
+        if BUSINESS_PLAN_PICKLE_CACHE:
+            save_pickled_plan(plan)
+    plan.path = yaml_path
+    return plan
+
+
+def load_business_plan_from_yaml(yaml_path=None):
+    """The compiled, read-only plan for yaml_path (the configured checklist by default).
+
+    The file is checked at most every BUSINESS_PLAN_RELOAD_SECONDS and recompiled only when its
+    mtime or size changed and its content hash differs, so edits go live without a restart.
+    A broken edit keeps the previous plan in service. At most BUSINESS_PLAN_CACHE_MAX_ENTRIES
+    plans stay loaded; the least recently used one is dropped first.
+    """
+    yaml_path = yaml_path or get_plan_path()
+    now = time.monotonic()
+    with _plans_lock:
+        cached = _plans.get(yaml_path)
+        if cached is not None:
+            _plans.move_to_end(yaml_path)
+            if now - cached[1] < BUSINESS_PLAN_RELOAD_SECONDS:
+                return cached[2]
+        stat_key = None
+        try:
+            stat = os.stat(yaml_path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+            if cached is not None and cached[0] == stat_key:
+                plan = cached[2]
+            else:
+                plan = compile_plan_file(yaml_path)
+                if cached is not None and plan.fingerprint == cached[2].fingerprint:
+                    plan = cached[2]
+                elif cached is not None:
+                    print(f"Business plan reloaded from {yaml_path} ({len(plan.compiled)} questions)")
+        except (OSError, yaml.YAMLError, ValueError, KeyError, TypeError) as e:
+            if cached is None:
+                raise
+            print(f"Business plan reload failed, keeping the previous plan: {str(e)}")
+            # Remember the broken file's stat so it is not reparsed until it changes again.
+            stat_key, plan = stat_key or cached[0], cached[2]
+        _plans[yaml_path] = (stat_key, now, plan)
+        while len(_plans) > BUSINESS_PLAN_CACHE_MAX_ENTRIES:
+            _plans.popitem(last=False)
+        return plan
+
+
+def get_loaded_plan_count():
+    with _plans_lock:
+        return len(_plans)
+
+
+QUESTION_POINTS = {'core': 3, 'optional': 5}
+
+
+class CompiledBusinessPlan:
+    def __init__(self, sections):
+        self.sections = sections
+        self.questions = []
+        self.index_by_id = {}
+        self.section_by_id = {}
+        self.type_by_id = {}
+        for section in sections:
+            for question_type, key in QUESTION_TYPES:
+                for question in section[key]:
+                    question_id = question['id']
+                    if question_id in self.index_by_id:
                         continue
-                    
-                    if next_line.startswith('fill:'):
-                        fill_text = next_line.replace('fill:', '').strip()
-                        if fill_text.startswith('"') and fill_text.endswith('"'):
-                            fill_text = fill_text[1:-1]
-                        elif fill_text.startswith('"'):
-                            fill_text = fill_text[1:]
-                            i += 1
-                            while i < len(lines):
-                                cont_line = lines[i].strip()
-                                if cont_line.endswith('"'):
-                                    fill_text += ' ' + cont_line[:-1]
-                                    break
-                                fill_text += ' ' + cont_line
-                                i += 1
-                    elif next_line.startswith('why:') or next_line.startswith('answer:'):
-                        break
-                    i += 1
-                
-                if current_section and fill_text:
-                    question = {
-                        'id': question_id,
-                        'label': question_label,
-                        'fill': fill_text
-                    }
-                    current_questions.append(question)
-        
-        i += 1
-    
-    if current_section:
-        sections.append(current_section)
-    
-    return sections
+                    self.index_by_id[question_id] = len(self.questions)
+                    self.section_by_id[question_id] = section
+                    self.type_by_id[question_id] = question_type
+                    self.questions.append((section, question, question_type))
+        self.questions = tuple(self.questions)
+
+    def __len__(self):
+        return len(self.questions)
+
+
+_compiled_plans = {}
+
+
+def compile_business_plan(business_plan_sections):
+    return CompiledBusinessPlan(business_plan_sections)
 
 
-def calculate_points(form_data, business_plan_sections):
+def get_compiled_plan(business_plan_sections):
+    compiled = getattr(business_plan_sections, 'compiled', None)
+    if compiled is not None:
+        return compiled
+    cached = _compiled_plans.get(id(business_plan_sections))
+    if cached is None or cached.sections is not business_plan_sections:
+        cached = compile_business_plan(business_plan_sections)
+        _compiled_plans[id(business_plan_sections)] = cached
+    return cached
+
+
+def new_plan_progress(form_data, business_plan_sections):
+    plan = get_compiled_plan(business_plan_sections)
+    progress = {'cursor': 0, 'completed': 0, 'skipped': 0, 'points': 0,
+                'plan_version': getattr(business_plan_sections, 'version', None)}
+    for section, question, question_type in plan.questions:
+        question_value = form_data.get(question['id'])
+        if question_value == '':
+            progress['skipped'] += 1
+        elif question_value:
+            progress['completed'] += 1
+            progress['points'] += QUESTION_POINTS[question_type]
+    return progress
+
+
+def record_plan_answer(form_data, business_plan_sections, progress, question_id, value):
+    plan = get_compiled_plan(business_plan_sections)
+    question_type = plan.type_by_id.get(question_id)
+    if question_type is not None:
+        previous = form_data.get(question_id)
+        if previous == '':
+            progress['skipped'] -= 1
+        elif previous:
+            progress['completed'] -= 1
+            progress['points'] -= QUESTION_POINTS[question_type]
+        if value == '':
+            progress['skipped'] += 1
+        elif value:
+            progress['completed'] += 1
+            progress['points'] += QUESTION_POINTS[question_type]
+    form_data[question_id] = value
+
+
+def calculate_initial_form_points(form_data):
     points = 0
     
     if form_data.get('company_name') and form_data.get('company_name') != '':
@@ -130,15 +300,20 @@ def calculate_points(form_data, business_plan_sections):
     if form_data.get('location') and form_data.get('location') != '':
         points += 1
     
-    for section in business_plan_sections:
-        for question in section['core_questions']:
-            question_value = form_data.get(question['id'])
-            if question_value and question_value != '':
-                points += 3
-        for question in section['optional_questions']:
-            question_value = form_data.get(question['id'])
-            if question_value and question_value != '':
-                points += 5
+    return points
+
+
+def calculate_points(form_data, business_plan_sections, progress=None):
+    points = calculate_initial_form_points(form_data)
+    
+    if progress is not None:
+        return points + progress['points']
+    
+    plan = get_compiled_plan(business_plan_sections)
+    for section, question, question_type in plan.questions:
+        question_value = form_data.get(question['id'])
+        if question_value and question_value != '':
+            points += QUESTION_POINTS[question_type]
     
     return points
 
@@ -156,16 +331,18 @@ def is_initial_form_complete(form_data):
     return all(form_data.get(step['id']) and form_data.get(step['id']) != '' for step in FORM_STEPS)
 
 
-def get_current_business_plan_question(form_data, business_plan_sections):
-    for section in business_plan_sections:
-        for question in section['core_questions']:
-            question_value = form_data.get(question['id'])
-            if question_value is None:
-                return section, question, 'core'
-        for question in section['optional_questions']:
-            question_value = form_data.get(question['id'])
-            if question_value is None:
-                return section, question, 'optional'
+def get_current_business_plan_question(form_data, business_plan_sections, progress=None):
+    plan = get_compiled_plan(business_plan_sections)
+    questions = plan.questions
+    # Answers are only ever added, so the first unanswered question never moves
+    # backwards and the per-session cursor can resume where it stopped.
+    cursor = progress['cursor'] if progress is not None else 0
+    while cursor < len(questions) and form_data.get(questions[cursor][1]['id']) is not None:
+        cursor += 1
+    if progress is not None:
+        progress['cursor'] = cursor
+    if cursor < len(questions):
+        return questions[cursor]
     return None, None, None
 
 
@@ -191,6 +368,7 @@ def get_business_plan_progress(form_data, business_plan_sections):
             preliminary_progress['core_completed'].append(step['id'])
     progress.append(preliminary_progress)
     
+    section_progress_by_id = {}
     for section in business_plan_sections:
         section_progress = {
             'section_id': section['id'],
@@ -205,18 +383,20 @@ def get_business_plan_progress(form_data, business_plan_sections):
             'core_skipped': [],
             'optional_skipped': []
         }
-        for question in section['core_questions']:
-            question_value = form_data.get(question['id'])
-            if question_value == '':
-                section_progress['core_skipped'].append(question['id'])
-            elif question_value and question_value != '':
-                section_progress['core_completed'].append(question['id'])
-        for question in section['optional_questions']:
-            question_value = form_data.get(question['id'])
-            if question_value == '':
-                section_progress['optional_skipped'].append(question['id'])
-            elif question_value and question_value != '':
-                section_progress['optional_completed'].append(question['id'])
+        section_progress_by_id[id(section)] = section_progress
         progress.append(section_progress)
+    
+    if not form_data:
+        return progress
+    
+    plan = get_compiled_plan(business_plan_sections)
+    for section, question, question_type in plan.questions:
+        question_value = form_data.get(question['id'])
+        if question_value is None:
+            continue
+        section_progress = section_progress_by_id[id(section)]
+        if question_value == '':
+            section_progress[f'{question_type}_skipped'].append(question['id'])
+        elif question_value:
+            section_progress[f'{question_type}_completed'].append(question['id'])
     return progress
-
@@ -1,24 +1,52 @@
-from openai import OpenAI
 import os
-import sys
 from constants import FORM_STEPS
-from services.business_plan_service import get_current_business_plan_question
+from services.business_plan_service import get_current_business_plan_question, get_compiled_plan
+from services.audio_service import preprocess_audio
+from services.tts_cache import TTSCache, get_tts_cache_key
+from services.usage_service import record_usage
+from services.openai_client import call_openai, openai_call
+from services.history_service import select_history_window
+from utils.helpers import get_data_dir
 
 try:
-    from config.config import OPENAI_API_KEY
+    from config.config import TTS_MODEL, TTS_VOICE, TTS_CACHE_MEMORY_MB, TTS_CACHE_DISK_MB, TTS_PREWARM
 except ImportError:
-    OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+    TTS_MODEL = os.environ.get('TTS_MODEL', 'tts-1')
+    TTS_VOICE = os.environ.get('TTS_VOICE', 'alloy')
+    TTS_CACHE_MEMORY_MB = int(os.environ.get('TTS_CACHE_MEMORY_MB', 32))
+    TTS_CACHE_DISK_MB = int(os.environ.get('TTS_CACHE_DISK_MB', 512))
+    TTS_PREWARM = os.environ.get('TTS_PREWARM', '').lower() in ('1', 'true', 'yes')
+
+try:
+    from config.config import TTS_FORMAT
+except ImportError:
+    TTS_FORMAT = os.environ.get('TTS_FORMAT', 'mp3')
+
+TTS_MIMETYPES = {'mp3': 'audio/mpeg', 'opus': 'audio/ogg', 'aac': 'audio/aac'}
+TTS_STREAM_CHUNK_BYTES = 16 * 1024
+
+tts_cache = TTSCache(
+    os.path.join(get_data_dir(), 'tts_cache'),
+    max_memory_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024,
+    max_disk_bytes=TTS_CACHE_DISK_MB * 1024 * 1024
+)
 
-if not OPENAI_API_KEY:
-    print("Warning: OPENAI_API_KEY not found. Please set it in config/config.py or as an environment variable.")
-    sys.exit(1)
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+CHAT_SYSTEM_PROMPT = """You are a friendly business advisor assistant. You help an entrepreneur in two stages: \
+first a short initial form (company name, preferred language, business sphere, education, years of business experience \
+and location), then a comprehensive business plan checklist worked through one question at a time.
 
+General rules:
+- Keep responses concise (1-2 sentences) and conversational.
+- Be encouraging and supportive.
+- Acknowledge the user's input before moving on, and when a question is due, actually ask it directly.
+- The last system message before the user's message holds the instructions for this turn; follow it."""
 
-def get_step_prompt(current_step, form_data, business_plan_sections, is_retry=False, is_skipping=False):
+
+def get_step_prompt(current_step, form_data, business_plan_sections, is_retry=False, is_skipping=False, plan_progress=None):
+    """Per-turn instructions. They are sent after the chat history so CHAT_SYSTEM_PROMPT stays a stable prefix."""
     if current_step and current_step.startswith('bp_'):
-        section, question, question_type = get_current_business_plan_question(form_data, business_plan_sections)
+        section, question, question_type = get_current_business_plan_question(form_data, business_plan_sections, plan_progress)
         if section and question:
             context_parts = []
             if form_data.get('company_name'):
@@ -29,10 +57,10 @@ def get_step_prompt(current_step, form_data, business_plan_sections, is_retry=Fa
             context = f"Context: {', '.join(context_parts)}. " if context_parts else ""
             
             section_info = f"We're working on {section['title']} - {section['description']}."
-            question_instruction = f"Ask about: {question['label']}. {question['fill']}"
             
+            optional_note = ""
             if question_type == 'optional':
-                question_instruction += " (This is an optional deeper dive question - they can skip if they prefer.)"
+                optional_note = " (This is an optional deeper dive question - they can skip if they prefer.)"
             
             retry_note = ""
             if is_retry:
@@ -40,12 +68,11 @@ def get_step_prompt(current_step, form_data, business_plan_sections, is_retry=Fa
             elif is_skipping:
                 retry_note = " The user didn't provide a clear answer to the previous question after two attempts, so we're moving on. Please ask the next question naturally and encouragingly."
             
-            return f"""You are a friendly business advisor assistant helping create a comprehensive business plan. {context}
+            return f"""Business plan checklist. {context}
 {section_info}
-Now ask them: "{question['label']}" - {question['fill']}{retry_note}
-Keep responses concise (1-2 sentences) and conversational. Be encouraging and supportive. Make sure to actually ask the question directly."""
+Now ask them: "{question['label']}" - {question['fill']}{optional_note}{retry_note}"""
         else:
-            return """You are a friendly business advisor assistant. All business plan questions have been completed.
+            return """All business plan questions have been completed.
 Thank them for their thorough responses and let them know their business plan information has been collected."""
     
     step_descriptions = {
@@ -78,27 +105,23 @@ Thank them for their thorough responses and let them know their business plan in
     current_task = step_descriptions.get(current_step, "Continue the conversation naturally.")
     
     if current_step == 'location':
-        section, question, _ = get_current_business_plan_question(form_data, business_plan_sections)
+        section, question, _ = get_current_business_plan_question(form_data, business_plan_sections, plan_progress)
         if section and question:
-            return f"""You are a friendly business form assistant helping to collect information. {context}
+            return f"""Initial form. {context}
 Current task: {current_task}
-After collecting the location, congratulate them on completing the initial form. Then immediately ask them the first business plan question: "{question['label']}". {question['fill']}
-Keep responses concise (1-2 sentences) and conversational."""
+After collecting the location, congratulate them on completing the initial form. Then immediately ask them the first business plan question: "{question['label']}". {question['fill']}"""
         else:
-            return f"""You are a friendly business form assistant helping to collect information. {context}
+            return f"""Initial form. {context}
 Current task: {current_task}
-After collecting the location, congratulate them on completing the initial form and introduce the business plan checklist.
-Keep responses concise (1-2 sentences) and conversational."""
+After collecting the location, congratulate them on completing the initial form and introduce the business plan checklist."""
     elif current_step == 'complete':
         if not form_data.get('email'):
-            return f"""You are a friendly business form assistant. All required information has been collected:
+            return f"""All required information has been collected:
 {', '.join(collected_info)}
-Now, please ask for their email address so we can send them a summary report of the information they provided.
-Keep responses concise and conversational."""
+Now, please ask for their email address so we can send them a summary report of the information they provided."""
         else:
-            return f"""You are a friendly business form assistant. All information including email has been collected.
-Thank them for completing the form and let them know that a report will be sent to their email address shortly.
-Keep responses concise and conversational."""
+            return """All information including email has been collected.
+Thank them for completing the form and let them know that a report will be sent to their email address shortly."""
     else:
         next_steps = []
         for step in FORM_STEPS:
@@ -115,110 +138,249 @@ Keep responses concise and conversational."""
         if is_retry:
             retry_note_initial = " The user's previous answer was unclear or didn't make sense (it might have been random numbers, gibberish, or unrelated text). Please politely let them know you didn't understand their answer and ask the same question again. Be encouraging and supportive."
         
-        return f"""You are a friendly business form assistant helping to collect information. {context}
+        return f"""Initial form. {context}
 Current task: {current_task}{retry_note_initial}{next_hint}
-Keep responses concise (1-2 sentences) and conversational. 
 Acknowledge their input and naturally move to the next question."""
 
 
-def get_openai_response(user_message, current_step, form_data, chat_history, business_plan_sections, is_retry=False, is_skipping=False):
+def build_chat_messages(user_message, current_step, form_data, chat_history, business_plan_sections, is_retry=False, is_skipping=False, plan_progress=None, history_summary=''):
+    context_message = get_step_prompt(
+        current_step, form_data, business_plan_sections,
+        is_retry=is_retry, is_skipping=is_skipping, plan_progress=plan_progress
+    )
+    
+    # Byte-identical system prompt first, then the summary and history (both change only when old
+    # turns are folded), then the volatile per-turn instructions, so consecutive requests share
+    # the longest possible prefix.
+    messages = [{'role': 'system', 'content': CHAT_SYSTEM_PROMPT}]
+    
+    if history_summary:
+        messages.append({'role': 'system', 'content': f"Summary of the earlier conversation: {history_summary}"})
+    
+    if chat_history:
+        messages.extend(select_history_window(chat_history))
+    
+    messages.append({'role': 'system', 'content': context_message})
+    messages.append({
+        'role': 'user',
+        'content': user_message
+    })
+    return messages
+
+
+CANNED_STEP_QUESTIONS = {
+    'company_name': "What is the name of your company?",
+    'language': "Which language would you prefer (e.g., English, Spanish, French, German)?",
+    'sphere': "What industry or business sphere does your company operate in?",
+    'education': "What is your educational background?",
+    'experience': "How many years of business experience do you have?",
+    'location': "Where is your business located?"
+}
+
+
+CANNED_PREFIXES = ("Thank you! ", "Sorry, I didn't quite get that. ")
+CANNED_FALLBACK_QUESTION = "Please tell me a bit more."
+CANNED_CLOSING_REPLIES = {
+    'plan_complete': "Thank you! All business plan questions have been completed.",
+    'ask_email': "Thank you! What email address should we send your summary report to?",
+    'report_queued': "Thank you! Your report will be sent to your email address shortly."
+}
+
+
+def get_canned_reply(current_step, form_data, business_plan_sections, is_retry=False, plan_progress=None):
+    """A fixed reply for the current step, served when the model is unavailable."""
+    prefix = CANNED_PREFIXES[1] if is_retry else CANNED_PREFIXES[0]
+    if current_step and current_step.startswith('bp_'):
+        _, question, _ = get_current_business_plan_question(form_data, business_plan_sections, plan_progress)
+        if question:
+            return f"{prefix}{question['label']}"
+        return CANNED_CLOSING_REPLIES['plan_complete']
+    if current_step == 'complete':
+        if not form_data.get('email'):
+            return CANNED_CLOSING_REPLIES['ask_email']
+        return CANNED_CLOSING_REPLIES['report_queued']
+    return prefix + CANNED_STEP_QUESTIONS.get(current_step, CANNED_FALLBACK_QUESTION)
+
+
+def get_canned_replies(business_plan_sections):
+    """Every reply get_canned_reply can serve for this plan."""
+    questions = list(CANNED_STEP_QUESTIONS.values()) + [CANNED_FALLBACK_QUESTION]
+    questions += [question['label'] for _, question, _ in get_compiled_plan(business_plan_sections).questions]
+    return [prefix + question for prefix in CANNED_PREFIXES for question in questions] + list(CANNED_CLOSING_REPLIES.values())
+
+
+def record_exchange(chat_history, user_message, ai_message):
+    chat_history.append({
+        'role': 'user',
+        'content': user_message
+    })
+    chat_history.append({
+        'role': 'assistant',
+        'content': ai_message
+    })
+
+
+def get_next_step(current_step, user_message):
+    should_advance = False
+    if current_step == 'company_name' and len(user_message.strip()) > 1:
+        should_advance = True
+    elif current_step == 'language' and len(user_message.strip()) > 1:
+        should_advance = True
+    elif current_step == 'sphere' and len(user_message.strip()) > 2:
+        should_advance = True
+    elif current_step == 'education' and len(user_message.strip()) > 2:
+        should_advance = True
+    elif current_step == 'experience' and len(user_message.strip()) > 0:
+        should_advance = True
+    elif current_step == 'location' and len(user_message.strip()) > 2:
+        should_advance = True
+    
+    if should_advance and current_step != 'complete':
+        for idx, step in enumerate(FORM_STEPS):
+            if step['id'] == current_step:
+                if idx + 1 < len(FORM_STEPS):
+                    return FORM_STEPS[idx + 1]['id']
+                return 'complete'
+    
+    return current_step
+
+
+def get_openai_response(user_message, current_step, form_data, chat_history, business_plan_sections, is_retry=False, is_skipping=False, plan_progress=None, history_summary=''):
     try:
-        context_message = get_step_prompt(current_step, form_data, business_plan_sections, is_retry=is_retry, is_skipping=is_skipping)
-        
-        system_message = {
-            'role': 'system',
-            'content': context_message
-        }
-        
-        messages = [system_message]
-        
-        if chat_history:
-            messages.extend(chat_history[-10:])
-        
-        messages.append({
-            'role': 'user',
-            'content': user_message
-        })
+        messages = build_chat_messages(
+            user_message, current_step, form_data, chat_history, business_plan_sections,
+            is_retry=is_retry, is_skipping=is_skipping, plan_progress=plan_progress,
+            history_summary=history_summary
+        )
         
-        response = client.chat.completions.create(
+        response = call_openai('chat', lambda client: client.chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.7,
             max_tokens=200
-        )
+        ))
+        record_usage('chat', response)
         
         ai_message = response.choices[0].message.content.strip()
         
-        chat_history.append({
-            'role': 'user',
-            'content': user_message
-        })
-        chat_history.append({
-            'role': 'assistant',
-            'content': ai_message
-        })
+        record_exchange(chat_history, user_message, ai_message)
         
-        should_advance = False
-        if current_step == 'company_name' and len(user_message.strip()) > 1:
-            should_advance = True
-        elif current_step == 'language' and len(user_message.strip()) > 1:
-            should_advance = True
-        elif current_step == 'sphere' and len(user_message.strip()) > 2:
-            should_advance = True
-        elif current_step == 'education' and len(user_message.strip()) > 2:
-            should_advance = True
-        elif current_step == 'experience' and len(user_message.strip()) > 0:
-            should_advance = True
-        elif current_step == 'location' and len(user_message.strip()) > 2:
-            should_advance = True
+        return {'message': ai_message, 'step': get_next_step(current_step, user_message)}
+    
+    except Exception as e:
+        print(f"Chat API error, serving canned reply: {type(e).__name__}: {str(e)}")
+        ai_message = get_canned_reply(current_step, form_data, business_plan_sections, is_retry=is_retry, plan_progress=plan_progress)
+        record_exchange(chat_history, user_message, ai_message)
+        return {'message': ai_message, 'step': current_step}
+
+
+def stream_openai_response(user_message, current_step, form_data, chat_history, business_plan_sections, is_retry=False, is_skipping=False, plan_progress=None, history_summary=''):
+    parts = []
+    try:
+        messages = build_chat_messages(
+            user_message, current_step, form_data, chat_history, business_plan_sections,
+            is_retry=is_retry, is_skipping=is_skipping, plan_progress=plan_progress,
+            history_summary=history_summary
+        )
         
-        if should_advance and current_step != 'complete':
-            next_step_idx = None
-            for idx, step in enumerate(FORM_STEPS):
-                if step['id'] == current_step:
-                    if idx + 1 < len(FORM_STEPS):
-                        next_step_idx = idx + 1
-                    else:
-                        next_step_idx = 'complete'
-                    break
-            
-            if next_step_idx == 'complete':
-                return {'message': ai_message, 'step': 'complete'}
-            elif next_step_idx is not None:
-                return {'message': ai_message, 'step': FORM_STEPS[next_step_idx]['id']}
+        stream = call_openai('chat', lambda client: client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=200,
+            stream=True,
+            stream_options={'include_usage': True}
+        ))
         
-        return {'message': ai_message, 'step': current_step}
+        for chunk in stream:
+            if not chunk.choices:
+                # With include_usage the final chunk carries token usage and no choices.
+                record_usage('chat', chunk)
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
     
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Chat API error: {error_details}")
-        return {
-            'message': f"I apologize, but I encountered an error. Please try again. Error: {str(e)}",
-            'step': current_step
-        }
-
-
-def get_tts_audio(text):
-    audio_response = client.audio.speech.create(
-        model="tts-1",
-        voice="alloy",
-        input=text
-    )
+        print(f"Chat API error, serving canned reply: {type(e).__name__}: {str(e)}")
+        if not parts:
+            parts.append(get_canned_reply(current_step, form_data, business_plan_sections, is_retry=is_retry, plan_progress=plan_progress))
+            yield parts[0]
+    
+    record_exchange(chat_history, user_message, ''.join(parts).strip())
+
+
+def synthesize_tts_audio(text):
+    audio_response = call_openai('tts', lambda client: client.audio.speech.create(
+        model=TTS_MODEL,
+        voice=TTS_VOICE,
+        input=text,
+        response_format=TTS_FORMAT
+    ))
     return audio_response.read()
 
 
+def get_tts_cache_key_for(text):
+    return get_tts_cache_key(text, TTS_VOICE, TTS_MODEL, TTS_FORMAT)
+
+
+def get_tts_audio(text, claim=None):
+    return tts_cache.get_or_create(get_tts_cache_key_for(text), lambda: synthesize_tts_audio(text), claim)
+
+
+def stream_tts_audio(text):
+    key = get_tts_cache_key_for(text)
+    # A sentence prefetched by the voice pipeline may still be synthesizing; reuse it rather than paying twice.
+    tts_cache.wait_inflight(key, timeout=30)
+    cached = tts_cache.iter_cached(key, TTS_STREAM_CHUNK_BYTES)
+    if cached is not None:
+        yield from cached
+        return
+
+    # Relay upstream chunks as they arrive and spool them into the cache on the side;
+    # the file is only published if the whole stream made it through.
+    writer = tts_cache.open_writer(key)
+    try:
+        with openai_call('tts') as client, client.audio.speech.with_streaming_response.create(
+            model=TTS_MODEL,
+            voice=TTS_VOICE,
+            input=text,
+            response_format=TTS_FORMAT
+        ) as audio_response:
+            for chunk in audio_response.iter_bytes(TTS_STREAM_CHUNK_BYTES):
+                writer.write(chunk)
+                yield chunk
+        writer.commit()
+    finally:
+        writer.abort()
+
+
+def transcribe_file(file_obj, filename, content_type, prompt=None):
+    # The SDK hands file objects to httpx, which streams them in chunks instead of buffering.
+    # prompt is the text just before this audio, so a clip cut mid-sentence continues it.
+    options = {'prompt': prompt} if prompt else {}
+    transcription = call_openai('transcription', lambda client: client.audio.transcriptions.create(
+        model="whisper-1",
+        file=(filename, file_obj, content_type),
+        **options
+    ))
+    return transcription.text
+
+
+def transcribe_recording(file_obj, filename, content_type):
+    prepared = preprocess_audio(file_obj, filename, content_type)
+    if prepared['empty']:
+        # Nothing but silence; skip the API call entirely.
+        return ''
+    return transcribe_file(prepared['file'], prepared['filename'], prepared['content_type'])
+
+
 def transcribe_audio(audio_file):
-    audio_file.seek(0)
-    file_content = audio_file.read()
-    audio_file.seek(0)
+    stream = audio_file.stream
+    stream.seek(0)
     
     filename = audio_file.filename or 'audio.webm'
     content_type = audio_file.content_type or 'audio/webm'
     
-    transcription = client.audio.transcriptions.create(
-        model="whisper-1",
-        file=(filename, file_content, content_type)
-    )
-    return transcription.text
-
+    return transcribe_recording(stream, filename, content_type)
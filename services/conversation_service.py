@@ -0,0 +1,194 @@
+import re
+from constants import FORM_STEPS, TIERS
+from services.business_plan_service import (
+    is_initial_form_complete,
+    get_current_business_plan_question,
+    get_business_plan_progress,
+    calculate_points,
+    get_current_tier,
+    record_plan_answer
+)
+from services.validation_service import validate_answer
+from services.gibberish_detector import gibberish_detector
+from services.report_jobs import enqueue_send_report
+from services.yaml_service import append_answer
+from services.history_service import apply_history_summary, schedule_history_compaction
+
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+
+
+def prepare_turn(session_id, user_message, state, business_plan_sections):
+    apply_history_summary(session_id, state)
+    form_data = state['form_data']
+    initial_form_complete = is_initial_form_complete(form_data)
+    is_retry = False
+    is_skipping = False
+
+    if not initial_form_complete:
+        current_step, is_retry = apply_initial_form_answer(user_message, form_data)
+    else:
+        section, question, question_type = get_current_business_plan_question(
+            form_data, business_plan_sections, state['plan_progress']
+        )
+        if section and question:
+            answer_valid = True
+            if answer_needs_validation(user_message):
+                answer_valid = validate_answer(user_message, f"bp_{question['id']}", question, business_plan_sections)
+            current_step, is_retry, is_skipping = apply_business_plan_answer(
+                user_message, question, answer_valid, state, business_plan_sections
+            )
+            if answer_valid and answer_needs_validation(user_message):
+                persist_answer(session_id, question, user_message)
+        else:
+            current_step = 'bp_complete'
+
+    return build_turn(user_message, state, current_step, initial_form_complete, is_retry, is_skipping)
+
+
+def build_turn(user_message, state, current_step, initial_form_complete, is_retry=False, is_skipping=False):
+    extract_email(user_message, state['form_data'])
+
+    if current_step is None:
+        current_step = 'complete' if not initial_form_complete else 'bp_complete'
+
+    return {
+        'current_step': current_step,
+        'initial_form_complete': initial_form_complete,
+        'is_retry': is_retry,
+        'is_skipping': is_skipping
+    }
+
+
+def apply_initial_form_answer(user_message, form_data):
+    current_step = None
+    for step in FORM_STEPS:
+        if not form_data.get(step['id']):
+            current_step = step['id']
+            break
+
+    user_message_clean = user_message.strip()
+
+    if gibberish_detector.is_nonsensical(user_message_clean):
+        return current_step, True
+    elif current_step == 'company_name' and len(user_message_clean) > 1:
+        form_data['company_name'] = user_message
+    elif current_step == 'language':
+        lang_map = {
+            'english': 'English',
+            'spanish': 'Spanish',
+            'french': 'French',
+            'german': 'German'
+        }
+        user_lower = user_message.lower()
+        for key, value in lang_map.items():
+            if key in user_lower:
+                form_data['language'] = value
+                break
+        if not form_data.get('language'):
+            form_data['language'] = user_message
+    elif current_step == 'sphere' and len(user_message_clean) > 2:
+        form_data['sphere'] = user_message
+    elif current_step == 'education' and len(user_message_clean) > 2:
+        form_data['education'] = user_message
+    elif current_step == 'experience' and len(user_message_clean) > 0:
+        form_data['experience'] = user_message
+    elif current_step == 'location' and len(user_message_clean) > 2:
+        form_data['location'] = user_message
+    return current_step, False
+
+
+def answer_needs_validation(user_message):
+    return len(user_message.strip()) > 2
+
+
+def apply_business_plan_answer(user_message, question, answer_valid, state, business_plan_sections):
+    form_data = state['form_data']
+    question_retries = state['question_retries']
+    plan_progress = state['plan_progress']
+    current_step = f"bp_{question['id']}"
+    is_retry = False
+    is_skipping = False
+
+    if not answer_needs_validation(user_message):
+        return current_step, is_retry, is_skipping
+
+    if answer_valid:
+        record_plan_answer(form_data, business_plan_sections, plan_progress, question['id'], user_message)
+        if current_step in question_retries:
+            del question_retries[current_step]
+    else:
+        retry_count = question_retries.get(current_step, 0)
+        if retry_count < 1:
+            question_retries[current_step] = retry_count + 1
+            is_retry = True
+        else:
+            if current_step in question_retries:
+                del question_retries[current_step]
+            record_plan_answer(form_data, business_plan_sections, plan_progress, question['id'], '')
+            section, next_question, _ = get_current_business_plan_question(
+                form_data, business_plan_sections, plan_progress
+            )
+            if next_question:
+                current_step = f"bp_{next_question['id']}"
+                is_skipping = True
+    return current_step, is_retry, is_skipping
+
+
+def persist_answer(session_id, question, user_message):
+    append_answer(session_id, question['label'], user_message)
+
+
+def extract_email(user_message, form_data):
+    if form_data.get('email'):
+        return
+    email_match = re.search(EMAIL_PATTERN, user_message)
+    if email_match:
+        form_data['email'] = email_match.group()
+    elif '@' in user_message and len(user_message.strip()) > 5:
+        potential_email = user_message.strip()
+        if '.' in potential_email.split('@')[1] if '@' in potential_email else False:
+            form_data['email'] = potential_email
+
+
+def finalize_turn(session_id, turn, state, business_plan_sections, response_message):
+    form_data = state['form_data']
+    initial_form_complete = turn['initial_form_complete']
+
+    completed_steps = []
+    for step in FORM_STEPS:
+        if form_data.get(step['id']):
+            completed_steps.append(step['id'])
+
+    business_plan_progress = get_business_plan_progress(form_data, business_plan_sections)
+
+    email_collected = form_data.get('email') is not None
+    report_job_id = None
+
+    if email_collected and initial_form_complete and not form_data.get('report_sent'):
+        section, question, _ = get_current_business_plan_question(
+            form_data, business_plan_sections, state['plan_progress']
+        )
+        if not section:
+            try:
+                report_job_id = enqueue_send_report(session_id, form_data, state.get('plan_id'))
+                form_data['report_sent'] = True
+            except Exception as e:
+                print(f"Error queueing report email: {str(e)}")
+
+    schedule_history_compaction(session_id, state)
+
+    points = calculate_points(form_data, business_plan_sections, state['plan_progress'])
+    current_tier = get_current_tier(points, TIERS)
+
+    return {
+        'response': response_message,
+        'completed_steps': completed_steps,
+        'business_plan_progress': business_plan_progress,
+        'initial_form_complete': initial_form_complete,
+        'form_data': form_data.copy(),
+        'email_collected': email_collected,
+        'report_job_id': report_job_id,
+        'points': points,
+        'current_tier': current_tier['id'],
+        'tiers': TIERS
+    }
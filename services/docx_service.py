@@ -1,123 +1,206 @@
+import io
 import os
-import tempfile
 import re
+import json
+import hashlib
+import shutil
 import yaml
-from openai import OpenAI
-import sys
+from concurrent.futures import ThreadPoolExecutor
 import markdown
 from html.parser import HTMLParser
+from utils.helpers import get_data_dir
+from services.usage_service import record_usage
+from services.openai_client import call_openai
+from services.report_renderer import render_business_plan, get_template_fingerprint, load_template, get_answer_sections, OTHER_SECTION_TITLE
+from services.markdown_docx import MarkdownDocxBuilder
+from services.report_cache import ReportCache, get_answers_fingerprint, get_report_cache_key
+from services.plan_registry import get_plan_template_path
 
 try:
-    from config.config import OPENAI_API_KEY
+    from config.config import REPORT_FILL_MODEL, REPORT_FILL_WORKERS
 except ImportError:
-    OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+    REPORT_FILL_MODEL = os.environ.get('REPORT_FILL_MODEL', 'gpt-4o')
+    REPORT_FILL_WORKERS = int(os.environ.get('REPORT_FILL_WORKERS', 6))
 
-if not OPENAI_API_KEY:
-    print("Warning: OPENAI_API_KEY not found. Please set it in config/config.py or as an environment variable.")
-    sys.exit(1)
+try:
+    from config.config import REPORT_RENDER_MODE
+except ImportError:
+    REPORT_RENDER_MODE = os.environ.get('REPORT_RENDER_MODE', 'local')
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+try:
+    from config.config import DOCX_CONVERTER
+except ImportError:
+    # 'native' builds the DOCX straight from markdown; 'html' is the older markdown -> HTML -> DOCX path.
+    DOCX_CONVERTER = os.environ.get('DOCX_CONVERTER', 'native')
 
+try:
+    from config.config import REPORT_CACHE_MEMORY_MB, REPORT_CACHE_DISK_MB
+except ImportError:
+    REPORT_CACHE_MEMORY_MB = int(os.environ.get('REPORT_CACHE_MEMORY_MB', 32))
+    REPORT_CACHE_DISK_MB = int(os.environ.get('REPORT_CACHE_DISK_MB', 0))
 
-def load_yaml_answers(yaml_path):
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    
-    answers = {}
-    lines = content.split('\n')
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i].strip()
-        question_match = re.match(r'"([^"]+)":', line)
-        if question_match:
-            question_label = question_match.group(1)
-            i += 1
-            while i < len(lines):
-                next_line = lines[i].strip()
-                if next_line.startswith('answer:'):
-                    answer = next_line.replace('answer:', '').strip()
-                    if answer == 'None' or answer == '':
-                        break
-                    if answer.startswith('"') and answer.endswith('"'):
-                        answer = answer[1:-1]
-                        answer = answer.replace('\\"', '"').replace('\\n', '\n')
-                    if answer and answer.strip():
-                        answers[question_label] = answer.strip()
-                    break
-                elif next_line and not next_line.startswith('#') and ':' in next_line:
-                    break
-                i += 1
-        i += 1
-    
-    return answers
+FILL_PROMPT_VERSION = 2
+REPORT_MIMETYPES = {
+    'md': 'text/markdown',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pdf': 'application/pdf'
+}
+_fill_executor = ThreadPoolExecutor(max_workers=REPORT_FILL_WORKERS, thread_name_prefix='report-fill')
 
+# Reports hold personal answers, so the disk tier is opt-in (REPORT_CACHE_DISK_MB).
+report_cache = ReportCache(
+    os.path.join(get_data_dir(), 'report_cache') if REPORT_CACHE_DISK_MB > 0 else None,
+    max_memory_bytes=REPORT_CACHE_MEMORY_MB * 1024 * 1024,
+    max_disk_bytes=REPORT_CACHE_DISK_MB * 1024 * 1024
+)
+# Filled report sections used to be written here without a bound; they are in report_cache now.
+shutil.rmtree(os.path.join(get_data_dir(), 'report_sections'), ignore_errors=True)
 
-def build_filling_prompt(template_markdown, answers):
-    import yaml
-    yaml_text = yaml.safe_dump(answers, sort_keys=False, allow_unicode=True)
-    parts = []
-    parts.append(
-        "You are helping to fill in a business plan document.\n"
-        "You will receive:\n"
-        "1) A markdown version of a business plan template.\n"
-        "2) A YAML structure containing questions and their answers.\n\n"
+
+def split_template_sections(template_markdown):
+    sections = []
+    current_title = None
+    current_lines = []
+    for line in template_markdown.split('\n'):
+        heading_match = re.match(r'^#{1,2} (.+)$', line)
+        if heading_match:
+            if current_title is not None or any(l.strip() for l in current_lines):
+                sections.append((current_title, '\n'.join(current_lines).strip()))
+            current_title = heading_match.group(1).strip()
+            current_lines = [line]
+        elif line.strip() != '---':
+            current_lines.append(line)
+    if current_title is not None or any(l.strip() for l in current_lines):
+        sections.append((current_title, '\n'.join(current_lines).strip()))
+    return sections
+
+
+def group_answers_by_section(answers, template_sections, answer_sections):
+    grouped = {title: {} for title, _ in template_sections}
+    for label, answer in answers.items():
+        grouped.setdefault(answer_sections.get(label, OTHER_SECTION_TITLE), {})[label] = answer
+    return grouped
+
+
+def build_fill_system_prompt(template_markdown):
+    """Instructions plus the whole template: identical for every section of every report, so providers can cache it."""
+    return (
+        "You are a helpful assistant that fills business plan templates with provided answers.\n"
+        "You fill in one section of the business plan document below at a time.\n"
+        "Each request gives you:\n"
+        "1) The markdown template for the section to fill.\n"
+        "2) A YAML structure containing questions and their answers for this section.\n\n"
         "CRITICAL INSTRUCTIONS:\n"
-        "- ONLY include sections and questions that have answers in the YAML.\n"
-        "- COMPLETELY REMOVE any sections, questions, or placeholders that do not have answers.\n"
-        "- Do NOT include '...' placeholders or empty sections.\n"
-        "- If a section has no answered questions, remove the entire section.\n"
-        "- If a question has no answer, remove that question entirely.\n"
-        "- Preserve the structure and formatting of sections that DO have answers.\n"
-        "- Insert the YAML answers into the appropriate sections of the template.\n"
-        "- Do not add explanations of what you are doing; return only the final filled markdown.\n\n"
-    )
-    parts.append("Here is the template in markdown:\n\n```markdown\n")
-    parts.append(template_markdown)
-    parts.append("\n```\n\n")
-    parts.append("Here are the answers in YAML (ONLY use questions that appear here):\n\n```yaml\n")
-    parts.append(yaml_text)
-    parts.append("\n```\n\n")
-    parts.append(
-        "Please return the business plan as markdown, including ONLY sections and questions that have answers.\n"
-        "\n"
+        "- ONLY include parts of the section that have answers in the YAML.\n"
+        "- COMPLETELY REMOVE any sub-sections, questions, or placeholders that do not have answers.\n"
+        "- Do NOT include '...' placeholders or empty sub-sections.\n"
+        "- Keep the section heading exactly as it appears in the template.\n"
+        "- Preserve the structure and formatting of the parts that DO have answers.\n"
+        "- Insert the YAML answers into the appropriate places of the section.\n"
+        "- Do not add explanations of what you are doing; return only the filled markdown for this section.\n"
+        "- Return ONLY the requested section, never other sections of the document.\n\n"
         "Important formatting instructions:\n"
         "- Add blank lines before and after all headings, lists, and tables.\n"
         "- Remove all <br> tags inside tables; replace them with '-' or paragraph formatting as appropriate.\n"
         "- Ensure nested lists use consistent indentation.\n"
         "- Do not insert manual line breaks within paragraphs; let Markdown handle text wrapping naturally.\n"
-        "- Remember: If a question or section has no answer in the YAML, do NOT include it in the output.\n"
+        "- Do not wrap the result in a code block.\n\n"
+        "The complete business plan template, for context:\n\n```markdown\n"
+        f"{template_markdown}\n```\n"
     )
+
+
+def build_section_filling_prompt(section_markdown, answers):
+    yaml_text = yaml.safe_dump(answers, sort_keys=False, allow_unicode=True)
+    parts = []
+    parts.append("Fill in this section of the template:\n\n```markdown\n")
+    parts.append(section_markdown)
+    parts.append("\n```\n\n")
+    parts.append("Here are the answers in YAML (ONLY use questions that appear here):\n\n```yaml\n")
+    parts.append(yaml_text)
+    parts.append("\n```\n\n")
+    parts.append("Return the section as markdown, including ONLY parts that have answers.")
     return "".join(parts)
 
 
-def fill_business_plan_markdown_from_answers(template_path, answers):
+def get_section_cache_key(section_markdown, answers):
+    payload = json.dumps(
+        [section_markdown, list(answers.items()), REPORT_FILL_MODEL, FILL_PROMPT_VERSION],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def fill_template_section(cache_key, section_markdown, answers, system_prompt):
+    # Filled sections live in the report cache: bounded, on disk only when its disk tier is enabled,
+    # and dropped with the session's reports (see get_report_bytes).
+    def fill():
+        prompt = build_section_filling_prompt(section_markdown, answers)
+        response = call_openai('report_fill', lambda client: client.chat.completions.create(
+            model=REPORT_FILL_MODEL,
+            messages=[
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': prompt}
+            ],
+            temperature=0.3
+        ))
+        record_usage('report_fill', response)
+        return response.choices[0].message.content.strip().encode('utf-8')
+
+    return report_cache.get_or_create(cache_key, fill).decode('utf-8')
+
+
+def get_section_fills(template_path, answers, business_plan_sections=None):
+    """(cache key, section markdown, section answers) for each template section with answers, and the system prompt."""
     with open(template_path, "r", encoding="utf-8") as f:
         template_markdown = f.read()
     
+    template_sections = split_template_sections(template_markdown)
+    answer_sections = get_answer_sections(business_plan_sections, load_template(template_path))
+    grouped_answers = group_answers_by_section(answers, template_sections, answer_sections)
+    template_titles = dict(template_sections)
+    for title in grouped_answers:
+        if title not in template_titles:
+            template_sections.append((title, f"## {title}\n\n..."))
+    
+    section_fills = [
+        (get_section_cache_key(section_markdown, grouped_answers[title]), section_markdown, grouped_answers[title])
+        for title, section_markdown in template_sections
+        if grouped_answers.get(title)
+    ]
+    return section_fills, build_fill_system_prompt(template_markdown)
+
+
+def fill_business_plan_markdown_from_answers(template_path, answers, business_plan_sections=None):
     if not answers:
         raise ValueError("No answers provided. Please answer some questions first.")
     
     print(f"Using {len(answers)} answers: {list(answers.keys())}")
     
-    prompt = build_filling_prompt(template_markdown, answers)
+    section_fills, system_prompt = get_section_fills(template_path, answers, business_plan_sections)
+    jobs = [(cache_key, section_markdown, section_answers, system_prompt) for cache_key, section_markdown, section_answers in section_fills]
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {'role': 'system', 'content': 'You are a helpful assistant that fills business plan templates with provided answers.'},
-                {'role': 'user', 'content': prompt}
-            ],
-            temperature=0.3
-        )
-        filled_markdown = response.choices[0].message.content.strip()
-        return filled_markdown
+        filled_sections = list(_fill_executor.map(lambda job: fill_template_section(*job), jobs))
+        return "\n\n---\n\n".join(filled_sections)
     except Exception as e:
         print(f"Error filling business plan: {str(e)}")
         raise
 
 
+def build_business_plan_markdown(template_path, answers, mode=None, business_plan_sections=None):
+    """Filled report markdown: rendered locally, or by the LLM section fill in 'polish' mode.
+
+    Each plan question is placed under the template heading its plan assigns (see get_answer_sections).
+    """
+    mode = mode or REPORT_RENDER_MODE
+    if mode == 'polish':
+        return fill_business_plan_markdown_from_answers(template_path, answers, business_plan_sections)
+    if not answers:
+        raise ValueError("No answers provided. Please answer some questions first.")
+    return render_business_plan(template_path, answers, business_plan_sections)
+
+
 class HTMLToDocxParser(HTMLParser):
     def __init__(self, doc):
         super().__init__()
@@ -188,23 +271,12 @@ class HTMLToDocxParser(HTMLParser):
             self.current_run.text += data
 
 
-def create_docx_from_form_data(form_data, business_plan_sections, output_docx_path=None):
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    template_path = os.path.join(base_dir, 'business_plan', 'business_plan_template.md')
-    
-    if not os.path.exists(template_path):
-        raise FileNotFoundError(f"Template not found: {template_path}")
-    
+def collect_report_answers(form_data, business_plan_sections):
+    """Report answers by label: the initial form fields plus every answered plan question."""
     if not form_data:
         raise ValueError("Form data is empty. Please start a conversation and answer some questions first.")
     
-    print(f"DEBUG: form_data type: {type(form_data)}, keys: {list(form_data.keys()) if form_data else 'None'}")
-    print(f"DEBUG: form_data items: {[(k, str(v)[:50] if v else None) for k, v in (form_data.items() if form_data else [])]}")
-    print(f"DEBUG: business_plan_sections count: {len(business_plan_sections) if business_plan_sections else 0}")
-    
     answers = {}
-    total_questions_checked = 0
-    question_ids_looked_for = []
     
     initial_form_mapping = {
         'company_name': 'Company Name',
@@ -218,40 +290,24 @@ def create_docx_from_form_data(form_data, business_plan_sections, output_docx_pa
         value = form_data.get(key)
         if value and isinstance(value, str) and value.strip() and value != '':
             answers[label] = value.strip()
-            print(f"DEBUG: Added initial form field '{label}': {value[:50]}")
     
     for section in business_plan_sections:
         for question in section.get('core_questions', []):
-            total_questions_checked += 1
             question_id = question.get('id')
             question_label = question.get('label')
             if not question_id:
                 continue
-            question_ids_looked_for.append(question_id)
             answer = form_data.get(question_id)
-            print(f"DEBUG: Looking for question_id='{question_id}', label='{question_label}', found in form_data: {question_id in form_data}, value: {str(answer)[:50] if answer else 'None'}")
             if answer and isinstance(answer, str) and answer.strip() and answer != '':
                 answers[question_label] = answer.strip()
-                print(f"DEBUG: ✓ Found answer for '{question_label}': {answer[:50]}")
         for question in section.get('optional_questions', []):
-            total_questions_checked += 1
             question_id = question.get('id')
             question_label = question.get('label')
             if not question_id:
                 continue
-            question_ids_looked_for.append(question_id)
             answer = form_data.get(question_id)
-            print(f"DEBUG: Looking for optional question_id='{question_id}', label='{question_label}', found in form_data: {question_id in form_data}, value: {str(answer)[:50] if answer else 'None'}")
             if answer and isinstance(answer, str) and answer.strip() and answer != '':
                 answers[question_label] = answer.strip()
-                print(f"DEBUG: ✓ Found optional answer for '{question_label}': {answer[:50]}")
-    
-    print(f"DEBUG: Question IDs we looked for: {question_ids_looked_for[:10]}... (showing first 10)")
-    print(f"DEBUG: Form data keys: {list(form_data.keys())}")
-    print(f"DEBUG: Matching keys: {set(question_ids_looked_for) & set(form_data.keys())}")
-    
-    print(f"DEBUG: Checked {total_questions_checked} questions, found {len(answers)} answers")
-    print(f"DEBUG: Final answers dict keys: {list(answers.keys())}")
     
     if not answers:
         available_keys = list(form_data.keys()) if form_data else []
@@ -268,12 +324,10 @@ def create_docx_from_form_data(form_data, business_plan_sections, output_docx_pa
     
     print(f"Loaded {len(answers)} answers from form_data: {list(answers.keys())}")
     
-    filled_markdown = fill_business_plan_markdown_from_answers(template_path, answers)
-    
-    if output_docx_path is None:
-        temp_dir = tempfile.gettempdir()
-        output_docx_path = os.path.join(temp_dir, f'business_plan_{os.getpid()}.docx')
-    
+    return answers
+
+
+def render_docx(filled_markdown):
     try:
         from docx import Document
         from docx.shared import Pt
@@ -285,13 +339,16 @@ def create_docx_from_form_data(form_data, business_plan_sections, output_docx_pa
         font.name = 'Calibri'
         font.size = Pt(11)
         
-        md = markdown.Markdown(extensions=['extra', 'tables', 'nl2br'])
-        html_content = md.convert(filled_markdown)
-        
-        parser = HTMLToDocxParser(doc)
-        parser.feed(html_content)
+        if DOCX_CONVERTER == 'html':
+            md = markdown.Markdown(extensions=['extra', 'tables', 'nl2br'])
+            parser = HTMLToDocxParser(doc)
+            parser.feed(md.convert(filled_markdown))
+        else:
+            MarkdownDocxBuilder(doc).feed(filled_markdown)
         
-        doc.save(output_docx_path)
+        output = io.BytesIO()
+        doc.save(output)
+        return output.getvalue()
         
     except ImportError:
         raise ImportError(
@@ -301,6 +358,83 @@ def create_docx_from_form_data(form_data, business_plan_sections, output_docx_pa
     except Exception as e:
         print(f"Error creating DOCX: {str(e)}")
         raise
+
+
+def render_pdf(filled_markdown):
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise ImportError(
+            "weasyprint is required for PDF generation. "
+            "Install it with: pip install weasyprint"
+        )
+    html_content = markdown.markdown(filled_markdown, extensions=['extra', 'tables'])
+    return HTML(string=html_content).write_pdf()
+
+
+REPORT_RENDERERS = {'docx': render_docx, 'pdf': render_pdf}
+
+
+def get_render_variant():
+    if REPORT_RENDER_MODE == 'polish':
+        return f'polish:{REPORT_FILL_MODEL}:{FILL_PROMPT_VERSION}'
+    return REPORT_RENDER_MODE
+
+
+def get_report_bytes(form_data, business_plan_sections, report_format='docx', session_id=None):
+    """The report as markdown ('md'), DOCX or PDF bytes, from the report cache when possible.
+
+    The filled markdown is cached too, so a download and an email of the same answers share one
+    template fill (and one gpt-4o fill in polish mode); concurrent requests wait for one build.
+    """
+    if report_format not in REPORT_MIMETYPES:
+        raise ValueError(f"Unsupported report format: {report_format}")
+    template_path = get_plan_template_path(business_plan_sections)
     
-    return output_docx_path
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"Template not found: {template_path}")
+    
+    answers = collect_report_answers(form_data, business_plan_sections)
+    answers_fingerprint = get_answers_fingerprint(answers)
+    template_fingerprint = get_template_fingerprint(template_path)
+    variant = get_render_variant()
+    # The plan decides which heading each answer goes under, so its content is part of the key.
+    layout_fingerprint = f"{template_fingerprint}:{getattr(business_plan_sections, 'fingerprint', '')}"
+    markdown_key = get_report_cache_key(answers_fingerprint, layout_fingerprint, 'md', variant)
+    artifact = f'docx-{DOCX_CONVERTER}' if report_format == 'docx' else report_format
+    key = get_report_cache_key(answers_fingerprint, layout_fingerprint, artifact, variant)
+    if session_id:
+        keys = {markdown_key, key}
+        if REPORT_RENDER_MODE == 'polish':
+            # Filled sections hold the answers too; tracked here so they go with the session's reports.
+            keys.update(cache_key for cache_key, _, _ in get_section_fills(template_path, answers, business_plan_sections)[0])
+        report_cache.track(session_id, answers_fingerprint, keys)
+
+    def get_markdown():
+        return report_cache.get_or_create(
+            markdown_key,
+            lambda: build_business_plan_markdown(template_path, answers, business_plan_sections=business_plan_sections).encode('utf-8')
+        ).decode('utf-8')
+
+    if report_format == 'md':
+        return get_markdown().encode('utf-8')
+    return report_cache.get_or_create(key, lambda: REPORT_RENDERERS[report_format](get_markdown()))
+
+
+def create_docx_from_form_data(form_data, business_plan_sections, output=None, session_id=None):
+    """Build the report DOCX into output, a path or a binary file object, and return output.
 
+    Without output the document is returned in a new BytesIO (rewound, ready to stream), so
+    downloads and email attachments never touch the filesystem.
+    """
+    data = get_report_bytes(form_data, business_plan_sections, 'docx', session_id)
+    if output is None:
+        return io.BytesIO(data)
+    if isinstance(output, str):
+        tmp_path = output + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, output)
+    else:
+        output.write(data)
+    return output
@@ -1,12 +1,15 @@
 import os
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
+import threading
 from datetime import datetime
 from services.docx_service import create_docx_from_form_data
-from services.yaml_service import get_yaml_path
+from services.smtp_pool import SMTPConnectionPool
+
+_smtp_pool = None
+_smtp_pool_lock = threading.Lock()
 
 
 def generate_report(form_data):
@@ -40,7 +43,7 @@ Thank you for providing your information!
     return report
 
 
-def send_report_email(form_data, business_plan_sections, yaml_path=None):
+def get_smtp_settings():
     try:
         from config.config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, FROM_EMAIL
     except ImportError:
@@ -50,19 +53,44 @@ def send_report_email(form_data, business_plan_sections, yaml_path=None):
         SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
         FROM_EMAIL = os.environ.get('FROM_EMAIL', 'hello@ainoespoo.com')
     
-    if not SMTP_PASSWORD:
-        print("Warning: SMTP password not found. Report will not be sent.")
-        return False
+    try:
+        from config.config import SMTP_USE_TLS, SMTP_POOL_SIZE
+    except ImportError:
+        SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'true').lower() not in ('0', 'false', 'no')
+        SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 4))
     
-    sender = FROM_EMAIL
+    return {
+        'server': SMTP_SERVER,
+        'port': SMTP_PORT,
+        'username': SMTP_USERNAME,
+        'password': SMTP_PASSWORD,
+        'from_email': FROM_EMAIL,
+        'use_tls': SMTP_USE_TLS,
+        'pool_size': SMTP_POOL_SIZE
+    }
+
+
+def get_smtp_pool():
+    global _smtp_pool
+    with _smtp_pool_lock:
+        if _smtp_pool is None:
+            settings = get_smtp_settings()
+            _smtp_pool = SMTPConnectionPool(
+                settings['server'],
+                settings['port'],
+                username=settings['username'],
+                password=settings['password'],
+                use_starttls=settings['use_tls'],
+                max_connections=settings['pool_size']
+            )
+        return _smtp_pool
+
+
+def build_report_message(form_data, business_plan_sections, sender, session_id=None, require_attachment=True):
+    # A failed DOCX build (report fill or OpenAI error) raises so the send can be retried; only
+    # with require_attachment=False is the email sent without it.
     receiver = form_data.get('email')
     
-    if not receiver:
-        return False
-    
-    if yaml_path is None:
-        yaml_path = get_yaml_path()
-    
     report_text = generate_report(form_data)
     
     msg = MIMEMultipart()
@@ -72,42 +100,81 @@ def send_report_email(form_data, business_plan_sections, yaml_path=None):
     
     msg.attach(MIMEText(report_text, 'plain'))
     
-    docx_path = None
     try:
-        docx_path = create_docx_from_form_data(form_data, business_plan_sections)
-        if docx_path and os.path.exists(docx_path):
-            with open(docx_path, 'rb') as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-            
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename=business_plan.docx',
-            )
-            msg.attach(part)
+        docx_buffer = create_docx_from_form_data(form_data, business_plan_sections, session_id=session_id)
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(docx_buffer.getvalue())
+        
+        encoders.encode_base64(part)
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename=business_plan.docx',
+        )
+        msg.attach(part)
     except Exception as e:
-        print(f"Warning: Could not create or attach DOCX: {str(e)}")
+        if require_attachment:
+            raise
+        print(f"Warning: Could not create or attach DOCX, sending without it: {str(e)}")
+    
+    return msg
+
+
+def send_report_email(form_data, business_plan_sections, yaml_path=None, session_id=None):
+    settings = get_smtp_settings()
+    
+    if not settings['password']:
+        print("Warning: SMTP password not found. Report will not be sent.")
+        return False
+    
+    receiver = form_data.get('email')
+    
+    if not receiver:
+        return False
+    
+    sender = settings['from_email']
+    msg = build_report_message(form_data, business_plan_sections, sender, session_id)
     
     try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(sender, receiver, msg.as_string())
-        
-        if docx_path and os.path.exists(docx_path):
-            try:
-                os.remove(docx_path)
-            except:
-                pass
-        
+        get_smtp_pool().send_message(sender, [receiver], msg)
         return True
     except Exception as e:
         print(f"Error sending email: {str(e)}")
-        if docx_path and os.path.exists(docx_path):
-            try:
-                os.remove(docx_path)
-            except:
-                pass
         raise
 
+
+def send_report_emails(reports):
+    """Send many reports over the shared pool's connections.
+
+    reports is a list of (form_data, business_plan_sections, session_id, require_attachment).
+    Returns one entry per report like send_report_email: True if delivered, False if it cannot be
+    sent (no SMTP password or recipient), or the exception that stopped it (including a failed
+    DOCX build when the attachment is required).
+    """
+    settings = get_smtp_settings()
+    
+    if not settings['password']:
+        print("Warning: SMTP password not found. Reports will not be sent.")
+        return [False] * len(reports)
+    
+    sender = settings['from_email']
+    results = [False] * len(reports)
+    messages = []
+    indexes = []
+    for index, (form_data, business_plan_sections, session_id, require_attachment) in enumerate(reports):
+        if not form_data.get('email'):
+            continue
+        try:
+            msg = build_report_message(form_data, business_plan_sections, sender, session_id, require_attachment)
+            messages.append((sender, [form_data['email']], msg))
+            indexes.append(index)
+        except Exception as e:
+            print(f"Error building report email for {form_data['email']}: {str(e)}")
+            results[index] = e
+    
+    for index, error in zip(indexes, get_smtp_pool().send_messages(messages)):
+        if error is None:
+            results[index] = True
+        else:
+            print(f"Error sending email to {reports[index][0]['email']}: {str(error)}")
+            results[index] = error
+    return results
@@ -0,0 +1,211 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COMMON_WORDS = frozenset({
+    'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i',
+    'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at',
+    'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
+    'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their',
+    'what', 'so', 'up', 'out', 'if', 'about', 'who', 'get', 'which',
+    'go', 'me', 'when', 'make', 'can', 'like', 'time', 'no', 'just',
+    'him', 'know', 'take', 'people', 'into', 'year', 'your', 'good',
+    'some', 'could', 'them', 'see', 'other', 'than', 'then', 'now',
+    'look', 'only', 'come', 'its', 'over', 'think', 'also', 'back',
+    'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well',
+    'way', 'even', 'new', 'want', 'because', 'any', 'these', 'give',
+    'day', 'most', 'us', 'is', 'are', 'was', 'were', 'has', 'had',
+    'been', 'being', 'does', 'did', 'should', 'may', 'might', 'must',
+    'cannot', 'shall', 'ought'
+})
+
+NON_LETTER_PATTERN = re.compile(r'[^a-z]')
+WORD_PATTERN = re.compile(r'\b[a-z]+\b')
+CONSONANT_RUN_PATTERN = re.compile(r'[b-df-hj-np-tv-z]{5,}')
+CONSONANT_RUN_ANY_PATTERN = re.compile(r'[b-df-hj-np-tv-z]+')
+FEATURE_NAMES = ('clean_length', 'letters', 'vowels', 'max_consonant_run', 'words', 'common_words')
+VOWELS = 'aeiou'
+
+MIN_LENGTH = 4
+MAX_VOWEL_RATIO = 0.15
+VOWEL_RATIO_MIN_LETTERS = 6
+NO_COMMON_WORDS_MIN_WORDS = 3
+NO_COMMON_WORDS_MIN_LETTERS = 9
+CONSONANT_RUN_LENGTH = 5
+CONSONANT_RUN_MIN_LETTERS = 7
+
+if np is not None:
+    _VOWEL_TABLE = np.zeros(256, dtype=bool)
+    _VOWEL_TABLE[np.frombuffer(VOWELS.encode(), dtype=np.uint8)] = True
+    _LETTER_TABLE = np.zeros(256, dtype=bool)
+    _LETTER_TABLE[ord('a'):ord('z') + 1] = True
+    _WORD_CHAR_TABLE = _LETTER_TABLE.copy()
+    _WORD_CHAR_TABLE[ord('A'):ord('Z') + 1] = True
+    _WORD_CHAR_TABLE[ord('0'):ord('9') + 1] = True
+    _WORD_CHAR_TABLE[ord('_')] = True
+
+
+class GibberishDetector:
+    """Flags keyboard mashing and random strings.
+
+    A text is gibberish when it has at least 4 letters and any of: almost no vowels, three or
+    more words none of which is a common English word, or a run of 5+ consonants (counted over
+    the letters with spaces and punctuation removed). `score_batch` applies the same rules to
+    many texts at once with NumPy.
+    """
+
+    def __init__(self, common_words=COMMON_WORDS):
+        self.common_words = frozenset(common_words)
+
+    def is_gibberish(self, text):
+        text_clean = text.strip().lower()
+        if len(text_clean) < MIN_LENGTH:
+            return False
+
+        text_alpha = NON_LETTER_PATTERN.sub('', text_clean)
+        letter_count = len(text_alpha)
+        if letter_count < MIN_LENGTH:
+            return False
+
+        vowel_count = sum(text_alpha.count(vowel) for vowel in VOWELS)
+        if (vowel_count < letter_count and letter_count >= VOWEL_RATIO_MIN_LETTERS
+                and vowel_count / letter_count < MAX_VOWEL_RATIO):
+            return True
+
+        if letter_count >= NO_COMMON_WORDS_MIN_LETTERS:
+            words = WORD_PATTERN.findall(text_clean)
+            if len(words) >= NO_COMMON_WORDS_MIN_WORDS and self.common_words.isdisjoint(words):
+                return True
+
+        return letter_count >= CONSONANT_RUN_MIN_LETTERS and CONSONANT_RUN_PATTERN.search(text_alpha) is not None
+
+    def is_nonsensical(self, text):
+        """Digits only, almost no distinct characters, or gibberish."""
+        text_clean = text.strip()
+        compact = text_clean.replace(' ', '')
+        if compact.isdigit() and len(compact) > 3:
+            return True
+        if len(set(compact)) < 3 and len(text_clean) > 5:
+            return True
+        return self.is_gibberish(text_clean)
+
+    def text_features(self, text):
+        """(clean_length, letters, vowels, max_consonant_run, words, common_words) for one text."""
+        text_clean = text.strip().lower()
+        text_alpha = NON_LETTER_PATTERN.sub('', text_clean)
+        runs = CONSONANT_RUN_ANY_PATTERN.findall(text_alpha)
+        words = WORD_PATTERN.findall(text_clean)
+        return (
+            len(text_clean),
+            len(text_alpha),
+            sum(text_alpha.count(vowel) for vowel in VOWELS),
+            max(map(len, runs), default=0),
+            len(words),
+            sum(1 for word in words if word in self.common_words)
+        )
+
+    def features_batch(self, texts):
+        """Per-text features as NumPy arrays: clean_length, letters, vowels, max_consonant_run, words, common_words.
+
+        ASCII texts (nearly all input) are processed together in one byte buffer; the rare
+        non-ASCII text goes through text_features so regex word boundaries stay identical.
+        """
+        cleaned = [text.strip().lower() for text in texts]
+        count = len(cleaned)
+        is_ascii = np.fromiter((text.isascii() for text in cleaned), dtype=bool, count=count)
+        ascii_index = np.flatnonzero(is_ascii)
+        features = np.zeros((6, count), dtype=np.int64)
+        if len(ascii_index):
+            features[:, ascii_index] = self._ascii_features([cleaned[i] for i in ascii_index])
+        for i in np.flatnonzero(~is_ascii):
+            features[:, i] = self.text_features(cleaned[i])
+        return dict(zip(FEATURE_NAMES, features))
+
+    def _ascii_features(self, cleaned):
+        count = len(cleaned)
+        lengths = np.fromiter((len(text) for text in cleaned), dtype=np.int64, count=count)
+        # Texts are joined with a newline (not a letter or word character) after each one.
+        buffer = np.frombuffer(('\n'.join(cleaned) + '\n').encode('ascii'), dtype=np.uint8)
+        text_ids = np.repeat(np.arange(count), lengths + 1)
+
+        letter_mask = _LETTER_TABLE[buffer]
+        vowel_mask = _VOWEL_TABLE[buffer]
+        letters = np.bincount(text_ids, weights=letter_mask, minlength=count).astype(np.int64)
+        vowels = np.bincount(text_ids, weights=vowel_mask, minlength=count).astype(np.int64)
+
+        # Consonant runs are measured on the letters only, so spaces and digits do not break them,
+        # but a run never continues into the next text.
+        alpha_ids = text_ids[letter_mask]
+        consonants = ~vowel_mask[letter_mask]
+        max_run = np.zeros(count, dtype=np.int64)
+        if len(alpha_ids):
+            text_start = np.ones(len(alpha_ids), dtype=bool)
+            text_start[1:] = alpha_ids[1:] != alpha_ids[:-1]
+            text_end = np.ones(len(alpha_ids), dtype=bool)
+            text_end[:-1] = text_start[1:]
+            previous = np.zeros(len(alpha_ids), dtype=bool)
+            previous[1:] = consonants[:-1]
+            following = np.zeros(len(alpha_ids), dtype=bool)
+            following[:-1] = consonants[1:]
+            run_starts = np.flatnonzero(consonants & (~previous | text_start))
+            run_ends = np.flatnonzero(consonants & (~following | text_end))
+            np.maximum.at(max_run, alpha_ids[run_starts], run_ends - run_starts + 1)
+
+        # `\b[a-z]+\b` matches exactly the maximal runs of word characters that are all letters.
+        word_char = _WORD_CHAR_TABLE[buffer]
+        edges = np.diff(np.concatenate(([0], word_char.view(np.int8), [0])))
+        word_starts = np.flatnonzero(edges == 1)
+        word_lengths = np.flatnonzero(edges == -1) - word_starts
+        non_letters = np.cumsum(np.concatenate(([0], (word_char & ~letter_mask).view(np.int8))))
+        is_word = non_letters[word_starts + word_lengths] == non_letters[word_starts]
+        word_starts = word_starts[is_word]
+        word_lengths = word_lengths[is_word]
+        word_ids = text_ids[word_starts]
+        words = np.bincount(word_ids, minlength=count)
+
+        # Common words are at most 8 letters, so pack each candidate into a uint64 and test membership.
+        short = word_lengths <= 8
+        offsets = np.arange(8)
+        positions = np.minimum(word_starts[short, None] + offsets, len(buffer) - 1)
+        packed_bytes = np.where(offsets < word_lengths[short, None], buffer[positions], 0).astype(np.uint64)
+        packed = np.bitwise_or.reduce(packed_bytes << (offsets.astype(np.uint64) * np.uint64(8)), axis=1)
+        common = np.isin(packed, self._packed_common_words)
+        common_words = np.bincount(word_ids[short][common], minlength=count)
+
+        return np.stack([lengths, letters, vowels, max_run, words, common_words])
+
+    @property
+    def _packed_common_words(self):
+        packed = getattr(self, '_packed_cache', None)
+        if packed is None:
+            packed = np.array(
+                [int.from_bytes(word.encode('ascii'), 'little') for word in self.common_words
+                 if len(word) <= 8 and word.isascii()],
+                dtype=np.uint64
+            )
+            self._packed_cache = packed
+        return packed
+
+    def score_batch(self, texts):
+        """Gibberish flags for many texts (a NumPy bool array, or a list without NumPy)."""
+        texts = list(texts)
+        if np is None:
+            return [self.is_gibberish(text) for text in texts]
+        if not texts:
+            return np.zeros(0, dtype=bool)
+
+        f = self.features_batch(texts)
+        letters = f['letters']
+        eligible = (f['clean_length'] >= MIN_LENGTH) & (letters >= MIN_LENGTH)
+        low_vowels = ((f['vowels'] < letters) & (letters >= VOWEL_RATIO_MIN_LETTERS)
+                      & (f['vowels'] / np.maximum(letters, 1) < MAX_VOWEL_RATIO))
+        no_common_words = ((f['words'] >= NO_COMMON_WORDS_MIN_WORDS) & (f['common_words'] == 0)
+                           & (letters >= NO_COMMON_WORDS_MIN_LETTERS))
+        consonant_run = (f['max_consonant_run'] >= CONSONANT_RUN_LENGTH) & (letters >= CONSONANT_RUN_MIN_LETTERS)
+        return eligible & (low_vowels | no_common_words | consonant_run)
+
+
+gibberish_detector = GibberishDetector()
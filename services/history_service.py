@@ -0,0 +1,135 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.usage_service import record_usage
+from services.openai_client import call_openai
+
+try:
+    from config.config import HISTORY_TOKEN_BUDGET, HISTORY_MAX_MESSAGES, HISTORY_SUMMARY_MODEL
+except ImportError:
+    HISTORY_TOKEN_BUDGET = int(os.environ.get('HISTORY_TOKEN_BUDGET', 1000))
+    HISTORY_MAX_MESSAGES = int(os.environ.get('HISTORY_MAX_MESSAGES', 40))
+    HISTORY_SUMMARY_MODEL = os.environ.get('HISTORY_SUMMARY_MODEL', 'gpt-4o-mini')
+
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_MAX_TOKENS = 200
+MAX_PENDING_SUMMARIES = 1000
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='history-summary')
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    # About four characters per token for English; close enough for budgeting without a tokenizer.
+    return len(text) // 4 + 1
+
+
+def message_tokens(message):
+    return estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def select_history_window(chat_history, budget=HISTORY_TOKEN_BUDGET):
+    """The longest suffix of chat_history that fits in budget (always at least the last message)."""
+    total = 0
+    start = len(chat_history)
+    while start > 0:
+        tokens = message_tokens(chat_history[start - 1])
+        if total + tokens > budget and start < len(chat_history):
+            break
+        total += tokens
+        start -= 1
+    return chat_history[start:]
+
+
+def get_fold_count(chat_history, budget=HISTORY_TOKEN_BUDGET):
+    """How many leading messages to fold into the summary, or 0 while the history fits the budget.
+
+    Folding cuts the history down to half the budget in whole exchanges, so the window start (and
+    with it the prompt prefix) stays put for several turns instead of sliding every turn.
+    """
+    sizes = [message_tokens(message) for message in chat_history]
+    total = sum(sizes)
+    if total <= budget:
+        return 0
+    count = 0
+    while count < len(chat_history) - 2 and total > budget // 2:
+        total -= sizes[count] + sizes[count + 1]
+        count += 2
+    return count
+
+
+def summarize_history(previous_summary, messages):
+    transcript = '\n'.join(f"{message['role']}: {message['content']}" for message in messages)
+    prompt = f"""Update the running summary of a conversation between a business advisor assistant and an entrepreneur.
+
+Previous summary:
+{previous_summary or '(none)'}
+
+New messages:
+{transcript}
+
+Write the updated summary in at most 120 words. Keep every fact the entrepreneur stated about themselves and their business; drop greetings and filler."""
+
+    response = call_openai('history_summary', lambda client: client.chat.completions.create(
+        model=HISTORY_SUMMARY_MODEL,
+        messages=[{'role': 'user', 'content': prompt}],
+        temperature=0.3,
+        max_tokens=SUMMARY_MAX_TOKENS
+    ))
+    record_usage('history_summary', response)
+    return response.choices[0].message.content.strip()
+
+
+def trim_history(state):
+    # Hard cap on stored history, e.g. while summaries keep failing.
+    excess = len(state['chat_history']) - HISTORY_MAX_MESSAGES
+    if excess > 0:
+        del state['chat_history'][:excess + excess % 2]
+
+
+def schedule_history_compaction(session_id, state):
+    """Start summarizing the oldest messages in the background once the history outgrows the budget."""
+    trim_history(state)
+    chat_history = state['chat_history']
+    count = get_fold_count(chat_history)
+    if not count:
+        return
+    with _pending_lock:
+        if session_id in _pending:
+            return
+        if len(_pending) >= MAX_PENDING_SUMMARIES:
+            # Finished summaries of sessions that never came back.
+            for stale_id in [key for key, (_, future) in _pending.items() if future.done()]:
+                del _pending[stale_id]
+        folded = [dict(message) for message in chat_history[:count]]
+        future = _summary_executor.submit(summarize_history, state.get('history_summary', ''), folded)
+        _pending[session_id] = (folded, future)
+
+
+def apply_history_summary(session_id, state):
+    """Fold a finished background summary into state. Called at the start of a turn, on the request thread."""
+    with _pending_lock:
+        entry = _pending.get(session_id)
+        if entry is None or not entry[1].done():
+            return
+        del _pending[session_id]
+    folded, future = entry
+    try:
+        summary = future.result()
+    except Exception as e:
+        print(f"History summary error: {str(e)}")
+        return
+    chat_history = state['chat_history']
+    # The session may have been reset or restored from another worker since the job started.
+    if chat_history[:len(folded)] != folded:
+        return
+    del chat_history[:len(folded)]
+    state['history_summary'] = summary
+
+
+def cancel_history_compaction(session_id):
+    with _pending_lock:
+        entry = _pending.pop(session_id, None)
+    if entry is not None:
+        entry[1].cancel()
@@ -0,0 +1,306 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from utils.helpers import get_data_dir
+
+try:
+    from config.config import JOB_WORKERS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS
+except ImportError:
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 4))
+    JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 5))
+
+try:
+    from config.config import JOB_RETENTION_SECONDS
+except ImportError:
+    JOB_RETENTION_SECONDS = float(os.environ.get('JOB_RETENTION_SECONDS', 24 * 3600))
+
+POLL_INTERVAL = 0.5
+# Running jobs are touched every HEARTBEAT_INTERVAL while their handler works, so a job only
+# goes stale (and is requeued) when the process running it has died, however long it takes.
+HEARTBEAT_INTERVAL = 30
+STALE_RUNNING_SECONDS = 600
+PURGE_INTERVAL = 600
+
+_handlers = {}
+_batch_handlers = {}
+_local = threading.local()
+_workers = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+_last_purge = 0
+_purge_lock = threading.Lock()
+_running_jobs = set()
+_running_lock = threading.Lock()
+
+
+class PermanentJobError(Exception):
+    pass
+
+
+def get_jobs_db_path():
+    return os.path.join(get_data_dir(), 'jobs.db')
+
+
+def get_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(get_jobs_db_path(), timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, '
+            'job_type TEXT NOT NULL, '
+            'session_id TEXT, '
+            'payload TEXT NOT NULL, '
+            'status TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'max_attempts INTEGER NOT NULL, '
+            'run_after REAL NOT NULL, '
+            'result TEXT, '
+            'error TEXT, '
+            'created_at REAL NOT NULL, '
+            'updated_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, run_after)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_checkpoints ('
+            'job_id TEXT NOT NULL, '
+            'step TEXT NOT NULL, '
+            'created_at REAL NOT NULL, '
+            'PRIMARY KEY (job_id, step))'
+        )
+        _local.conn = conn
+    return conn
+
+
+def register_job_handler(job_type, handler):
+    _handlers[job_type] = handler
+
+
+def register_batch_job_handler(job_type, handler, batch_size):
+    """Run up to batch_size queued jobs of job_type in one call.
+
+    The handler gets a list of {'job_id', 'payload', 'attempt', 'last_attempt'} dicts and returns
+    one entry per job: its result, or the exception that failed it (retried like a raised one).
+    """
+    _batch_handlers[job_type] = (handler, batch_size)
+
+
+def enqueue_job(job_type, payload, session_id=None, max_attempts=None):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    get_connection().execute(
+        'INSERT INTO jobs (id, job_type, session_id, payload, status, max_attempts, run_after, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (job_id, job_type, session_id, json.dumps(payload), 'queued',
+         max_attempts or JOB_MAX_ATTEMPTS, now, now, now)
+    )
+    start_workers()
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id, session_id=None):
+    row = get_connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None or (session_id is not None and row['session_id'] != session_id):
+        return None
+    return {
+        'job_id': row['id'],
+        'type': row['job_type'],
+        'status': row['status'],
+        'attempts': row['attempts'],
+        'payload': json.loads(row['payload']),
+        'result': json.loads(row['result']) if row['result'] else None,
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at']
+    }
+
+
+def claim_next_jobs():
+    """The oldest due job, plus more due jobs of its type when that type has a batch handler."""
+    conn = get_connection()
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+            (now, now - STALE_RUNNING_SECONDS)
+        )
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY created_at LIMIT 1",
+            (now,)
+        ).fetchall()
+        if rows and rows[0]['job_type'] in _batch_handlers:
+            _, batch_size = _batch_handlers[rows[0]['job_type']]
+            rows += conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ? AND job_type = ? AND id != ? "
+                "ORDER BY created_at LIMIT ?",
+                (now, rows[0]['job_type'], rows[0]['id'], batch_size - 1)
+            ).fetchall()
+        for row in rows:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (now, row['id'])
+            )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return rows
+
+
+def finish_job(job_id, status, result=None, error=None, run_after=None):
+    now = time.time()
+    get_connection().execute(
+        'UPDATE jobs SET status = ?, result = ?, error = ?, run_after = COALESCE(?, run_after), updated_at = ? WHERE id = ?',
+        (status, json.dumps(result) if result is not None else None, error, run_after, now, job_id)
+    )
+
+
+def set_job_checkpoint(job_id, step):
+    """Record that a side effect of a job (e.g. an email) has happened, so retries can skip it."""
+    get_connection().execute(
+        'INSERT OR IGNORE INTO job_checkpoints (job_id, step, created_at) VALUES (?, ?, ?)',
+        (job_id, step, time.time())
+    )
+
+
+def has_job_checkpoint(job_id, step):
+    row = get_connection().execute(
+        'SELECT 1 FROM job_checkpoints WHERE job_id = ? AND step = ?', (job_id, step)
+    ).fetchone()
+    return row is not None
+
+
+def purge_finished_jobs():
+    # Finished jobs still hold the session's answers in their payload; drop them after the retention period.
+    global _last_purge
+    now = time.time()
+    with _purge_lock:
+        if now - _last_purge < PURGE_INTERVAL:
+            return 0
+        _last_purge = now
+    conn = get_connection()
+    cursor = conn.execute(
+        "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+        (now - JOB_RETENTION_SECONDS,)
+    )
+    conn.execute('DELETE FROM job_checkpoints WHERE job_id NOT IN (SELECT id FROM jobs)')
+    return cursor.rowcount
+
+
+def heartbeat_loop():
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        with _running_lock:
+            job_ids = list(_running_jobs)
+        if not job_ids:
+            continue
+        try:
+            get_connection().execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status = 'running' AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), *job_ids)
+            )
+        except sqlite3.Error as e:
+            print(f"Job heartbeat error: {str(e)}")
+
+
+def get_retry_delay(attempt):
+    delay = JOB_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+    return delay + random.uniform(0, delay / 2)
+
+
+def fail_job(row, error):
+    attempt = row['attempts'] + 1
+    if isinstance(error, PermanentJobError) or attempt >= row['max_attempts']:
+        finish_job(row['id'], 'failed', error=str(error))
+    else:
+        finish_job(row['id'], 'queued', error=str(error), run_after=time.time() + get_retry_delay(attempt))
+
+
+def run_job(row):
+    handler = _handlers.get(row['job_type'])
+    attempt = row['attempts'] + 1
+    if handler is None:
+        finish_job(row['id'], 'failed', error=f"No handler for job type {row['job_type']}")
+        return
+    with _running_lock:
+        _running_jobs.add(row['id'])
+    try:
+        result = handler(row['id'], json.loads(row['payload']))
+        finish_job(row['id'], 'succeeded', result=result)
+    except PermanentJobError as e:
+        fail_job(row, e)
+    except Exception as e:
+        print(f"Job {row['id']} ({row['job_type']}) attempt {attempt} failed: {traceback.format_exc()}")
+        fail_job(row, e)
+    finally:
+        with _running_lock:
+            _running_jobs.discard(row['id'])
+
+
+def run_job_batch(rows):
+    handler, _ = _batch_handlers[rows[0]['job_type']]
+    jobs = [{
+        'job_id': row['id'],
+        'payload': json.loads(row['payload']),
+        'attempt': row['attempts'] + 1,
+        'last_attempt': row['attempts'] + 1 >= row['max_attempts']
+    } for row in rows]
+    with _running_lock:
+        _running_jobs.update(row['id'] for row in rows)
+    try:
+        try:
+            outcomes = handler(jobs)
+        except Exception as e:
+            print(f"Job batch ({rows[0]['job_type']}, {len(rows)} jobs) failed: {traceback.format_exc()}")
+            outcomes = [e] * len(rows)
+        for row, outcome in zip(rows, outcomes):
+            if isinstance(outcome, Exception):
+                if not isinstance(outcome, PermanentJobError):
+                    print(f"Job {row['id']} ({row['job_type']}) attempt {row['attempts'] + 1} failed: {str(outcome)}")
+                fail_job(row, outcome)
+            else:
+                finish_job(row['id'], 'succeeded', result=outcome)
+    finally:
+        with _running_lock:
+            _running_jobs.difference_update(row['id'] for row in rows)
+
+
+def worker_loop():
+    while True:
+        try:
+            purge_finished_jobs()
+            rows = claim_next_jobs()
+        except Exception as e:
+            print(f"Job queue error: {str(e)}")
+            rows = []
+        if not rows:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+        if rows[0]['job_type'] in _batch_handlers:
+            run_job_batch(rows)
+        else:
+            run_job(rows[0])
+
+
+def start_workers():
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(JOB_WORKERS):
+            worker = threading.Thread(target=worker_loop, name=f'job-worker-{i}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+        heartbeat = threading.Thread(target=heartbeat_loop, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        _workers.append(heartbeat)
@@ -0,0 +1,324 @@
+import re
+from docx.enum.table import WD_TABLE_ALIGNMENT
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+HEADING_PATTERN = re.compile(r'^ {0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+RULE_PATTERN = re.compile(r'^ {0,3}([-*_])( *\1){2,}\s*$')
+LIST_ITEM_PATTERN = re.compile(r'^( *)([-*+]|\d{1,9}[.)])\s+(.*)$')
+FENCE_PATTERN = re.compile(r'^ {0,3}(```|~~~)')
+QUOTE_PATTERN = re.compile(r'^ {0,3}> ?(.*)$')
+TABLE_DELIMITER_PATTERN = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+CELL_SPLIT_PATTERN = re.compile(r'(?<!\\)\|')
+INLINE_PATTERN = re.compile(
+    r'\\(?P<escaped>[\\`*_{}\[\]()#+\-.!|<>])'
+    r'|`(?P<code>[^`]+)`'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)\s]+)(?:\s+"[^"]*")?\)'
+    r'|<(?P<autolink>https?://[^>\s]+)>'
+    r'|(?P<line_break><br\s*/?>)'
+    r'|(?P<bold_marker>\*\*|__)(?=\S)(?P<bold>.+?)(?<=\S)(?P=bold_marker)'
+    r'|\*(?=\S)(?P<star_italic>.+?)(?<=\S)\*'
+    r'|(?<!\w)_(?=\S)(?P<underscore_italic>.+?)(?<=\S)_(?!\w)'
+)
+CODE_FONT = 'Courier New'
+LINK_COLOR = '0563C1'
+MAX_LIST_DEPTH = 3
+
+
+def split_table_row(line):
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in CELL_SPLIT_PATTERN.split(line)]
+
+
+def get_cell_alignment(delimiter):
+    if delimiter.startswith(':') and delimiter.endswith(':'):
+        return 'center'
+    if delimiter.endswith(':'):
+        return 'right'
+    return 'left'
+
+
+def set_paragraph_properties(paragraph, style_id=None, num_id=None, alignment=None):
+    # Elements are appended in schema order (pStyle, numPr, jc) onto a paragraph without pPr yet.
+    properties = OxmlElement('w:pPr')
+    if style_id:
+        style = OxmlElement('w:pStyle')
+        style.set(qn('w:val'), style_id)
+        properties.append(style)
+    if num_id is not None:
+        numbering = OxmlElement('w:numPr')
+        level = OxmlElement('w:ilvl')
+        level.set(qn('w:val'), '0')
+        numbering.append(level)
+        number = OxmlElement('w:numId')
+        number.set(qn('w:val'), str(num_id))
+        numbering.append(number)
+        properties.append(numbering)
+    if alignment:
+        justification = OxmlElement('w:jc')
+        justification.set(qn('w:val'), alignment)
+        properties.append(justification)
+    paragraph._p.insert(0, properties)
+
+
+def make_run(text, bold=False, italic=False, code=False, link=False):
+    # Runs are built as raw elements: going through Run.bold / Run.text costs a schema-ordered
+    # child lookup per property and per character, which dominates large reports.
+    run = OxmlElement('w:r')
+    properties = OxmlElement('w:rPr')
+    if code:
+        fonts = OxmlElement('w:rFonts')
+        fonts.set(qn('w:ascii'), CODE_FONT)
+        fonts.set(qn('w:hAnsi'), CODE_FONT)
+        properties.append(fonts)
+    if bold:
+        properties.append(OxmlElement('w:b'))
+    if italic:
+        properties.append(OxmlElement('w:i'))
+    if link:
+        color = OxmlElement('w:color')
+        color.set(qn('w:val'), LINK_COLOR)
+        properties.append(color)
+        underline = OxmlElement('w:u')
+        underline.set(qn('w:val'), 'single')
+        properties.append(underline)
+    if len(properties):
+        run.append(properties)
+    for position, chunk in enumerate(text.split('\t')):
+        if position:
+            run.append(OxmlElement('w:tab'))
+        if chunk:
+            text_element = OxmlElement('w:t')
+            text_element.text = chunk
+            text_element.set(qn('xml:space'), 'preserve')
+            run.append(text_element)
+    return run
+
+
+class MarkdownDocxBuilder:
+    """Builds python-docx content straight from markdown in one pass over its lines.
+
+    Covers what the report templates and fills use: headings, paragraphs (newlines kept as line
+    breaks), bold/italic/code, links, `<br>`, nested bullet and numbered lists, pipe tables,
+    block quotes, fenced code and horizontal rules.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.paragraph = None
+        self.paragraph_kind = None
+        self.lists = []
+        self.style_ids = {}
+
+    def feed(self, markdown_text):
+        lines = markdown_text.split('\n')
+        index = 0
+        while index < len(lines):
+            line = lines[index].rstrip()
+            index += 1
+
+            if not line.strip():
+                self.end_paragraph()
+                continue
+
+            if FENCE_PATTERN.match(line):
+                index = self.add_code_block(lines, index, FENCE_PATTERN.match(line).group(1))
+                continue
+
+            heading_match = HEADING_PATTERN.match(line)
+            if heading_match:
+                self.end_block()
+                self.paragraph = self.add_paragraph(f'Heading {len(heading_match.group(1))}')
+                self.add_inline(self.paragraph, heading_match.group(2))
+                self.end_paragraph()
+                continue
+
+            if RULE_PATTERN.match(line):
+                self.end_block()
+                self.add_rule()
+                continue
+
+            if '|' in line and index < len(lines) and '|' in lines[index] and TABLE_DELIMITER_PATTERN.match(lines[index]):
+                self.end_block()
+                index = self.add_table(lines, index - 1)
+                continue
+
+            item_match = LIST_ITEM_PATTERN.match(line)
+            if item_match:
+                self.add_list_item(len(item_match.group(1)), item_match.group(2), item_match.group(3))
+                continue
+
+            quote_match = QUOTE_PATTERN.match(line)
+            if quote_match:
+                self.add_text_line(quote_match.group(1), 'quote')
+                continue
+
+            if self.lists and self.paragraph_kind == 'list':
+                # Lazy continuation of the current list item.
+                self.add_text_line(line.strip(), 'list')
+                continue
+            if self.lists and line.startswith(' ') and self.paragraph is None:
+                self.paragraph = self.add_paragraph(self.list_style('List Continue', len(self.lists)))
+                self.paragraph_kind = 'continue'
+                self.add_inline(self.paragraph, line.strip())
+                continue
+
+            self.lists = []
+            self.add_text_line(line.strip(), 'text')
+
+        self.end_block()
+
+    def get_style_id(self, style_name):
+        # python-docx resolves a style name by scanning every style in the document on each
+        # paragraph; large reports spend most of their time there, so look each name up once.
+        style_id = self.style_ids.get(style_name)
+        if style_id is None:
+            style_id = self.style_ids[style_name] = self.doc.styles[style_name].style_id
+        return style_id
+
+    def add_paragraph(self, style_name=None, num_id=None):
+        paragraph = self.doc.add_paragraph()
+        if style_name or num_id is not None:
+            set_paragraph_properties(paragraph, self.get_style_id(style_name) if style_name else None, num_id)
+        return paragraph
+
+    def end_paragraph(self):
+        self.paragraph = None
+        self.paragraph_kind = None
+
+    def end_block(self):
+        self.end_paragraph()
+        self.lists = []
+
+    def add_text_line(self, text, kind):
+        if self.paragraph is not None and self.paragraph_kind == kind:
+            self.paragraph.add_run().add_break()
+        else:
+            if kind != 'list':
+                self.lists = []
+            self.paragraph = self.add_paragraph('Quote' if kind == 'quote' else None)
+            self.paragraph_kind = kind
+        self.add_inline(self.paragraph, text)
+
+    def list_style(self, name, depth):
+        depth = min(depth, MAX_LIST_DEPTH)
+        return name if depth == 1 else f'{name} {depth}'
+
+    def add_list_item(self, indent, marker, text):
+        ordered = marker[-1] in '.)'
+        while self.lists and self.lists[-1]['indent'] > indent:
+            self.lists.pop()
+        if self.lists and self.lists[-1]['indent'] == indent and self.lists[-1]['ordered'] != ordered:
+            self.lists.pop()
+        if not self.lists or self.lists[-1]['indent'] < indent:
+            style_name = self.list_style('List Number' if ordered else 'List Bullet', len(self.lists) + 1)
+            num_id = self.restart_numbering(style_name, int(marker[:-1])) if ordered else None
+            self.lists.append({'indent': indent, 'ordered': ordered, 'style': style_name, 'num_id': num_id})
+
+        current = self.lists[-1]
+        self.paragraph = self.add_paragraph(current['style'], current['num_id'])
+        self.paragraph_kind = 'list'
+        self.add_inline(self.paragraph, text)
+
+    def restart_numbering(self, style_name, start):
+        # Every numbered list shares its style's numbering; a new num with a start override
+        # makes this list count from its own first marker instead of continuing the last one.
+        style_pr = self.doc.styles[style_name].element.pPr
+        if style_pr is None or style_pr.numPr is None or style_pr.numPr.numId is None:
+            return None
+        numbering = self.doc.part.numbering_part.numbering_definitions._numbering
+        style_num = numbering.num_having_numId(style_pr.numPr.numId.val)
+        num = numbering.add_num(style_num.abstractNumId.val)
+        num.add_lvlOverride(ilvl=0).add_startOverride(start)
+        return num.numId
+
+    def add_code_block(self, lines, index, fence):
+        self.end_block()
+        code_lines = []
+        while index < len(lines) and not lines[index].strip().startswith(fence):
+            code_lines.append(lines[index].rstrip())
+            index += 1
+        paragraph = self.doc.add_paragraph()
+        for position, code_line in enumerate(code_lines):
+            if position:
+                paragraph.add_run().add_break()
+            self.add_run(paragraph, code_line, False, False, True)
+        return index + 1
+
+    def add_rule(self):
+        paragraph = self.doc.add_paragraph()
+        border = OxmlElement('w:pBdr')
+        bottom = OxmlElement('w:bottom')
+        for attribute, value in (('w:val', 'single'), ('w:sz', '6'), ('w:space', '1'), ('w:color', 'auto')):
+            bottom.set(qn(attribute), value)
+        border.append(bottom)
+        paragraph._p.get_or_add_pPr().append(border)
+
+    def add_table(self, lines, index):
+        header = split_table_row(lines[index])
+        alignments = [get_cell_alignment(cell) for cell in split_table_row(lines[index + 1])]
+        rows = [header]
+        index += 2
+        while index < len(lines) and '|' in lines[index] and lines[index].strip():
+            rows.append(split_table_row(lines[index]))
+            index += 1
+
+        column_count = len(header)
+        table = self.doc.add_table(rows=len(rows), cols=column_count)
+        table._tbl.tblStyle_val = self.get_style_id('Table Grid')
+        table.alignment = WD_TABLE_ALIGNMENT.CENTER
+        for row_index, cells in enumerate(rows):
+            row_cells = table.rows[row_index].cells
+            for column, text in enumerate(cells[:column_count]):
+                paragraph = row_cells[column].paragraphs[0]
+                if column < len(alignments):
+                    set_paragraph_properties(paragraph, alignment=alignments[column])
+                self.add_inline(paragraph, text, bold=row_index == 0)
+        return index
+
+    def add_inline(self, paragraph, text, bold=False, italic=False, code=False):
+        plain = []
+
+        def flush():
+            if plain:
+                self.add_run(paragraph, ''.join(plain), bold, italic, code)
+                plain.clear()
+
+        position = 0
+        for match in INLINE_PATTERN.finditer(text):
+            plain.append(text[position:match.start()])
+            position = match.end()
+            if match.group('escaped') is not None:
+                plain.append(match.group('escaped'))
+                continue
+            flush()
+            if match.group('code') is not None:
+                self.add_run(paragraph, match.group('code'), bold, italic, True)
+            elif match.group('link_text') is not None:
+                self.add_hyperlink(paragraph, match.group('link_url'), match.group('link_text'), bold, italic)
+            elif match.group('autolink') is not None:
+                self.add_hyperlink(paragraph, match.group('autolink'), match.group('autolink'), bold, italic)
+            elif match.group('line_break') is not None:
+                paragraph.add_run().add_break()
+            elif match.group('bold') is not None:
+                self.add_inline(paragraph, match.group('bold'), True, italic, code)
+            else:
+                inner = match.group('star_italic') or match.group('underscore_italic')
+                self.add_inline(paragraph, inner, bold, True, code)
+        plain.append(text[position:])
+        flush()
+
+    def add_run(self, paragraph, text, bold, italic, code):
+        paragraph._p.append(make_run(text, bold, italic, code))
+
+    def add_hyperlink(self, paragraph, url, text, bold, italic):
+        relationship_id = paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+        hyperlink = OxmlElement('w:hyperlink')
+        hyperlink.set(qn('r:id'), relationship_id)
+        hyperlink.append(make_run(text, bold, italic, False, link=True))
+        paragraph._p.append(hyperlink)
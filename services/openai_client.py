@@ -0,0 +1,232 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError, RateLimitError, InternalServerError
+
+try:
+    from config.config import OPENAI_API_KEY
+except ImportError:
+    OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+
+if not OPENAI_API_KEY:
+    print("Warning: OPENAI_API_KEY not found. Please set it in config/config.py or as an environment variable.")
+    sys.exit(1)
+
+try:
+    from config.config import OPENAI_BASE_URL, OPENAI_MAX_CONNECTIONS, OPENAI_BREAKER_THRESHOLD, OPENAI_BREAKER_RESET_SECONDS
+except ImportError:
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', '')
+    OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 20))
+    OPENAI_BREAKER_THRESHOLD = int(os.environ.get('OPENAI_BREAKER_THRESHOLD', 5))
+    OPENAI_BREAKER_RESET_SECONDS = float(os.environ.get('OPENAI_BREAKER_RESET_SECONDS', 30))
+
+# Per call type: request timeout and how many times a transient failure is retried.
+# Validation fails open and sits on the critical path, so it gets one short attempt;
+# transcription uploads a file stream that cannot be rewound, so it is never retried.
+CALL_POLICIES = {
+    'chat': {'timeout': httpx.Timeout(20.0, connect=3.0), 'retries': 1},
+    'validation': {'timeout': httpx.Timeout(4.0, connect=2.0), 'retries': 0},
+    'history_summary': {'timeout': httpx.Timeout(30.0, connect=3.0), 'retries': 1},
+    'report_fill': {'timeout': httpx.Timeout(120.0, connect=5.0), 'retries': 3},
+    'tts': {'timeout': httpx.Timeout(30.0, connect=3.0), 'retries': 1},
+    'transcription': {'timeout': httpx.Timeout(60.0, connect=3.0), 'retries': 0},
+}
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+POOL_LIMITS = httpx.Limits(
+    max_connections=OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+    keepalive_expiry=30.0
+)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive provider failures and rejects calls immediately.
+
+    While open, one trial call is let through every `reset_seconds`; its success closes the breaker.
+    """
+
+    def __init__(self, name, failure_threshold=OPENAI_BREAKER_THRESHOLD, reset_seconds=OPENAI_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.is_open = False
+        self.retry_at = 0
+        self.opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if not self.is_open:
+                return True
+            now = time.monotonic()
+            if now < self.retry_at:
+                self.rejected += 1
+                return False
+            self.retry_at = now + self.reset_seconds
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.is_open = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.is_open or self.failures >= self.failure_threshold:
+                if not self.is_open:
+                    print(f"OpenAI circuit '{self.name}' opened after {self.failures} failures")
+                    self.opened += 1
+                self.is_open = True
+                self.retry_at = time.monotonic() + self.reset_seconds
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'state': 'open' if self.is_open else 'closed',
+                'failures': self.failures,
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
+
+
+_breakers = {call_type: CircuitBreaker(call_type) for call_type in CALL_POLICIES}
+
+_client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    base_url=OPENAI_BASE_URL or None,
+    max_retries=0,
+    http_client=httpx.Client(limits=POOL_LIMITS, timeout=httpx.Timeout(30.0, connect=3.0))
+)
+# with_options copies share the pooled httpx client.
+_clients = {
+    call_type: _client.with_options(timeout=policy['timeout'])
+    for call_type, policy in CALL_POLICIES.items()
+}
+_async_loop = None
+_async_loop_lock = threading.Lock()
+_async_clients = None
+
+
+def is_provider_failure(error):
+    # Client errors (bad request, auth) are our fault and neither retried nor held against the provider.
+    if isinstance(error, (APIConnectionError, RateLimitError, InternalServerError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code in (408, 409)
+
+
+def get_retry_delay(attempt):
+    # Full jitter, so clients that failed together do not retry together.
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def get_async_loop():
+    """The worker's long-lived event loop for async OpenAI work, started in a daemon thread on first use."""
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='openai-async-loop', daemon=True).start()
+            _async_loop = loop
+    return _async_loop
+
+
+def run_async(coroutine):
+    """Schedule coroutine on the shared loop and return an awaitable for it.
+
+    Flask runs every async view on a fresh event loop; awaiting through here keeps the OpenAI
+    calls (and their pooled connections) on the one loop that lives as long as the worker.
+    """
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, get_async_loop()))
+
+
+def get_async_client(call_type):
+    # httpx async connection pools are bound to the loop that created them; all async calls
+    # run on the shared loop, so a single client is created there and reused.
+    global _async_clients
+    if asyncio.get_running_loop() is not _async_loop:
+        raise RuntimeError("Async OpenAI calls must run on the shared loop (use run_async)")
+    if _async_clients is None:
+        base = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL or None,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=POOL_LIMITS, timeout=httpx.Timeout(30.0, connect=3.0))
+        )
+        _async_clients = {name: base.with_options(timeout=policy['timeout']) for name, policy in CALL_POLICIES.items()}
+    return _async_clients[call_type]
+
+
+@contextmanager
+def openai_call(call_type):
+    """Yield the client for call_type and report the outcome to its circuit breaker.
+
+    Raises CircuitOpenError without touching the network while the breaker is open.
+    """
+    breaker = _breakers[call_type]
+    if not breaker.allow():
+        raise CircuitOpenError(f"OpenAI circuit '{call_type}' is open")
+    try:
+        yield _clients[call_type]
+    except Exception as e:
+        if is_provider_failure(e):
+            breaker.record_failure()
+        raise
+    breaker.record_success()
+
+
+@asynccontextmanager
+async def openai_call_async(call_type):
+    breaker = _breakers[call_type]
+    if not breaker.allow():
+        raise CircuitOpenError(f"OpenAI circuit '{call_type}' is open")
+    try:
+        yield get_async_client(call_type)
+    except Exception as e:
+        if is_provider_failure(e):
+            breaker.record_failure()
+        raise
+    breaker.record_success()
+
+
+def call_openai(call_type, request):
+    """Run request(client) with the call type's timeout, jittered retries and circuit breaker."""
+    retries = CALL_POLICIES[call_type]['retries']
+    for attempt in range(retries + 1):
+        try:
+            with openai_call(call_type) as client:
+                return request(client)
+        except Exception as e:
+            if attempt == retries or not is_provider_failure(e):
+                raise
+            print(f"OpenAI {call_type} call failed ({type(e).__name__}), retrying")
+        time.sleep(get_retry_delay(attempt))
+
+
+async def call_openai_async(call_type, request):
+    retries = CALL_POLICIES[call_type]['retries']
+    for attempt in range(retries + 1):
+        try:
+            async with openai_call_async(call_type) as client:
+                return await request(client)
+        except Exception as e:
+            if attempt == retries or not is_provider_failure(e):
+                raise
+            print(f"OpenAI {call_type} call failed ({type(e).__name__}), retrying")
+        await asyncio.sleep(get_retry_delay(attempt))
+
+
+def get_breaker_stats():
+    return {call_type: breaker.get_stats() for call_type, breaker in _breakers.items()}
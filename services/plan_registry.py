@@ -0,0 +1,82 @@
+import os
+import re
+import threading
+from services.business_plan_service import load_business_plan_from_yaml, get_plan_path
+
+try:
+    from config.config import BUSINESS_PLANS_DIR
+except ImportError:
+    BUSINESS_PLANS_DIR = os.environ.get('BUSINESS_PLANS_DIR', '')
+
+DEFAULT_PLAN_ID = 'default'
+PLAN_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+PLAN_EXTENSIONS = ('.yaml', '.yml')
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_base_dir():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_plans_dir():
+    return BUSINESS_PLANS_DIR or os.path.join(get_base_dir(), 'config', 'plans')
+
+
+def get_default_template_path():
+    return os.path.join(get_base_dir(), 'business_plan', 'business_plan_template.md')
+
+
+def discover_plans():
+    """{plan_id: (yaml_path, template_path)} for the default plan and every <plan_id>.yaml in the plans directory.
+
+    A <plan_id>.md next to the YAML is that plan's report template. Only file names are read
+    here, and only when the directory changes; plans are parsed on first use.
+    """
+    global _registry
+    plans_dir = get_plans_dir()
+    try:
+        dir_mtime = os.stat(plans_dir).st_mtime_ns
+    except OSError:
+        dir_mtime = None
+    registry = _registry
+    if registry is not None and registry[0] == dir_mtime:
+        return registry[1]
+
+    with _registry_lock:
+        plans = {DEFAULT_PLAN_ID: (get_plan_path(), get_default_template_path())}
+        if dir_mtime is not None:
+            file_names = set(os.listdir(plans_dir))
+            for file_name in sorted(file_names):
+                plan_id, extension = os.path.splitext(file_name)
+                if extension not in PLAN_EXTENSIONS or not PLAN_ID_PATTERN.match(plan_id):
+                    continue
+                template_name = f'{plan_id}.md'
+                template_path = os.path.join(plans_dir, template_name) if template_name in file_names else get_default_template_path()
+                plans[plan_id] = (os.path.join(plans_dir, file_name), template_path)
+        _registry = (dir_mtime, plans)
+    return plans
+
+
+def get_plan_ids():
+    return list(discover_plans())
+
+
+def is_known_plan(plan_id):
+    return plan_id in discover_plans()
+
+
+def load_plan(plan_id=None):
+    """The compiled plan for plan_id, loaded on first use. Unknown or removed plans fall back to the default."""
+    plans = discover_plans()
+    yaml_path, _ = plans.get(plan_id or DEFAULT_PLAN_ID) or plans[DEFAULT_PLAN_ID]
+    return load_business_plan_from_yaml(yaml_path)
+
+
+def get_plan_template_path(business_plan_sections):
+    plan_path = getattr(business_plan_sections, 'path', None)
+    for yaml_path, template_path in discover_plans().values():
+        if yaml_path == plan_path:
+            return template_path
+    return get_default_template_path()
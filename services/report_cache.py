@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from services.tts_cache import TTSCache
+
+# Bump when rendered output changes for the same answers and template.
+REPORT_CACHE_VERSION = 1
+MAX_TRACKED_SESSIONS = 10000
+
+
+def get_answers_fingerprint(answers):
+    payload = json.dumps(answers, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_report_cache_key(answers_fingerprint, layout_fingerprint, report_format, render_variant):
+    payload = '\0'.join([str(REPORT_CACHE_VERSION), answers_fingerprint, layout_fingerprint, report_format, render_variant])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ReportCache(TTSCache):
+    """Rendered reports (markdown, DOCX, PDF bytes) on the two-tier byte cache, keyed by content.
+
+    Keys already change with the answers; on top of that each session's artifacts are dropped as
+    soon as it renders a report for different answers, or is reset. Artifacts still used by the
+    new answers (e.g. filled sections whose answers did not change) are kept.
+    """
+
+    def __init__(self, cache_dir, max_memory_bytes, max_disk_bytes):
+        super().__init__(cache_dir, max_memory_bytes=max_memory_bytes, max_disk_bytes=max_disk_bytes)
+        self.stats['invalidations'] = 0
+        self._session_reports = OrderedDict()
+
+    def track(self, session_id, answers_fingerprint, keys):
+        with self._lock:
+            entry = self._session_reports.get(session_id)
+            stale = ()
+            if entry is None or entry[0] != answers_fingerprint:
+                stale = entry[1] if entry is not None else ()
+                entry = self._session_reports[session_id] = (answers_fingerprint, set())
+            entry[1].update(keys)
+            self._session_reports.move_to_end(session_id)
+            while len(self._session_reports) > MAX_TRACKED_SESSIONS:
+                self._session_reports.popitem(last=False)
+        self.discard(set(stale) - set(keys))
+
+    def invalidate_session(self, session_id):
+        with self._lock:
+            entry = self._session_reports.pop(session_id, None)
+        if entry is not None:
+            self.discard(entry[1])
+
+    def discard(self, keys):
+        removed_bytes = 0
+        with self._lock:
+            for key in keys:
+                data = self._memory.pop(key, None)
+                if data is not None:
+                    self._memory_bytes -= len(data)
+                self.stats['invalidations'] += 1
+        if self.cache_dir is None:
+            return
+        for key in keys:
+            path = self._path(key)
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            removed_bytes += size
+        with self._lock:
+            self._disk_bytes -= removed_bytes
@@ -0,0 +1,72 @@
+import os
+from services.plan_registry import load_plan
+from services.docx_service import get_report_bytes
+from services.email_service import send_report_emails
+from services.job_service import (
+    register_job_handler, register_batch_job_handler, enqueue_job, set_job_checkpoint, has_job_checkpoint,
+    PermanentJobError
+)
+
+try:
+    from config.config import REPORT_EMAIL_BATCH_SIZE
+except ImportError:
+    REPORT_EMAIL_BATCH_SIZE = int(os.environ.get('REPORT_EMAIL_BATCH_SIZE', 50))
+
+
+def get_job_report_bytes(payload):
+    # The built DOCX lives in the report cache, keyed by the job's answers; if it has been
+    # evicted since, this rebuilds it from the same answers instead of reading a file.
+    return get_report_bytes(payload['form_data'], load_plan(payload.get('plan_id')), 'docx', payload.get('session_id'))
+
+
+def handle_build_report(job_id, payload):
+    try:
+        data = get_job_report_bytes(payload)
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+    return {'size': len(data)}
+
+
+def handle_send_reports(jobs):
+    # Report emails queued together (a cohort finishing at once) go out in one batch over the
+    # pooled SMTP connections instead of one job per worker wake-up.
+    outcomes = [None] * len(jobs)
+    pending = []
+    for index, job in enumerate(jobs):
+        # A retry after the email went out (a lost worker, a failed status update) must not send it again.
+        if has_job_checkpoint(job['job_id'], 'email_sent'):
+            outcomes[index] = {'email': job['payload']['form_data'].get('email')}
+        else:
+            pending.append(index)
+    # The DOCX is required until the last attempt, so a failed report build is retried with backoff;
+    # only then does the email go out without it.
+    reports = [
+        (jobs[index]['payload']['form_data'], load_plan(jobs[index]['payload'].get('plan_id')),
+         jobs[index]['payload'].get('session_id'), not jobs[index]['last_attempt'])
+        for index in pending
+    ]
+    for index, sent in zip(pending, send_report_emails(reports)):
+        job = jobs[index]
+        if sent is True:
+            set_job_checkpoint(job['job_id'], 'email_sent')
+            outcomes[index] = {'email': job['payload']['form_data'].get('email')}
+        elif sent is False:
+            outcomes[index] = PermanentJobError('Report email could not be sent (missing SMTP configuration or recipient).')
+        elif isinstance(sent, ValueError):
+            # The answers cannot make a report (see handle_build_report); retrying will not change that.
+            outcomes[index] = PermanentJobError(str(sent))
+        else:
+            outcomes[index] = sent
+    return outcomes
+
+
+def enqueue_build_report(session_id, form_data, plan_id=None):
+    return enqueue_job('build_report', {'form_data': form_data.copy(), 'plan_id': plan_id, 'session_id': session_id}, session_id=session_id)
+
+
+def enqueue_send_report(session_id, form_data, plan_id=None):
+    return enqueue_job('send_report', {'form_data': form_data.copy(), 'plan_id': plan_id, 'session_id': session_id}, session_id=session_id)
+
+
+register_job_handler('build_report', handle_build_report)
+register_batch_job_handler('send_report', handle_send_reports, REPORT_EMAIL_BATCH_SIZE)
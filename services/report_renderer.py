@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+import threading
+from constants import REPORT_FORM_FIELD_SECTIONS
+
+OTHER_SECTION_TITLE = 'Other information'
+HEADING_PATTERN = re.compile(r'^(#{1,3}) (.+)$')
+FIELD_PATTERN = re.compile(r'^(\* )?\*\*(.+?):\*\*\s*\.\.\.\s*$')
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset({'a', 'an', 'and', 'the', 'of', 'to', 'for', 'in', 'or', 'as', 'with', 'your', 'you', 'do', 'i'})
+# Minimum Dice overlap between a question label and a field or subsection title.
+MATCH_THRESHOLD = 0.5
+
+_template_cache = {}
+_template_lock = threading.Lock()
+
+
+def title_words(text):
+    return frozenset(WORD_PATTERN.findall(text.lower())) - STOPWORDS
+
+
+def get_match_score(label_words, text):
+    words = title_words(text)
+    if not words or not label_words:
+        return 0
+    return 2 * len(label_words & words) / (len(label_words) + len(words))
+
+
+class TemplateNode:
+    """A heading of the template with its answer slots: `**Field:** ...` lines and ### subsections."""
+
+    def __init__(self, title, heading):
+        self.title = title
+        self.heading = heading
+        self.fields = []
+        self.children = []
+
+    def match(self, label):
+        """The field name or child node that best fits label, or None."""
+        label_words = title_words(label)
+        best, best_score = None, MATCH_THRESHOLD
+        targets = [(name, name) for _, name in self.fields] + [(child, child.title) for child in self.children]
+        for target, text in targets:
+            score = get_match_score(label_words, text)
+            if score > best_score or (score == best_score and best is None):
+                best, best_score = target, score
+        return best
+
+    def get_best_score(self, label_words):
+        texts = [self.title] + [name for _, name in self.fields] + [child.title for child in self.children]
+        return max(get_match_score(label_words, text) for text in texts)
+
+
+def parse_template(template_markdown):
+    """Parse the report template into top-level sections (# and ##) with ### children."""
+    sections = []
+    section = node = None
+    for line in template_markdown.split('\n'):
+        heading_match = HEADING_PATTERN.match(line)
+        if heading_match:
+            node = TemplateNode(heading_match.group(2).strip(), line.strip())
+            if len(heading_match.group(1)) < 3 or section is None:
+                section = node
+                sections.append(section)
+            else:
+                section.children.append(node)
+            continue
+        field_match = FIELD_PATTERN.match(line.strip())
+        if field_match and node is not None:
+            node.fields.append((field_match.group(1) or '', field_match.group(2).strip()))
+    return sections
+
+
+def read_template(template_path):
+    """(sections, content hash) for template_path, reparsed only when its mtime changes."""
+    mtime = os.path.getmtime(template_path)
+    with _template_lock:
+        cached = _template_cache.get(template_path)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+    with open(template_path, 'r', encoding='utf-8') as f:
+        template_markdown = f.read()
+    sections = parse_template(template_markdown)
+    fingerprint = hashlib.sha256(template_markdown.encode('utf-8')).hexdigest()
+    with _template_lock:
+        _template_cache[template_path] = (mtime, sections, fingerprint)
+    return sections, fingerprint
+
+
+def load_template(template_path):
+    return read_template(template_path)[0]
+
+
+def get_template_fingerprint(template_path):
+    return read_template(template_path)[1]
+
+
+def render_answers(answers, labeled=False):
+    # A lone answer stands on its own; several are told apart by their question labels.
+    if len(answers) == 1 and not labeled:
+        return [next(iter(answers.values()))]
+    return [f"**{label}:** {answer}" for label, answer in answers.items()]
+
+
+def render_node(node, placed):
+    """Markdown blocks for node, or an empty list when nothing under it was answered."""
+    field_answers, body_answers = placed.get(node, ({}, {}))
+    blocks = []
+    field_lines = [
+        f"{prefix}**{name}:** {' '.join(field_answers[name].split())}"
+        for prefix, name in node.fields if name in field_answers
+    ]
+    child_blocks = [block for child in node.children for block in render_node(child, placed)]
+    if field_lines:
+        blocks.append('\n'.join(field_lines))
+    if body_answers:
+        blocks.extend(render_answers(body_answers, labeled=bool(field_lines or child_blocks)))
+    blocks.extend(child_blocks)
+    if blocks:
+        blocks.insert(0, node.heading)
+    return blocks
+
+
+def find_section(sections, label):
+    """The top-level template section whose title, fields or subsections best fit label, or None."""
+    label_words = title_words(label)
+    best, best_score = None, MATCH_THRESHOLD
+    for section in sections:
+        score = section.get_best_score(label_words)
+        if score > best_score or (score == best_score and best is None):
+            best, best_score = section, score
+    return best
+
+
+def get_answer_sections(business_plan_sections, sections):
+    """{answer label: report heading} for the initial form fields and every question of the plan.
+
+    A question goes under its `report_section` when the template has that heading, else under the
+    best-matching template section, else under its own plan section's title.
+    """
+    by_title = {section.title: section for section in sections}
+    answer_sections = {}
+    for label, title in REPORT_FORM_FIELD_SECTIONS.items():
+        section = by_title.get(title) or find_section(sections, label)
+        if section is not None:
+            answer_sections[label] = section.title
+    for plan_section in business_plan_sections or ():
+        for question in plan_section['core_questions'] + plan_section['optional_questions']:
+            section = by_title.get(question.get('report_section')) or find_section(sections, question['label'])
+            answer_sections[question['label']] = section.title if section is not None else plan_section['title']
+    return answer_sections
+
+
+def place_answers(sections, answers, answer_sections):
+    """Assign each answer to a field, subsection or section body of the template.
+
+    Answers whose heading is not in the template are returned grouped by that heading.
+    """
+    by_title = {section.title: section for section in sections}
+    placed = {}
+    other = {}
+
+    def slot(node):
+        return placed.setdefault(node, ({}, {}))
+
+    for label, answer in answers.items():
+        answer = answer.strip()
+        if not answer:
+            continue
+        title = answer_sections.get(label, OTHER_SECTION_TITLE)
+        section = by_title.get(title)
+        if section is None:
+            other.setdefault(title, {})[label] = answer
+            continue
+        target = section.match(label)
+        if isinstance(target, TemplateNode):
+            slot(target)[1][label] = answer
+        elif target is not None:
+            slot(section)[0][target] = answer
+        else:
+            slot(section)[1][label] = answer
+    return placed, other
+
+
+def render_business_plan(template_path, answers, business_plan_sections=None):
+    """Fill the report template with answers, dropping every section and slot that has none. No LLM involved."""
+    sections = load_template(template_path)
+    placed, other = place_answers(sections, answers, get_answer_sections(business_plan_sections, sections))
+
+    rendered = []
+    for section in sections:
+        blocks = render_node(section, placed)
+        if blocks:
+            rendered.append('\n\n'.join(blocks))
+    for title, other_answers in other.items():
+        rendered.append('\n\n'.join([f"## {title}"] + render_answers(other_answers)))
+    return "\n\n---\n\n".join(rendered)
@@ -0,0 +1,154 @@
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def is_connection_error(error):
+    # SMTPException subclasses OSError; any other OSError is a socket-level failure. Refused
+    # recipients or data errors leave the session usable (smtplib resets it before raising).
+    if isinstance(error, RECONNECT_ERRORS):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionPool:
+    """Bounded pool of logged-in SMTP connections reused across messages."""
+
+    def __init__(self, host, port, username=None, password=None, use_starttls=True,
+                 max_connections=4, timeout=30, noop_after=30, max_idle=240):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_starttls = use_starttls
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.noop_after = noop_after
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.stats = {'connects': 0, 'reused': 0, 'reconnects': 0, 'sent': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_starttls:
+                server.starttls()
+                server.ehlo()
+            if self.username and self.password and server.has_extn('auth'):
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        self._count('connects')
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(server):
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self, fresh=False):
+        if fresh:
+            return self._connect()
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.max_idle:
+                self._close(server)
+                continue
+            if idle_for > self.noop_after and not self._is_alive(server):
+                self._close(server)
+                continue
+            self._count('reused')
+            return server
+
+    @contextmanager
+    def connection(self, fresh=False):
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._checkout(fresh)
+            yield server
+        except Exception as e:
+            if server is not None and is_connection_error(e):
+                self._close(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                self._idle.put((server, time.monotonic()))
+            self._slots.release()
+
+    def send_message(self, sender, recipients, message):
+        payload = message.as_string()
+        for attempt in (1, 2):
+            try:
+                with self.connection(fresh=attempt > 1) as server:
+                    server.sendmail(sender, recipients, payload)
+                self._count('sent')
+                return
+            except Exception as e:
+                # A dropped connection has been discarded by the context manager; retry once on a
+                # newly opened one. Anything else is about this message and is not retried.
+                if attempt == 2 or not is_connection_error(e):
+                    self._count('failed')
+                    raise
+                self._count('reconnects')
+
+    def send_messages(self, messages):
+        """Send (sender, recipients, message) tuples over at most max_connections connections.
+
+        Returns a list with None for each delivered message or the exception that stopped it.
+        """
+        if not messages:
+            return []
+        results = [None] * len(messages)
+        worker_count = min(self.max_connections, len(messages))
+        batches = [list(range(i, len(messages), worker_count)) for i in range(worker_count)]
+
+        def send_batch(indexes):
+            for index in indexes:
+                sender, recipients, message = messages[index]
+                try:
+                    self.send_message(sender, recipients, message)
+                except Exception as e:
+                    results[index] = e
+
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix='smtp-batch') as executor:
+            list(executor.map(send_batch, batches))
+        return results
+
+    def close_all(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
@@ -0,0 +1,95 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.chat_service import get_tts_audio, get_tts_cache_key_for, get_canned_replies, tts_cache, TTS_PREWARM
+
+try:
+    from config.config import TTS_SYNTH_WORKERS
+except ImportError:
+    TTS_SYNTH_WORKERS = int(os.environ.get('TTS_SYNTH_WORKERS', 4))
+
+SENTENCE_END_PATTERN = re.compile(r'([.!?…]+["\'”’)\]]*)\s+')
+ABBREVIATIONS = {'e.g', 'i.e', 'etc', 'vs', 'mr', 'mrs', 'ms', 'dr', 'prof', 'inc', 'ltd', 'approx'}
+MIN_SENTENCE_CHARS = 20
+
+_synth_executor = ThreadPoolExecutor(max_workers=TTS_SYNTH_WORKERS, thread_name_prefix='tts-synth')
+
+
+class SentenceSplitter:
+    """Cuts streamed text into sentences as soon as a boundary (punctuation + whitespace) arrives.
+
+    Fragments shorter than min_chars are held back and merged with the following sentence so
+    TTS is not called for things like "Great!".
+    """
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ''
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END_PATTERN.finditer(self.buffer):
+            candidate = self.buffer[start:match.end(1)].strip()
+            words = self.buffer[start:match.start(1)].split()
+            if words and words[-1].lstrip('("\'').lower() in ABBREVIATIONS:
+                continue
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        rest = self.buffer.strip()
+        self.buffer = ''
+        return [rest] if rest else []
+
+
+def _report_prefetch_error(future):
+    error = future.exception()
+    if error is not None:
+        print(f"TTS prefetch error: {str(error)}")
+
+
+def prefetch_sentence_audio(text):
+    # Claimed before it is queued, so a /api/tts/stream request that arrives while the job is
+    # still waiting for a pool thread waits for it instead of synthesizing the sentence again.
+    claim = tts_cache.claim_inflight(get_tts_cache_key_for(text))
+    if claim is None:
+        return None
+    future = _synth_executor.submit(get_tts_audio, text, claim)
+    future.add_done_callback(_report_prefetch_error)
+    return future
+
+
+def get_prewarm_phrases(business_plan_sections):
+    # Only text a client can request: the canned replies, split into sentences exactly as the
+    # voice stream splits them before each sentence is fetched from /api/tts/stream.
+    phrases = []
+    for reply in get_canned_replies(business_plan_sections):
+        splitter = SentenceSplitter()
+        for sentence in splitter.feed(reply) + splitter.flush():
+            if sentence not in phrases:
+                phrases.append(sentence)
+    return phrases
+
+
+def prewarm_tts_cache(business_plan_sections):
+    warmed = 0
+    for phrase in get_prewarm_phrases(business_plan_sections):
+        try:
+            get_tts_audio(phrase)
+            warmed += 1
+        except Exception as e:
+            print(f"TTS prewarm error for {phrase!r}: {str(e)}")
+    print(f"TTS prewarm finished: {warmed} phrases cached")
+
+
+def start_tts_prewarm(business_plan_sections):
+    if not TTS_PREWARM:
+        return
+    threading.Thread(target=prewarm_tts_cache, args=(business_plan_sections,), name='tts-prewarm', daemon=True).start()
@@ -0,0 +1,295 @@
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from services.audio_service import decode_audio, detect_speech, encode_audio
+from services.chat_service import transcribe_file, transcribe_recording
+from utils.helpers import get_data_dir, file_lock
+
+try:
+    from config.config import TRANSCRIBE_PARTIAL_INTERVAL, TRANSCRIBE_WORKERS
+except ImportError:
+    TRANSCRIBE_PARTIAL_INTERVAL = float(os.environ.get('TRANSCRIBE_PARTIAL_INTERVAL', 2.0))
+    TRANSCRIBE_WORKERS = int(os.environ.get('TRANSCRIBE_WORKERS', 2))
+
+RECORDING_TTL_SECONDS = 600
+PURGE_INTERVAL = 60
+# A partial transcribes only the audio after the previous one, starting this much earlier so
+# words cut at the boundary are heard whole; the repeated words are dropped when merging.
+PARTIAL_OVERLAP_SECONDS = 1.0
+PARTIAL_PROMPT_CHARS = 200
+MAX_OVERLAP_WORDS = 8
+# A partial that has not reported back after this long is assumed lost (e.g. its worker restarted).
+PARTIAL_TIMEOUT_SECONDS = 60
+AUDIO_EXTENSIONS = {'audio/webm': 'webm', 'audio/ogg': 'ogg', 'audio/mp4': 'mp4', 'audio/wav': 'wav', 'audio/mpeg': 'mp3'}
+WORD_PATTERN = re.compile(r'\w+')
+
+_last_purge = 0
+_purge_lock = threading.Lock()
+_partial_executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix='transcribe-partial')
+
+
+class RecordingSequenceError(Exception):
+    pass
+
+
+class FileSlice(io.RawIOBase):
+    """Read-only view of the first `length` bytes of a file that may still be growing.
+
+    Partial transcriptions upload a snapshot of the spool while later chunks are appended;
+    fixing the length up front keeps the multipart Content-Length honest without copying.
+    """
+
+    def __init__(self, path, length):
+        self._file = open(path, 'rb')
+        self._length = length
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        remaining = self._length - self._pos
+        if remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:remaining]
+        self._file.seek(self._pos)
+        count = self._file.readinto(view)
+        self._pos += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._length
+        self._pos = max(0, min(offset, self._length))
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def get_recordings_dir():
+    recordings_dir = os.path.join(get_data_dir(), 'recordings')
+    os.makedirs(recordings_dir, exist_ok=True)
+    return recordings_dir
+
+
+def get_recording_paths(session_id, recording_id):
+    """(audio spool, metadata) paths of a recording, under the session's directory.
+
+    Both live in the data directory rather than in worker memory, so consecutive chunks of
+    one recording may be handled by different workers.
+    """
+    session_dir = os.path.join(get_recordings_dir(), session_id)
+    os.makedirs(session_dir, exist_ok=True)
+    base_path = os.path.join(session_dir, recording_id)
+    return base_path + '.audio', base_path + '.json'
+
+
+def get_audio_filename(content_type):
+    base_type = (content_type or 'audio/webm').split(';')[0].strip()
+    return f"recording.{AUDIO_EXTENSIONS.get(base_type, 'webm')}"
+
+
+def new_recording(content_type):
+    return {
+        'content_type': content_type or 'audio/webm',
+        'next_seq': 0,
+        'size': 0,
+        'partial_text': '',
+        'partial_size': 0,
+        'partial_samples': 0,
+        'partial_started': 0,
+        'partial_busy_until': 0,
+        'partials_supported': True,
+        'updated': time.time()
+    }
+
+
+def read_recording(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_recording(meta_path, recording):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(recording, f)
+    os.replace(tmp_path, meta_path)
+
+
+def remove_files(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def purge_stale_recordings():
+    global _last_purge
+    now = time.time()
+    with _purge_lock:
+        if now - _last_purge < PURGE_INTERVAL:
+            return
+        _last_purge = now
+    cutoff = now - RECORDING_TTL_SECONDS
+    recordings_dir = get_recordings_dir()
+    for session_id in os.listdir(recordings_dir):
+        session_dir = os.path.join(recordings_dir, session_id)
+        if not os.path.isdir(session_dir):
+            continue
+        file_names = set(os.listdir(session_dir))
+        for file_name in file_names:
+            # A recording's age is that of its metadata, rewritten on every chunk; its lock file is
+            # never touched after creation, so it must not be judged on its own.
+            meta_name = file_name.split('.', 1)[0] + '.json'
+            age_path = os.path.join(session_dir, meta_name if meta_name in file_names else file_name)
+            try:
+                if os.path.getmtime(age_path) < cutoff:
+                    os.remove(os.path.join(session_dir, file_name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(session_dir)
+        except OSError:
+            pass
+
+
+def merge_transcripts(previous, addition):
+    """previous + addition, without the words the overlapping audio made both of them contain."""
+    previous_words = previous.split()
+    addition_words = addition.split()
+
+    def normalize(words):
+        return [' '.join(WORD_PATTERN.findall(word.lower())) for word in words]
+
+    for count in range(min(MAX_OVERLAP_WORDS, len(previous_words), len(addition_words)), 0, -1):
+        if normalize(previous_words[-count:]) == normalize(addition_words[:count]):
+            addition_words = addition_words[count:]
+            break
+    return ' '.join(previous_words + addition_words)
+
+
+def transcribe_new_audio(audio_path, recording, size):
+    """(text of the audio after the last partial, decoded sample count), or (None, None) if the audio cannot be decoded.
+
+    The spool is decoded locally and only its new tail, plus a short overlap, is uploaded, so
+    the transcription cost of a recording grows with its length rather than its square.
+    """
+    filename = get_audio_filename(recording['content_type'])
+    try:
+        with FileSlice(audio_path, size) as audio:
+            samples, sample_rate = decode_audio(audio, filename, recording['content_type'])
+    except (wave.Error, EOFError, subprocess.SubprocessError, OSError, ValueError) as e:
+        print(f"Partial decode failed: {str(e)}")
+        return None, None
+    if samples is None:
+        return None, None
+
+    start = max(0, recording['partial_samples'] - int(PARTIAL_OVERLAP_SECONDS * sample_rate))
+    window = samples[start:]
+    if detect_speech(window, sample_rate) is None:
+        return '', len(samples)
+    output, output_name, output_type = encode_audio(window, sample_rate)
+    prompt = recording['partial_text'][-PARTIAL_PROMPT_CHARS:]
+    return transcribe_file(output, output_name, output_type, prompt=prompt), len(samples)
+
+
+def run_partial_transcription(session_id, recording_id, size):
+    audio_path, meta_path = get_recording_paths(session_id, recording_id)
+    with file_lock(audio_path):
+        recording = read_recording(meta_path)
+    if recording is None:
+        return None
+    try:
+        text, sample_count = transcribe_new_audio(audio_path, recording, size)
+    except Exception as e:
+        print(f"Partial transcription error: {str(e)}")
+        text, sample_count = None, None
+
+    with file_lock(audio_path):
+        current = read_recording(meta_path)
+        if current is None:
+            # Finished while this partial was running.
+            return None
+        current['partial_busy_until'] = 0
+        if sample_count is None and text is None:
+            current['partials_supported'] = False
+        elif text is not None and size >= current['partial_size']:
+            current['partial_text'] = merge_transcripts(current['partial_text'], text)
+            current['partial_size'] = size
+            current['partial_samples'] = sample_count
+        write_recording(meta_path, current)
+        return current['partial_text']
+
+
+def should_start_partial(recording):
+    # At most one partial per recording is in flight, across all workers, and they are spaced
+    # TRANSCRIBE_PARTIAL_INTERVAL apart.
+    now = time.time()
+    if not recording['partials_supported'] or recording['size'] <= recording['partial_size']:
+        return False
+    if now < recording['partial_busy_until'] or now - recording['partial_started'] < TRANSCRIBE_PARTIAL_INTERVAL:
+        return False
+    recording['partial_started'] = now
+    recording['partial_busy_until'] = now + PARTIAL_TIMEOUT_SECONDS
+    return True
+
+
+def append_recording_chunk(session_id, recording_id, seq, chunk_stream, content_type):
+    """Append one MediaRecorder timeslice to the recording's spool file.
+
+    Returns the latest partial transcript available (it may lag a chunk or two behind).
+    """
+    purge_stale_recordings()
+    audio_path, meta_path = get_recording_paths(session_id, recording_id)
+    with file_lock(audio_path):
+        recording = read_recording(meta_path) or new_recording(content_type)
+        if seq != recording['next_seq']:
+            raise RecordingSequenceError(f"Expected chunk {recording['next_seq']}, got {seq}")
+        with open(audio_path, 'ab') as spool:
+            shutil.copyfileobj(chunk_stream, spool, 64 * 1024)
+            recording['size'] = spool.tell()
+        recording['next_seq'] += 1
+        recording['updated'] = time.time()
+        start_partial = should_start_partial(recording)
+        write_recording(meta_path, recording)
+    if start_partial:
+        _partial_executor.submit(run_partial_transcription, session_id, recording_id, recording['size'])
+    return recording['partial_text']
+
+
+def finish_recording(session_id, recording_id):
+    audio_path, meta_path = get_recording_paths(session_id, recording_id)
+    with file_lock(audio_path):
+        recording = read_recording(meta_path)
+        if recording is None:
+            return None
+        # Removing the metadata first makes any partial still running discard its result.
+        remove_files(meta_path)
+    try:
+        if recording['size'] == 0:
+            return ''
+        with open(audio_path, 'rb') as audio:
+            return transcribe_recording(audio, get_audio_filename(recording['content_type']), recording['content_type'])
+    finally:
+        remove_files(audio_path, audio_path + '.lock')
@@ -0,0 +1,264 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+def normalize_tts_text(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def get_tts_cache_key(text, voice, model, audio_format='mp3'):
+    payload = '\0'.join([model, voice, audio_format, normalize_tts_text(text)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """Two-tier audio cache: a byte-bounded in-memory LRU over a size-bounded directory.
+
+    With cache_dir=None only the memory tier is used.
+    """
+
+    def __init__(self, cache_dir, max_memory_bytes=32 * 1024 * 1024, max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0, 'stores': 0, 'evictions': 0}
+        self._disk_bytes = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _scan_disk(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            if len(data) > self.max_memory_bytes:
+                return
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _lookup(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data, 'memory_hits'
+        if self.cache_dir is None:
+            return None, 'misses'
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None, 'misses'
+        self._remember(key, data)
+        return data, 'disk_hits'
+
+    def get(self, key):
+        data, outcome = self._lookup(key)
+        self._count(outcome)
+        return data
+
+    def wait_inflight(self, key, timeout=None):
+        with self._lock:
+            done = self._inflight.get(key)
+        if done is not None:
+            done.wait(timeout)
+
+    def claim_inflight(self, key):
+        """Mark key as being created before the work is queued, so readers arriving meanwhile wait for it.
+
+        Returns the claim to hand to get_or_create, or None if the key is already in flight.
+        """
+        with self._lock:
+            if key in self._inflight:
+                return None
+            done = self._inflight[key] = threading.Event()
+        return done
+
+    def get_or_create(self, key, create, claim=None):
+        if claim is not None:
+            done, leader = claim, True
+        else:
+            data = self.get(key)
+            if data is not None:
+                return data
+            # Single-flight: concurrent misses for the same key wait for one synthesis.
+            with self._lock:
+                done = self._inflight.get(key)
+                leader = done is None
+                if leader:
+                    done = self._inflight[key] = threading.Event()
+        if not leader:
+            done.wait()
+            self._count('coalesced')
+            data, _ = self._lookup(key)
+            if data is not None:
+                return data
+            return create()
+        try:
+            data = self.get(key) if claim is not None else None
+            if data is None:
+                data = create()
+                self.put(key, data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def iter_cached(self, key, chunk_size=16 * 1024):
+        """Return an iterator over the cached audio in chunks, or None on a miss.
+
+        Disk hits are streamed from the file and are not promoted to memory.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+        if data is not None:
+            view = memoryview(data)
+            return (bytes(view[i:i + chunk_size]) for i in range(0, len(view), chunk_size))
+        if self.cache_dir is None:
+            self._count('misses')
+            return None
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+            os.utime(path)
+        except OSError:
+            self._count('misses')
+            return None
+        self._count('disk_hits')
+        return self._iter_file(f, chunk_size)
+
+    @staticmethod
+    def _iter_file(f, chunk_size):
+        with f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def open_writer(self, key):
+        return TTSCacheWriter(self, key)
+
+    def _tmp_path(self, key):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path, f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if self.cache_dir is None:
+            self._count('stores')
+            return
+        path, tmp_path = self._tmp_path(key)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._count('stores')
+        self._account_disk(len(data))
+
+    def _account_disk(self, added_bytes):
+        with self._lock:
+            self._disk_bytes += added_bytes
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+        entries = sorted(self._scan_disk(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.stats['evictions'] += evicted
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+            stats['disk_bytes'] = self._disk_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+class TTSCacheWriter:
+    """Spools streamed audio to a temp file and publishes it only once the stream completed."""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.path, self.tmp_path = cache._tmp_path(key)
+        self.size = 0
+        self._file = open(self.tmp_path, 'wb')
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self.size == 0:
+            os.remove(self.tmp_path)
+            return
+        os.replace(self.tmp_path, self.path)
+        self.cache._count('stores')
+        self.cache._account_disk(self.size)
+
+    def abort(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,33 @@
+import threading
+
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def record_usage(call_type, response):
+    """Add a chat completion's token usage (including provider-cached prompt tokens) to the totals for call_type."""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = getattr(details, 'cached_tokens', None) or 0
+    with _usage_lock:
+        totals = _usage.setdefault(call_type, {
+            'calls': 0,
+            'prompt_tokens': 0,
+            'cached_tokens': 0,
+            'completion_tokens': 0
+        })
+        totals['calls'] += 1
+        totals['prompt_tokens'] += getattr(usage, 'prompt_tokens', None) or 0
+        totals['cached_tokens'] += cached_tokens
+        totals['completion_tokens'] += getattr(usage, 'completion_tokens', None) or 0
+
+
+def get_usage_stats():
+    with _usage_lock:
+        stats = {call_type: dict(totals) for call_type, totals in _usage.items()}
+    for totals in stats.values():
+        prompt_tokens = totals['prompt_tokens']
+        totals['cached_ratio'] = round(totals['cached_tokens'] / prompt_tokens, 3) if prompt_tokens else 0.0
+    return stats
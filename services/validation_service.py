@@ -1,102 +1,244 @@
-from openai import OpenAI
+import math
 import os
-import sys
 import re
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from services.business_plan_service import get_compiled_plan, BUSINESS_PLAN_CACHE_MAX_ENTRIES
+from services.plan_registry import load_plan
+from services.gibberish_detector import gibberish_detector
+from services.verdict_cache import VerdictCache, get_verdict_key, normalize_answer
+from services.usage_service import record_usage
+from services.openai_client import call_openai, CircuitOpenError
+from utils.helpers import get_data_dir
 
 try:
-    from config.config import OPENAI_API_KEY
+    from config.config import VALIDATION_LOCAL_TIER, VALIDATION_ACCEPT_SCORE
 except ImportError:
-    OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+    VALIDATION_LOCAL_TIER = os.environ.get('VALIDATION_LOCAL_TIER', 'true').lower() in ('1', 'true', 'yes')
+    VALIDATION_ACCEPT_SCORE = float(os.environ.get('VALIDATION_ACCEPT_SCORE', 0.17))
+
+try:
+    from config.config import VALIDATION_CACHE_TTL_SECONDS, VALIDATION_CACHE_MAX_ENTRIES
+except ImportError:
+    VALIDATION_CACHE_TTL_SECONDS = int(os.environ.get('VALIDATION_CACHE_TTL_SECONDS', 7 * 86400))
+    VALIDATION_CACHE_MAX_ENTRIES = int(os.environ.get('VALIDATION_CACHE_MAX_ENTRIES', 50000))
+
+# Bump when build_validation_messages changes so old verdicts are not reused.
+VALIDATION_PROMPT_VERSION = 1
+
+verdict_cache = VerdictCache(
+    os.path.join(get_data_dir(), 'validation_cache.db'),
+    ttl_seconds=VALIDATION_CACHE_TTL_SECONDS,
+    max_entries=VALIDATION_CACHE_MAX_ENTRIES
+)
+
+VALIDATION_ACCEPT_MIN_WORDS = 3
+# Share of an answer's content words that may come from the question's own label and fill text;
+# above it the answer mostly repeats the question and is left to the model.
+VALIDATION_MAX_ECHO = 0.5
+NGRAM_SIZE = 3
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+# Refusals, "I don't know" phrasings and questions back can share topic words with the question;
+# they are never accepted locally.
+NEGATION_PATTERN = re.compile(
+    r"\b(?:no|not|never|none|nothing|cannot|unsure|dont|cant|wont|doesnt|didnt|havent|isnt)\b|n['’]t\b"
+)
+QUESTION_PATTERN = re.compile(r'^(?:what|why|how|who|when|where|which|are|is|do|does|can|could|should)\b')
+NON_ANSWERS = {
+    'idk', 'i dont know', "i don't know", 'no idea', 'dunno', 'whatever', 'test', 'testing',
+    'hello', 'hi', 'hey', 'lol', 'ok', 'okay', 'asdf', 'qwerty'
+}
+STOP_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'but', 'of', 'to', 'in', 'on', 'at', 'for', 'by', 'with', 'from', 'as',
+    'is', 'are', 'be', 'was', 'will', 'do', 'does', 'it', 'its', 'this', 'that', 'i', 'me', 'my', 'we',
+    'our', 'us', 'you', 'your', 'they', 'them', 'their', 'what', 'who', 'how', 'why', 'e', 'g'
+}
+
+validation_stats = {
+    'heuristic_reject': 0,
+    'local_accept': 0,
+    'cache_hit': 0,
+    'llm_accept': 0,
+    'llm_reject': 0,
+    'llm_error': 0,
+    'circuit_open': 0
+}
+_stats_lock = threading.Lock()
+
+
+def record_validation_decision(tier):
+    with _stats_lock:
+        validation_stats[tier] += 1
+
+
+def get_validation_stats():
+    with _stats_lock:
+        stats = dict(validation_stats)
+    decided = sum(stats.values())
+    llm_calls = stats['llm_accept'] + stats['llm_reject'] + stats['llm_error']
+    stats['llm_call_rate'] = round(llm_calls / decided, 3) if decided else 0.0
+    return stats
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    grams = Counter()
+    for word in WORD_PATTERN.findall(text.lower()):
+        padded = f' {word} '
+        for i in range(len(padded) - n + 1):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+class RelevanceScorer:
+    """Character n-gram TF-IDF similarity between an answer and its question's label + fill text.
+
+    IDF weights come from all question texts in the plan, so boilerplate shared by every
+    question ("what", "your", "e.g.") counts for little and topic words count for a lot.
+    """
+
+    def __init__(self, documents):
+        document_frequency = Counter()
+        for document in documents:
+            document_frequency.update(char_ngrams(document).keys())
+        count = len(documents)
+        self.idf = {gram: math.log((1 + count) / (1 + df)) + 1 for gram, df in document_frequency.items()}
+        self.default_idf = math.log(1 + count) + 1
+        self._question_vectors = {}
+
+    def vectorize(self, text):
+        vector = {gram: (1 + math.log(tf)) * self.idf.get(gram, self.default_idf) for gram, tf in char_ngrams(text).items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {gram: weight / norm for gram, weight in vector.items()}
+
+    def question_vector(self, question_info):
+        text = f"{question_info.get('label', '')} {question_info.get('fill', '')}"
+        vector = self._question_vectors.get(text)
+        if vector is None:
+            vector = self._question_vectors[text] = self.vectorize(text)
+        return vector
+
+    def score(self, answer, question_info):
+        question_vector = self.question_vector(question_info)
+        return sum(weight * question_vector.get(gram, 0.0) for gram, weight in self.vectorize(answer).items())
 
-if not OPENAI_API_KEY:
-    print("Warning: OPENAI_API_KEY not found. Please set it in config/config.py or as an environment variable.")
-    sys.exit(1)
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+_relevance_scorers = OrderedDict()
+_relevance_scorer_lock = threading.Lock()
+
+
+def get_relevance_scorer(business_plan_sections=None):
+    # Document frequencies come from the plan's questions: one scorer per plan version, bounded like the plans.
+    plan = business_plan_sections if business_plan_sections is not None else load_plan()
+    version = getattr(plan, 'version', None) or id(plan)
+    with _relevance_scorer_lock:
+        scorer = _relevance_scorers.get(version)
+        if scorer is not None:
+            _relevance_scorers.move_to_end(version)
+            return scorer
+    questions = get_compiled_plan(plan).questions
+    scorer = RelevanceScorer([f"{q['label']} {q['fill']}" for _, q, _ in questions])
+    with _relevance_scorer_lock:
+        _relevance_scorers[version] = scorer
+        while len(_relevance_scorers) > BUSINESS_PLAN_CACHE_MAX_ENTRIES:
+            _relevance_scorers.popitem(last=False)
+    return scorer
 
 
 def is_gibberish(text):
-    text_clean = text.strip().lower()
-    
-    if len(text_clean) < 4:
-        return False
-    
-    text_alpha = re.sub(r'[^a-z]', '', text_clean)
-    
-    if len(text_alpha) < 4:
-        return False
-    
-    vowels = set('aeiou')
-    vowel_count = sum(1 for char in text_alpha if char in vowels)
-    consonant_count = len(text_alpha) - vowel_count
-    
-    if consonant_count > 0:
-        vowel_ratio = vowel_count / len(text_alpha)
-        if vowel_ratio < 0.15 and len(text_alpha) > 5:
-            return True
-    
-    common_words = {
-        'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i',
-        'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at',
-        'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
-        'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their',
-        'what', 'so', 'up', 'out', 'if', 'about', 'who', 'get', 'which',
-        'go', 'me', 'when', 'make', 'can', 'like', 'time', 'no', 'just',
-        'him', 'know', 'take', 'people', 'into', 'year', 'your', 'good',
-        'some', 'could', 'them', 'see', 'other', 'than', 'then', 'now',
-        'look', 'only', 'come', 'its', 'over', 'think', 'also', 'back',
-        'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well',
-        'way', 'even', 'new', 'want', 'because', 'any', 'these', 'give',
-        'day', 'most', 'us', 'is', 'are', 'was', 'were', 'has', 'had',
-        'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
-        'will', 'would', 'should', 'could', 'may', 'might', 'must',
-        'can', 'cannot', 'shall', 'ought'
-    }
-    
-    words = re.findall(r'\b[a-z]+\b', text_clean)
-    if words:
-        word_count = len(words)
-        common_word_count = sum(1 for word in words if word in common_words)
-        if word_count > 2 and common_word_count == 0:
-            if len(text_alpha) > 8:
-                return True
-    
-    consecutive_consonants = 0
-    max_consecutive = 0
-    for char in text_alpha:
-        if char not in vowels:
-            consecutive_consonants += 1
-            max_consecutive = max(max_consecutive, consecutive_consonants)
-        else:
-            consecutive_consonants = 0
-    
-    if max_consecutive >= 5 and len(text_alpha) > 6:
-        return True
-    
-    return False
+    return gibberish_detector.is_gibberish(text)
 
 
-def validate_answer(user_message, current_step, question_info=None):
-    if not question_info:
-        return True
-    
+def passes_answer_heuristics(user_message):
     user_message_clean = user_message.strip()
     
     if len(user_message_clean) < 2:
         return False
-    
-    if user_message_clean.isdigit() and len(user_message_clean) > 3:
-        return False
-    
-    if user_message_clean.replace(' ', '').isdigit() and len(user_message_clean.replace(' ', '')) > 3:
-        return False
-    
-    if len(set(user_message_clean.replace(' ', ''))) < 3 and len(user_message_clean) > 5:
+
+    if normalize_answer(user_message_clean) in NON_ANSWERS:
         return False
     
-    if is_gibberish(user_message_clean):
+    return not gibberish_detector.is_nonsensical(user_message_clean)
+
+
+def classify_answer_locally(user_message, question_info, business_plan_sections=None):
+    """Validation tiers short of the LLM: heuristics, local relevance scoring, then cached verdicts.
+
+    Only the heuristics reject; the relevance score can only accept, since a short answer
+    ("Espoo", "two employees") shares few n-grams with the question even when it is right.
+    Answers that mostly repeat the question, ask something back or contain a negation are
+    never accepted locally: they can score high without answering anything.
+    Returns True/False when one of them decides, or None when the LLM has to be asked.
+    """
+    if not passes_answer_heuristics(user_message):
+        record_validation_decision('heuristic_reject')
         return False
-    
+
+    if VALIDATION_LOCAL_TIER:
+        if score_answer_locally(user_message, question_info, business_plan_sections):
+            record_validation_decision('local_accept')
+            return True
+
+    cached_verdict = get_cached_verdict(user_message, question_info)
+    if cached_verdict is not None:
+        record_validation_decision('cache_hit')
+    return cached_verdict
+
+
+def content_words(text):
+    # Plural 's' dropped so "skill" in an answer matches "skills" in the question.
+    return [word[:-1] if len(word) > 3 and word.endswith('s') else word
+            for word in WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def get_echo_ratio(user_message, question_info):
+    """Share of the answer's content words that already appear in the question's label or fill text."""
+    words = content_words(user_message)
+    if not words:
+        return 1.0
+    question_words = set(content_words(f"{question_info.get('label', '')} {question_info.get('fill', '')}"))
+    return sum(1 for word in words if word in question_words) / len(words)
+
+
+def get_local_score(user_message, question_info, business_plan_sections=None):
+    """Relevance score of an answer the local tier may accept, or None when it must go to the model."""
+    normalized = normalize_answer(user_message)
+    if len(WORD_PATTERN.findall(normalized)) < VALIDATION_ACCEPT_MIN_WORDS:
+        return None
+    if NEGATION_PATTERN.search(normalized) or QUESTION_PATTERN.match(normalized) or '?' in user_message:
+        return None
+    if get_echo_ratio(user_message, question_info) > VALIDATION_MAX_ECHO:
+        return None
+    return get_relevance_scorer(business_plan_sections).score(user_message, question_info)
+
+
+def score_answer_locally(user_message, question_info, business_plan_sections=None):
+    score = get_local_score(user_message, question_info, business_plan_sections)
+    return score is not None and score >= VALIDATION_ACCEPT_SCORE
+
+
+def get_cached_verdict(user_message, question_info):
+    try:
+        return verdict_cache.get(get_verdict_key(question_info, user_message, VALIDATION_PROMPT_VERSION))
+    except sqlite3.Error as e:
+        print(f"Validation cache error: {str(e)}")
+        return None
+
+
+def store_verdict(user_message, question_info, answer_valid):
+    try:
+        verdict_cache.put(get_verdict_key(question_info, user_message, VALIDATION_PROMPT_VERSION), answer_valid)
+    except sqlite3.Error as e:
+        print(f"Validation cache error: {str(e)}")
+
+
+def parse_validation_reply(response):
+    answer_valid = response.choices[0].message.content.strip().upper().startswith('YES')
+    record_validation_decision('llm_accept' if answer_valid else 'llm_reject')
+    return answer_valid
+
+
+def build_validation_messages(user_message, question_info):
     question_label = question_info.get('label', '')
     question_fill = question_info.get('fill', '')
     
@@ -122,20 +264,43 @@ Examples of INVALID answers:
 
 Respond with ONLY "YES" if the answer is appropriate and addresses the question, or "NO" if it does not address the question properly or is nonsensical."""
 
+    return [
+        {'role': 'system', 'content': validation_prompt},
+        {'role': 'user', 'content': 'Validate this answer.'}
+    ]
+
+
+def validate_answer_with_llm(user_message, question_info):
     try:
-        response = client.chat.completions.create(
+        response = call_openai('validation', lambda client: client.chat.completions.create(
             model="gpt-4o-mini",
-            messages=[
-                {'role': 'system', 'content': validation_prompt},
-                {'role': 'user', 'content': 'Validate this answer.'}
-            ],
+            messages=build_validation_messages(user_message, question_info),
             temperature=0.3,
             max_tokens=10
-        )
+        ))
+        record_usage('validation', response)
         
-        result = response.choices[0].message.content.strip().upper()
-        return result.startswith('YES')
+        answer_valid = parse_validation_reply(response)
+    except CircuitOpenError:
+        # The provider is down: skip validation rather than queueing behind it.
+        record_validation_decision('circuit_open')
+        return True
     except Exception as e:
+        # Fail open so an outage never blocks the interview, but keep the verdict out of the cache.
         print(f"Validation error: {str(e)}")
+        record_validation_decision('llm_error')
         return True
+    
+    store_verdict(user_message, question_info, answer_valid)
+    return answer_valid
+
 
+def validate_answer(user_message, current_step, question_info=None, business_plan_sections=None):
+    if not question_info:
+        return True
+    
+    local_verdict = classify_answer_locally(user_message, question_info, business_plan_sections)
+    if local_verdict is not None:
+        return local_verdict
+    
+    return validate_answer_with_llm(user_message, question_info)
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def normalize_answer(answer):
+    return ' '.join(answer.lower().split()).strip(' .!?,;:')
+
+
+def get_verdict_key(question_info, answer, prompt_version):
+    question_text = f"{question_info.get('label', '')}\0{question_info.get('fill', '')}"
+    payload = '\0'.join([str(prompt_version), question_info.get('id', ''), question_text, normalize_answer(answer)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class VerdictCache:
+    """Validation verdicts in a SQLite file, shared by all workers, with TTL and a row cap."""
+
+    PURGE_INTERVAL = 300
+
+    def __init__(self, db_path, ttl_seconds=7 * 86400, max_entries=50000):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._last_purge = 0
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS verdicts ('
+            'cache_key TEXT PRIMARY KEY, '
+            'verdict INTEGER NOT NULL, '
+            'expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_verdicts_expires ON verdicts (expires_at)')
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT verdict FROM verdicts WHERE cache_key = ? AND expires_at >= ?',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return bool(row[0])
+
+    def put(self, key, verdict):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO verdicts (cache_key, verdict, expires_at) VALUES (?, ?, ?)',
+            (key, int(verdict), now + self.ttl_seconds)
+        )
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            conn.execute('DELETE FROM verdicts WHERE expires_at < ?', (now,))
+            # Rows all share one TTL, so the soonest to expire are also the oldest.
+            conn.execute(
+                'DELETE FROM verdicts WHERE cache_key IN ('
+                'SELECT cache_key FROM verdicts ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+            self._last_purge = now
+        conn.commit()
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM verdicts WHERE expires_at >= ?', (time.time(),)).fetchone()[0]
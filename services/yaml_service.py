@@ -1,71 +1,121 @@
+import json
 import os
-import re
-from utils.helpers import slugify
+import time
+import yaml
+from services.business_plan_service import read_plan_document, iter_plan_questions, get_question_id
+from utils.helpers import slugify, get_data_dir, file_lock
 
+try:
+    from config.config import JOURNAL_COMPACT_BYTES
+except ImportError:
+    JOURNAL_COMPACT_BYTES = int(os.environ.get('JOURNAL_COMPACT_BYTES', 64 * 1024))
 
-def update_yaml_with_answer(yaml_path, question_label, answer):
+
+def get_journal_path(session_id):
+    journal_dir = os.path.join(get_data_dir(), 'journals')
+    os.makedirs(journal_dir, exist_ok=True)
+    return os.path.join(journal_dir, f'{session_id}.jsonl')
+
+
+def append_answer(session_id, question_label, answer):
     if not answer or answer.strip() == '':
         return False
-    
-    answer_escaped = answer.replace('"', '\\"').replace('\n', '\\n')
-    
-    with open(yaml_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    question_id = slugify(question_label)
-    updated = False
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
-        
-        question_match = re.match(r'"([^"]+)":', stripped)
-        if question_match:
-            current_question_label = question_match.group(1)
-            current_question_id = slugify(current_question_label)
-            
-            if current_question_id == question_id:
-                j = i + 1
-                answer_found = False
-                while j < len(lines):
-                    stripped_line = lines[j].strip()
-                    if stripped_line.startswith('answer:'):
-                        indent = len(lines[j]) - len(lines[j].lstrip())
-                        lines[j] = ' ' * indent + f'answer: "{answer_escaped}"\n'
-                        updated = True
-                        answer_found = True
-                        break
-                    elif stripped_line and not stripped_line.startswith('#') and ':' in stripped_line and not stripped_line.startswith('answer:'):
-                        indent = len(lines[j]) - len(lines[j].lstrip())
-                        lines.insert(j, ' ' * indent + f'answer: "{answer_escaped}"\n')
-                        updated = True
-                        answer_found = True
-                        break
-                    elif stripped_line.startswith('# ---'):
-                        if not answer_found:
-                            indent = len(lines[i]) - len(lines[i].lstrip())
-                            lines.insert(j, ' ' * indent + f'answer: "{answer_escaped}"\n')
-                            updated = True
-                        break
-                    j += 1
-                
-                if not answer_found and j >= len(lines):
-                    indent = len(lines[i]) - len(lines[i].lstrip())
-                    lines.insert(j, ' ' * indent + f'answer: "{answer_escaped}"\n')
-                    updated = True
-                break
-        
-        i += 1
-    
-    if updated:
-        with open(yaml_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
-    
-    return updated
-
-
-def get_yaml_path():
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    return os.path.join(base_dir, 'config', 'improved_business_plan.yaml')
 
+    journal_path = get_journal_path(session_id)
+    record = json.dumps({'label': question_label, 'answer': answer, 'ts': time.time()}, ensure_ascii=False)
+
+    with file_lock(journal_path):
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write(record + '\n')
+        journal_size = os.path.getsize(journal_path)
+        if journal_size > JOURNAL_COMPACT_BYTES and journal_size > 2 * read_compacted_size(journal_path):
+            compact_journal_locked(journal_path)
+
+    return True
+
+
+def read_journal(journal_path):
+    answers = {}
+    if not os.path.exists(journal_path):
+        return answers
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from a crashed writer; everything before it is intact.
+                continue
+            if 'label' in record:
+                answers[record['label']] = record['answer']
+    return answers
+
+
+def read_compacted_size(journal_path):
+    # Compacted journals start with a {"compacted": size} header, so a session whose answers
+    # alone exceed JOURNAL_COMPACT_BYTES is only rewritten once the journal doubles again.
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        first_line = f.readline()
+    try:
+        return json.loads(first_line).get('compacted', 0)
+    except (ValueError, AttributeError):
+        return 0
+
+
+def load_journal_answers(session_id):
+    return read_journal(get_journal_path(session_id))
+
+
+def compact_journal_locked(journal_path):
+    answers = read_journal(journal_path)
+    tmp_path = journal_path + '.tmp'
+    now = time.time()
+    lines = [json.dumps({'label': label, 'answer': answer, 'ts': now}, ensure_ascii=False) + '\n'
+             for label, answer in answers.items()]
+    body_size = sum(len(line.encode('utf-8')) for line in lines)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'compacted': body_size}) + '\n')
+        f.writelines(lines)
+    os.replace(tmp_path, journal_path)
+
+
+def compact_journal(session_id):
+    journal_path = get_journal_path(session_id)
+    with file_lock(journal_path):
+        compact_journal_locked(journal_path)
+
+
+def delete_journal(session_id):
+    journal_path = get_journal_path(session_id)
+    with file_lock(journal_path):
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+    try:
+        os.remove(journal_path + '.lock')
+    except OSError:
+        pass
+
+
+def apply_answers_to_plan(document, answers):
+    answers_by_id = {slugify(label): answer for label, answer in answers.items()}
+    for _, _, question in iter_plan_questions(document):
+        # Journals store the label the question had when it was answered.
+        answer = answers_by_id.get(get_question_id(question), answers_by_id.get(slugify(question['label'])))
+        if answer is not None:
+            question['answer'] = answer
+    return document
+
+
+def materialize_filled_yaml(session_id, yaml_path=None, output_path=None):
+    document = apply_answers_to_plan(read_plan_document(yaml_path), load_journal_answers(session_id))
+    filled = yaml.safe_dump(document, sort_keys=False, allow_unicode=True, width=float('inf'))
+
+    if output_path is not None:
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(filled)
+        os.replace(tmp_path, output_path)
+
+    return filled
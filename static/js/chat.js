@@ -33,6 +33,8 @@ function addMessage(content, isUser) {
     
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    
+    return p;
 }
 
 function updateProgress(completedSteps) {
@@ -318,6 +320,25 @@ function updateSendReportButton() {
     }
 }
 
+const REPORT_POLL_INTERVAL_MS = 1500;
+const REPORT_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
+async function pollReportStatus(jobId) {
+    const deadline = Date.now() + REPORT_POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        const response = await fetch(`/api/report-status?job_id=${encodeURIComponent(jobId)}`);
+        const job = await response.json();
+        if (!response.ok) {
+            return { status: 'failed', error: job.error || 'Unknown error' };
+        }
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, REPORT_POLL_INTERVAL_MS));
+    }
+    return { status: 'failed', error: 'Timed out waiting for the report.' };
+}
+
 async function sendReportManually() {
     const sendReportButton = document.getElementById('sendReportButton');
     const emailInput = document.getElementById('reportEmailInput');
@@ -346,8 +367,9 @@ async function sendReportManually() {
         });
         
         const data = await response.json();
+        const job = response.ok ? await pollReportStatus(data.job_id) : null;
         
-        if (response.ok) {
+        if (job && job.status === 'succeeded') {
             addMessage('✓ Business plan has been sent to ' + email + '!', false);
             sendReportButton.querySelector('span').textContent = 'Business Plan Sent!';
             setTimeout(() => {
@@ -355,7 +377,8 @@ async function sendReportManually() {
                 updateSendReportButton();
             }, 2000);
         } else {
-            addMessage('Sorry, there was an error sending the business plan: ' + (data.error || 'Unknown error'), false);
+            const error = job ? job.error : data.error;
+            addMessage('Sorry, there was an error sending the business plan: ' + (error || 'Unknown error'), false);
             sendReportButton.querySelector('span').textContent = originalText;
             updateSendReportButton();
         }
@@ -392,28 +415,84 @@ function getSupportedMimeType() {
     return '';
 }
 
+const RECORDING_TIMESLICE_MS = 1000;
+
+function newRecordingUpload() {
+    const recordingId = Array.from(crypto.getRandomValues(new Uint8Array(12)), b => b.toString(16).padStart(2, '0')).join('');
+    return { recordingId, seq: 0, chain: Promise.resolve(), failed: false };
+}
+
+function postRecordingChunk(upload, chunk, final) {
+    // Chunks are chained so the server receives them strictly in order.
+    upload.chain = upload.chain.then(async () => {
+        if (upload.failed) return null;
+        const formData = new FormData();
+        formData.append('recording_id', upload.recordingId);
+        formData.append('final', final ? '1' : '0');
+        if (chunk) {
+            formData.append('seq', String(upload.seq++));
+            formData.append('audio', chunk, 'chunk.webm');
+        }
+        try {
+            const response = await fetch('/api/transcribe/chunk', { method: 'POST', body: formData });
+            const data = await response.json();
+            if (!response.ok) {
+                upload.failed = true;
+                return null;
+            }
+            return data;
+        } catch (error) {
+            console.error('Chunk upload error:', error);
+            upload.failed = true;
+            return null;
+        }
+    });
+    return upload.chain;
+}
+
 function startRecording() {
     if (isRecording) return;
     recordingChunks = [];
+    const upload = newRecordingUpload();
     const mimeType = getSupportedMimeType();
     mediaRecorder = new MediaRecorder(mediaStream, mimeType ? { mimeType } : undefined);
     
     mediaRecorder.ondataavailable = (e) => {
         if (e.data && e.data.size > 0) {
             recordingChunks.push(e.data);
+            postRecordingChunk(upload, e.data, false).then(data => {
+                if (data && data.text && isRecording) {
+                    messageInput.value = data.text.trim();
+                }
+            });
         }
     };
     
     mediaRecorder.onstop = async () => {
         if (!recordingChunks.length) return;
         
+        micButton.disabled = true;
+        const data = await postRecordingChunk(upload, null, true);
+        micButton.disabled = false;
+        
+        if (data && !upload.failed) {
+            if (data.text) {
+                messageInput.value = data.text.trim();
+                await sendMessage();
+            } else {
+                messageInput.value = '';
+            }
+            return;
+        }
+        
+        // Incremental upload broke part way; fall back to sending the whole recording at once.
         const type = mediaRecorder.mimeType || 'audio/webm';
         const blob = new Blob(recordingChunks, { type });
         
         await transcribeAndSend(blob);
     };
     
-    mediaRecorder.start();
+    mediaRecorder.start(RECORDING_TIMESLICE_MS);
     isRecording = true;
     micButton.classList.add('recording');
 }
@@ -447,7 +526,7 @@ async function transcribeAndSend(audioBlob) {
         if (response.ok && data.text) {
             messageInput.value = data.text.trim();
             await sendMessage();
-        } else {
+        } else if (!response.ok) {
             addMessage('Sorry, there was an error transcribing your audio.', false);
         }
     } catch (error) {
@@ -482,19 +561,57 @@ function setupPressAndHold() {
     micButton.addEventListener('pointerdown', start);
 }
 
-function base64ToBlob(base64, mimeType) {
-    const byteCharacters = atob(base64);
-    const byteNumbers = new Array(byteCharacters.length);
-    for (let i = 0; i < byteCharacters.length; i++) {
-        byteNumbers[i] = byteCharacters.charCodeAt(i);
-    }
-    const byteArray = new Uint8Array(byteNumbers);
-    return new Blob([byteArray], { type: mimeType });
+const TTS_STREAM_MAX_URL_LENGTH = 4000;
+
+function playAudio(audio, onDone) {
+    let finished = false;
+    const finish = () => {
+        if (finished) return;
+        finished = true;
+        if (onDone) onDone();
+    };
+    audio.onended = finish;
+    audio.onerror = () => {
+        console.error('Error playing audio:', audio.error);
+        finish();
+    };
+    audio.play().catch(error => {
+        console.error('Error playing audio:', error);
+        finish();
+    });
+}
+
+const speechQueue = [];
+let speechPlaying = false;
+
+function enqueueSpeech(audioUrl) {
+    // Creating the element right away lets the browser buffer later sentences while earlier ones play.
+    const audio = new Audio(audioUrl);
+    audio.preload = 'auto';
+    speechQueue.push(audio);
+    playNextSpeech();
+}
+
+function playNextSpeech() {
+    if (speechPlaying || !speechQueue.length) return;
+    speechPlaying = true;
+    playAudio(speechQueue.shift(), () => {
+        speechPlaying = false;
+        playNextSpeech();
+    });
 }
 
 async function playAudioFromTTS(text) {
+    const streamUrl = `/api/tts/stream?text=${encodeURIComponent(text)}`;
+    
+    if (streamUrl.length <= TTS_STREAM_MAX_URL_LENGTH) {
+        // The browser fetches the audio progressively and starts playback before synthesis finishes.
+        playAudio(new Audio(streamUrl));
+        return;
+    }
+    
     try {
-        const response = await fetch('/api/tts', {
+        const response = await fetch('/api/tts/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -502,26 +619,114 @@ async function playAudioFromTTS(text) {
             body: JSON.stringify({ text: text }),
         });
         
-        const data = await response.json();
-        
-        if (response.ok && data.audio) {
-            const audioBlob = base64ToBlob(data.audio, `audio/${data.format}`);
-            const audioUrl = URL.createObjectURL(audioBlob);
-            const audio = new Audio(audioUrl);
-            
-            audio.play().catch(error => {
-                console.error('Error playing audio:', error);
-            });
-            
-            audio.onended = () => {
-                URL.revokeObjectURL(audioUrl);
-            };
+        if (!response.ok) {
+            console.error('TTS error:', response.status);
+            return;
         }
+        
+        const audioUrl = URL.createObjectURL(await response.blob());
+        playAudio(new Audio(audioUrl), () => URL.revokeObjectURL(audioUrl));
     } catch (error) {
         console.error('TTS error:', error);
     }
 }
 
+function applyChatResponse(data) {
+    updateProgress(data.completed_steps);
+    
+    if (data.business_plan_progress && data.business_plan_progress.length > 0) {
+        const initialContainer = document.getElementById('initialProgressContainer');
+        if (initialContainer) {
+            initialContainer.style.display = 'none';
+        }
+        
+        const isNowComplete = data.initial_form_complete;
+        const wasJustCompleted = isNowComplete && !previousInitialFormComplete;
+        
+        const newProgress = data.business_plan_progress || [];
+        
+        if (wasJustCompleted && currentSectionIndex === 0) {
+            currentSectionIndex = 1;
+        } else {
+            newProgress.forEach((sectionProgress, index) => {
+                const sectionId = sectionProgress.section_id;
+                const isComplete = sectionProgress.core_completed.length === sectionProgress.core_total &&
+                    sectionProgress.optional_completed.length === sectionProgress.optional_total;
+                
+                const wasComplete = previousSectionCompletions[sectionId] || false;
+                
+                if (!wasComplete && isComplete && index === currentSectionIndex && index < newProgress.length - 1) {
+                    currentSectionIndex = index + 1;
+                }
+                
+                previousSectionCompletions[sectionId] = isComplete;
+            });
+        }
+        
+        renderBusinessPlanProgress(data.business_plan_progress);
+        
+        previousInitialFormComplete = isNowComplete;
+    }
+    
+    updateTiersAndPoints(data.points, data.current_tier, data.tiers);
+    
+    if (data.form_data && data.form_data.email) {
+        const emailInput = document.getElementById('reportEmailInput');
+        if (emailInput && !emailInput.value.trim()) {
+            emailInput.value = data.form_data.email;
+        }
+    }
+    updateSendReportButton();
+    
+    if (data.report_job_id) {
+        pollReportStatus(data.report_job_id).then(job => {
+            if (job.status === 'succeeded') {
+                addMessage('✓ Business plan has been sent to your email address!', false);
+            }
+        }).catch(error => console.error('Report status error:', error));
+    }
+}
+
+function parseSSEEvent(rawEvent) {
+    let event = 'message';
+    const dataLines = [];
+    rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trimStart());
+        }
+    });
+    if (!dataLines.length) return null;
+    return { event, data: JSON.parse(dataLines.join('\n')) };
+}
+
+async function readChatStream(response, onToken, onDone, onSentence) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const parsed = parseSSEEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            if (!parsed) continue;
+            if (parsed.event === 'token') {
+                onToken(parsed.data.text);
+            } else if (parsed.event === 'sentence') {
+                if (onSentence) onSentence(parsed.data);
+            } else if (parsed.event === 'done') {
+                onDone(parsed.data);
+            }
+        }
+    }
+}
+
 async function sendMessage() {
     const message = messageInput.value.trim();
     
@@ -534,75 +739,46 @@ async function sendMessage() {
     sendButton.disabled = true;
     
     try {
-        const response = await fetch('/api/chat', {
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ message: message }),
+            body: JSON.stringify({ message: message, voice: audioOutputEnabled }),
         });
         
-        const data = await response.json();
-        
         if (response.ok) {
-            setTimeout(() => {
-                addMessage(data.response, false);
-                updateProgress(data.completed_steps);
-                
-                if (data.business_plan_progress && data.business_plan_progress.length > 0) {
-                    const initialContainer = document.getElementById('initialProgressContainer');
-                    if (initialContainer) {
-                        initialContainer.style.display = 'none';
+            let botParagraph = null;
+            let botText = '';
+            let spokenSentences = 0;
+            
+            await readChatStream(
+                response,
+                (token) => {
+                    if (!botParagraph) {
+                        botParagraph = addMessage('', false);
                     }
-                    
-                    const isNowComplete = data.initial_form_complete;
-                    const wasJustCompleted = isNowComplete && !previousInitialFormComplete;
-                    
-                    const newProgress = data.business_plan_progress || [];
-                    
-                    if (wasJustCompleted && currentSectionIndex === 0) {
-                        currentSectionIndex = 1;
-                    } else {
-                        newProgress.forEach((sectionProgress, index) => {
-                            const sectionId = sectionProgress.section_id;
-                            const isComplete = sectionProgress.core_completed.length === sectionProgress.core_total &&
-                                sectionProgress.optional_completed.length === sectionProgress.optional_total;
-                            
-                            const wasComplete = previousSectionCompletions[sectionId] || false;
-                            
-                            if (!wasComplete && isComplete && index === currentSectionIndex && index < newProgress.length - 1) {
-                                currentSectionIndex = index + 1;
-                            }
-                            
-                            previousSectionCompletions[sectionId] = isComplete;
-                        });
+                    botText += token;
+                    botParagraph.textContent = botText;
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                },
+                (data) => {
+                    if (!botParagraph) {
+                        botParagraph = addMessage(data.response, false);
                     }
+                    applyChatResponse(data);
                     
-                    renderBusinessPlanProgress(data.business_plan_progress);
-                    
-                    previousInitialFormComplete = isNowComplete;
-                }
-                
-                updateTiersAndPoints(data.points, data.current_tier, data.tiers);
-                
-                if (data.form_data && data.form_data.email) {
-                    const emailInput = document.getElementById('reportEmailInput');
-                    if (emailInput && !emailInput.value.trim()) {
-                        emailInput.value = data.form_data.email;
+                    if (audioOutputEnabled && !spokenSentences) {
+                        playAudioFromTTS(data.response);
+                    }
+                },
+                (sentence) => {
+                    if (audioOutputEnabled) {
+                        spokenSentences += 1;
+                        enqueueSpeech(sentence.audio_url);
                     }
                 }
-                updateSendReportButton();
-                
-                if (data.report_sent) {
-                    setTimeout(() => {
-                        addMessage('✓ Business plan has been sent to your email address!', false);
-                    }, 1000);
-                }
-                
-                if (audioOutputEnabled) {
-                    playAudioFromTTS(data.response);
-                }
-            }, 500);
+            );
         } else {
             addMessage('Sorry, there was an error processing your message.', false);
         }
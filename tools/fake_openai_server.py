@@ -0,0 +1,185 @@
+"""
+Fake OpenAI HTTP server for exercising the client layer (timeouts, retries,
+circuit breakers, degraded replies) without calling the real API.
+
+Serves /v1/chat/completions (plain and streamed, with usage and simulated
+prompt-cache hits), /v1/audio/speech and /v1/audio/transcriptions.
+
+Faults can be injected at startup or changed while it runs:
+
+    curl -X POST localhost:8765/_control -d '{"fail_rate": 1.0}'
+    curl -X POST localhost:8765/_control -d '{"latency": 10}'
+
+Usage: python tools/fake_openai_server.py [--port 8765] [--latency 0] [--fail-rate 0] [--status 500]
+Then start the app with OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+settings = {'latency': 0.0, 'fail_rate': 0.0, 'status': 500}
+seen_prefixes = set()
+counters = {}
+lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def chat_reply(body):
+    messages = body.get('messages', [])
+    if body.get('max_tokens') == 10:
+        return 'YES'
+    last = messages[-1]['content'] if messages else ''
+    return f"Fake reply to: {last[:80]}"
+
+
+def chat_usage(body, reply):
+    messages = body.get('messages', [])
+    prompt_tokens = sum(estimate_tokens(str(message.get('content', ''))) + 4 for message in messages)
+    # Like the real provider: the first message counts as a cached prefix once seen, in 128-token
+    # steps above 1024 tokens.
+    cached_tokens = 0
+    if messages:
+        first = str(messages[0].get('content', ''))
+        prefix = hashlib.sha256(first.encode('utf-8')).hexdigest()
+        first_tokens = estimate_tokens(first)
+        with lock:
+            if prefix in seen_prefixes and first_tokens >= 1024:
+                cached_tokens = first_tokens - first_tokens % 128
+            seen_prefixes.add(prefix)
+    completion_tokens = estimate_tokens(reply)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_tokens_details': {'cached_tokens': cached_tokens}
+    }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/_control':
+            with lock:
+                self.send_json(200, {'settings': settings, 'requests': counters})
+            return
+        self.send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        raw = self.read_body()
+        if self.path == '/_control':
+            with lock:
+                settings.update(json.loads(raw or b'{}'))
+                self.send_json(200, {'settings': settings})
+            return
+
+        with lock:
+            counters[self.path] = counters.get(self.path, 0) + 1
+            latency, fail_rate, status = settings['latency'], settings['fail_rate'], settings['status']
+        if latency:
+            time.sleep(latency)
+        if random.random() < fail_rate:
+            self.send_json(status, {'error': {'message': 'Injected failure', 'type': 'server_error'}})
+            return
+
+        if self.path == '/v1/chat/completions':
+            self.handle_chat(json.loads(raw))
+        elif self.path == '/v1/audio/speech':
+            self.handle_speech(json.loads(raw))
+        elif self.path == '/v1/audio/transcriptions':
+            self.send_json(200, {'text': 'Fake transcription'})
+        else:
+            self.send_json(404, {'error': {'message': f'Unknown endpoint {self.path}'}})
+
+    def handle_chat(self, body):
+        reply = chat_reply(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get('model', 'gpt-4o-mini')
+        if not body.get('stream'):
+            self.send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': reply},
+                    'finish_reason': 'stop'
+                }],
+                'usage': chat_usage(body, reply)
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        chunks = [{'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]}
+                  for word in reply.split()]
+        if (body.get('stream_options') or {}).get('include_usage'):
+            chunks.append({'choices': [], 'usage': chat_usage(body, reply)})
+        for chunk in chunks:
+            chunk.update(id=completion_id, object='chat.completion.chunk', created=created, model=model)
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def handle_speech(self, body):
+        # Not real audio; size scales with the input so caching and streaming can be observed.
+        audio = hashlib.sha256(body.get('input', '').encode('utf-8')).digest() * (len(body.get('input', '')) * 8 + 32)
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Content-Length', str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI API server for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests that fail.")
+    parser.add_argument("--status", type=int, default=500, help="HTTP status of injected failures.")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, fail_rate=args.fail_rate, status=args.status)
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeOpenAIHandler)
+    print(f"Fake OpenAI server on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,16 @@
+import os
 import re
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Paths hash onto a fixed set of thread locks, so the lock table stays the same size however many files there are.
+FILE_LOCK_STRIPES = 64
+_file_locks = [threading.Lock() for _ in range(FILE_LOCK_STRIPES)]
 
 
 def slugify(text):
@@ -8,3 +20,24 @@ def slugify(text):
     text = text.strip('_')
     return text
 
+
+def get_data_dir():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_dir = os.environ.get('AINO_DATA_DIR', os.path.join(base_dir, 'data'))
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on path across threads and, through flock on path + '.lock', across worker processes."""
+    with _file_locks[hash(path) % FILE_LOCK_STRIPES]:
+        if fcntl is None:
+            yield
+            return
+        with open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)